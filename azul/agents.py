@@ -0,0 +1,87 @@
+"""
+Agents decide the moves of a player. TheGame asks the agent of the current
+player to choose one of the legal moves, and applies it.
+"""
+import random
+import time
+from typing import Callable, List
+
+from board import FLOOR
+from game import MIDDLE, Move, TheGame
+from tiles import Tile
+
+
+class Agent:
+    """ Chooses a move for the current player of a game """
+
+    def choose_move(self, game: TheGame, moves: List[Move]) -> Move:
+        raise NotImplementedError
+
+
+class RandomAgent(Agent):
+    """ Plays any of the legal moves """
+
+    def __init__(self, rng: random.Random = random):
+        self.rng = rng
+
+    def choose_move(self, game: TheGame, moves: List[Move]) -> Move:
+        return self.rng.choice(moves)
+
+
+class TerminalAgent(Agent):
+    """ Asks a human in the terminal for every move """
+
+    def __init__(self, delay: float = 1.0, ask: Callable[[str], str] = input):
+        self.delay = delay
+        self.ask = ask
+
+    def choose_move(self, game: TheGame, moves: List[Move]) -> Move:
+        time.sleep(self.delay)
+        self.show_turn_start_message(game)
+
+        while True:
+            move = self.ask_move(game)
+            if move in moves:
+                return move
+            print(f"You cannot play {move}. Try again ..")
+
+    def ask_move(self, game: TheGame) -> Move:
+        while True:
+            from_the_middle = self.ask("Are you picking from the middle? (y/n) ")
+            if from_the_middle.lower() == "y":
+                source = MIDDLE
+                break
+            elif from_the_middle.lower() == "n":
+                source = self.ask_number("What factory are you choosing from? ")
+                break
+            else:
+                print("Please use 'n' or 'y' to respond..")
+
+        style = self.ask_number(
+            "What tile type or you picking? (0=black, 1=blue, 2=red, 3=yellow, 4=white) "
+        )
+        if style not in range(5):
+            return Move(source, Tile(0), -1)
+        tile = Tile(style)
+        row_nr = self.ask_number(
+            f"To which row number should {tile} be added? (1-5, {FLOOR}=floor line) "
+        )
+        return Move(source, tile, row_nr)
+
+    def ask_number(self, question: str) -> int:
+        while True:
+            try:
+                return int(self.ask(question))
+            except ValueError:
+                print("Please answer with a number..")
+
+    @staticmethod
+    def show_turn_start_message(game: TheGame) -> None:
+        """ At the start of each turn this message is shown """
+        print("\n")
+        print("-" * 50)
+        print("\n")
+        print(f"{game.current_player} it's your turn!")
+        print(f"Factories:\n{game.factories}")
+        print(f"The middle:\n{game.the_middle}")
+        print(f"Your board:\n{game.players[game.current_player].board}")
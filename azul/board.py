@@ -1,6 +1,11 @@
 from board_components import PatternLines, FloorLine, Wall
 from tiles import Tile, TileCounter
-from typing import List, Optional
+from typing import List
+
+
+# The row number that stands for the floor line when adding tiles
+FLOOR = 0
+FIRST_PLAYER_TILE = Tile.FIRST_PLAYER
 
 
 class PlayerBoard:
@@ -19,17 +24,28 @@ class PlayerBoard:
         self.wall = Wall()
         self.floor_line = FloorLine()
 
-    def add_tile_count(
-        self,
-        tiles: TileCounter,
-        row_nr: Optional[int] = None
-    ) -> None:
+    def can_place(self, tile: Tile, row_nr: int) -> bool:
+        """
+        Check whether <tile> can go to pattern line <row_nr>: the row must be
+        empty or hold the same type, and the wall's row can't hold it yet.
+        The floor line (row_nr 0) takes anything.
+        """
+        if row_nr == FLOOR:
+            return True
+        row = self.pattern_lines.grid[row_nr]
+        return row.accepts(tile) and not self.wall.has_tile_in_row(tile, row_nr - 1)
+
+    def add_tile_count(self, tiles: TileCounter, row_nr: int) -> None:
         """
-        Add tile counters to your pattern line area. If there is not enough
-        capacity, the surplus tiles will be added to the minus point area
+        Add tile counters to pattern line <row_nr> (1-5), or straight to the
+        floor line (row_nr 0). If there is not enough capacity, the surplus
+        tiles will be added to the minus point area
         """
-        if row_nr is None:
-            row_nr = int(input(f"To which row number should {tiles} be added? "))
+        if row_nr == FLOOR:
+            self.floor_line += tiles
+            return
+        if not self.can_place(tiles.tile, row_nr):
+            raise ValueError(f"Cannot add {tiles} to pattern line #{row_nr}")
         row = self.pattern_lines.grid[row_nr]
 
         # handle surplus tiles
@@ -38,10 +54,21 @@ class PlayerBoard:
             surplus_tiles = TileCounter(tile=tiles.tile, count=surplus_count)
 
             self.floor_line += surplus_tiles
-            tiles.count = row.free_spaces
+            tiles = TileCounter(tile=tiles.tile, count=row.free_spaces)
 
         self.pattern_lines.grid[row_nr] += tiles
 
+    def take_back(self, row_nr: int, row_used: int, floor_used: int) -> None:
+        """
+        Undo add_tile_count: keep only the first <row_used> tiles of pattern
+        line <row_nr> and the first <floor_used> tiles of the floor line
+        """
+        if row_nr != FLOOR:
+            spaces = self.pattern_lines.grid[row_nr].spaces
+            for index in range(row_used, len(spaces)):
+                spaces[index] = None
+        del self.floor_line[floor_used:]
+
     def handle_round_end(self) -> List[TileCounter]:
         """
         Move tiles from inner-round area into end-state area,
@@ -58,7 +85,7 @@ class PlayerBoard:
         This involves:
         - identifying which rows in the inner-round tile area are full (and can
             be moved)
-        - ask for a column to move the tile into (ask until valid input)
+        - moving one tile of a full row to its column on the wall
         - calculate the points for that tile & add them to point total
         - return all tiles that are left over (as a list of TileCounters)
         """
@@ -71,26 +98,17 @@ class PlayerBoard:
 
                 # handle leftover tiles
                 surplus_count = grid_row.used_spaces - 1
-                surplus_tiles = TileCounter(tile=tile, count=surplus_count)
-                discarded_tiles_counter_container.append(surplus_tiles)
+                if surplus_count:
+                    surplus_tiles = TileCounter(tile=tile, count=surplus_count)
+                    discarded_tiles_counter_container.append(surplus_tiles)
+                grid_row.flush_row()
 
                 # handle tile placement in end-state area
-                print(f"You are moving {tile} into row #{row_nr}!")
-                print("Your end-state-tile-area looks like this:")
-                print(self.wall)
-                while True:
-                    col_nr = int(input("In which column do you place the tile?"))
-                    try:
-                        self.wall.add_tile(
-                            tile, row_nr=row_nr, col_nr=col_nr
-                        )
-                    except ValueError:
-                        print("You cannot place your tile there. Try again ..")
-                    else:
-                        break
-
+                wall_row = row_nr - 1
+                col_nr = Wall.column_for(tile, wall_row)
+                self.wall.add_tile(tile, row_nr=wall_row, col_nr=col_nr)
                 self.point_total += self.wall.count_points_tile(
-                    row_nr=row_nr, col_nr=col_nr
+                    row_nr=wall_row, col_nr=col_nr
                 )
 
         return discarded_tiles_counter_container
@@ -98,14 +116,16 @@ class PlayerBoard:
     def score_floor_line(self) -> List[TileCounter]:
         """
         Score and flush the minus point area. Returns a list with TileCounter
-        that represent the discarded tiles.
+        that represent the discarded tiles. The point total never drops
+        below 0.
 
-        The method makes sure that the minus-tile (=Tile(99)) does not end up
+        The method makes sure that the minus-tile (=Tile.FIRST_PLAYER) does not end up
         in the discarded tiles. The minus-point tile implicitly returns to
         TheMiddle (actually it is recreated whenever somebody takes a
         'first draw' from TheMiddle)
         """
-        self.point_total -= self.floor_line.count_minus_points
+        minus_points = self.floor_line.count_minus_points()
+        self.point_total = max(0, self.point_total - minus_points)
 
         discarded_tile_list = self.floor_line[:]
         self.floor_line = FloorLine()
@@ -113,9 +133,13 @@ class PlayerBoard:
         return [
             TileCounter(tile, 1)
             for tile in discarded_tile_list
-            if tile != Tile(99)  # Tile(99) is the minus-point tile
+            if tile != FIRST_PLAYER_TILE
         ]
 
+    def score_game_end(self) -> None:
+        """ Add the bonus points of the wall at the end of the game """
+        self.point_total += self.wall.count_bonus_points()
+
     def __repr__(self) -> str:
         points = f"Total points: {self.point_total}."
         minus = f"This round's minus points (floor line):{self.floor_line}"
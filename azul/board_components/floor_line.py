@@ -36,9 +36,10 @@ class FloorLine(List[Tile]):
         add_this = [other.tile] * other.count
         return super().__add__(add_this)
 
-    def __iadd__(self, other: TileCounter) -> None:
+    def __iadd__(self, other: TileCounter) -> "FloorLine":
         """ Adds new tiles to the floor line tiles """
-        return FloorLine(self.__add__(other))
+        self.extend([other.tile] * other.count)
+        return self
 
     def count_minus_points(self) -> int:
         """ Returns to number of minus game points """
@@ -46,5 +47,5 @@ class FloorLine(List[Tile]):
         return FloorLine.negative_point_mapping.get(x, 14)
 
     def __repr__(self):
-        tiles = ", ".join(x.style for x in self)
+        tiles = ", ".join(map(str, self))
         return f"{tiles} - ({self.count_minus_points()} minus points)"
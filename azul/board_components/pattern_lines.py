@@ -1,5 +1,5 @@
-from typing import Union, Literal, List
-from tiles import TileCounter
+from typing import Literal, List, Optional
+from tiles import Tile, TileCounter
 
 
 class PatternLines:
@@ -39,13 +39,9 @@ class PatternLinesRows:
         self.spaces = [None] * capacity
 
     @property
-    def row_style(self) -> Union[None, str]:
-        """Return the Tile.style of tiles in this row. None if row is empty"""
-        if self.spaces[0] is None:
-            return None
-        else:
-            tile = self.spaces[0]
-            return tile.style
+    def row_style(self) -> Optional[Tile]:
+        """Return the Tile type of tiles in this row. None if row is empty"""
+        return self.spaces[0]
 
     @property
     def free_spaces(self) -> int:
@@ -57,6 +53,13 @@ class PatternLinesRows:
         """ Returns how many spaces are occupied by tiles """
         return sum(1 for x in self.spaces if x is not None)
 
+    def accepts(self, tile: Tile) -> bool:
+        """ Check whether <tile> can be added to this row """
+        first = self.spaces[0]
+        if first is None:
+            return True
+        return first == tile and self.spaces[-1] is None
+
     def flush_row(self) -> List[None]:
         """ Flush all tiles from the spaces. That is, fill them with Nones.
         This is only possible when all spaces are occupied. """
@@ -69,7 +72,7 @@ Cannot flush row until it's full: {self}"
 
     def __iadd__(self, other: TileCounter):
         """ Add a TileCounter to this row """
-        self._validate_style(incoming_style=other.tile.style)
+        self._validate_style(incoming_style=other.tile)
         self._validate_available_space(incoming_tile_count=other.count)
 
         fill_start = self.used_spaces
@@ -84,7 +87,7 @@ Cannot flush row until it's full: {self}"
             ["-"*8 if v is None else str(v).ljust(8) for v in self.spaces]
         )
 
-    def _validate_style(self, incoming_style: str) -> None:
+    def _validate_style(self, incoming_style: Tile) -> None:
         """ Raise error when the incoming tile style is incompatible with \
 the row """
         if self.row_style is not None:
@@ -1,7 +1,33 @@
-from typing import Literal
+from typing import Literal, Optional
 from tiles import Tile
 
 
+# Space (row_nr, col_nr) of the wall is bit 5 * row_nr + col_nr of a bitboard
+ROW_MASKS = [0b11111 << 5 * row_nr for row_nr in range(5)]
+COLUMN_MASKS = [sum(1 << 5 * row_nr + col_nr for row_nr in range(5)) for col_nr in range(5)]
+ROW_STARTS = sum(1 << 5 * row_nr for row_nr in range(5))
+
+
+def _run_length(line: int, index: int) -> int:
+    """ The length of the run of occupied spaces in <line> through <index> """
+    length = 0
+    while index - 1 >= 0 and line >> index - 1 & 1:
+        index -= 1
+    while index < 5 and line >> index & 1:
+        length += 1
+        index += 1
+    return length
+
+
+# RUN_LENGTHS[line << 3 | index]: the length of the run through <index> of a
+# row or column of which the occupied spaces are the 5-bit <line>
+RUN_LENGTHS = [
+    _run_length(line, index) if index < 5 else 0
+    for line in range(32)
+    for index in range(8)
+]
+
+
 class Wall:
     """
     The Wall area is located on each player's board.
@@ -16,14 +42,41 @@ class Wall:
     Note that:
     - no tile type can occur more than once in any row / column in the grid.
     - when moving a tile from a pattern line onto the wall, the
-        tile has to be added to the same row on the wall as the pattern line.
+        tile has to be added to the same row on the wall as the pattern line,
+        in the column that is printed for its type (see `column_for`).
     - when moving tiles onto the wall, the player is rewarded points. The
         number of points is based on the number of directly adjacent tiles on
         the wall.
+
+    The wall is a set of bitboards: one with the occupied spaces, the same
+    transposed (column by column), and one per tile type. Legality checks are
+    a mask test, and the points of a placement are two lookups in RUN_LENGTHS.
     """
+    __slots__ = ("occupied", "transposed", "styles")
+
     def __init__(self):
-        self.rows = {i: WallSequence() for i in range(5)}
-        self.columns = {i: WallSequence() for i in range(5)}
+        self.occupied = 0
+        self.transposed = 0
+        self.styles = [0] * 5
+
+    @staticmethod
+    def column_for(tile: Tile, row_nr: Literal[0, 1, 2, 3, 4]) -> int:
+        """ The column of the wall in which <tile> goes on row <row_nr> """
+        return (tile + row_nr) % 5
+
+    def can_add_tile(
+        self,
+        tile: Tile,
+        row_nr: Literal[0, 1, 2, 3, 4],
+        col_nr: Literal[0, 1, 2, 3, 4]
+    ) -> bool:
+        """ Check whether the space is free and <tile> not yet in its row or column """
+        if self.occupied >> 5 * row_nr + col_nr & 1:
+            return False
+        return not self.styles[tile] & (ROW_MASKS[row_nr] | COLUMN_MASKS[col_nr])
+
+    def has_tile_in_row(self, tile: Tile, row_nr: Literal[0, 1, 2, 3, 4]) -> bool:
+        return bool(self.styles[tile] & ROW_MASKS[row_nr])
 
     def add_tile(
         self,
@@ -32,15 +85,12 @@ class Wall:
         col_nr: Literal[0, 1, 2, 3, 4]
     ) -> None:
         """ Add tile to the wall """
-        not_yet_in_row = tile not in self.rows[row_nr]
-        not_yet_in_col = tile not in self.columns[col_nr]
-
-        if not_yet_in_row and not_yet_in_col:
-            self.rows[row_nr][col_nr] = tile
-            self.columns[col_nr][row_nr] = tile
-        else:
+        if not self.can_add_tile(tile, row_nr, col_nr):
             msg = f"Cannot add {tile} to #{col_nr} in row #{row_nr}"
             raise ValueError(msg)
+        self.occupied |= 1 << 5 * row_nr + col_nr
+        self.transposed |= 1 << 5 * col_nr + row_nr
+        self.styles[tile] |= 1 << 5 * row_nr + col_nr
 
     def count_points_tile(
         self,
@@ -48,80 +98,69 @@ class Wall:
         col_nr: Literal[0, 1, 2, 3, 4]
     ) -> int:
         """Returns the number of points awarded for adding tile on the wall"""
-        horizontal = self.rows[row_nr].count_one_dimension(col_nr)
-        vertical = self.columns[col_nr].count_one_dimension(row_nr)
+        row = self.occupied >> 5 * row_nr & 0b11111
+        if not row >> col_nr & 1:
+            raise ValueError(f"Cannot count the points of unoccupied space \
+#{col_nr} in row #{row_nr}")
+        column = self.transposed >> 5 * col_nr & 0b11111
+        horizontal = RUN_LENGTHS[row << 3 | col_nr]
+        vertical = RUN_LENGTHS[column << 3 | row_nr]
 
         if horizontal > 1 and vertical > 1:
-            points = horizontal + vertical
-        else:
-            points = max([horizontal, vertical])
-        return points
+            return horizontal + vertical
+        return horizontal if horizontal > vertical else vertical
+
+    def row_bits(self, row_nr: Literal[0, 1, 2, 3, 4]) -> int:
+        """ The occupied columns of row <row_nr>, as a 5-bit mask """
+        return self.occupied >> 5 * row_nr & 0b11111
+
+    def tile_at(
+        self, row_nr: Literal[0, 1, 2, 3, 4], col_nr: Literal[0, 1, 2, 3, 4]
+    ) -> Optional[Tile]:
+        bit = 1 << 5 * row_nr + col_nr
+        for code, style in enumerate(self.styles):
+            if style & bit:
+                return Tile(code)
+        return None
 
     def __repr__(self) -> str:
-        return "\n".join(str(row) for row in self.rows.values())
+        return "\n".join(
+            " | ".join(
+                '-'*8 if tile is None else str(tile).center(8)
+                for tile in (self.tile_at(row_nr, col_nr) for col_nr in range(5))
+            )
+            for row_nr in range(5)
+        )
+
+    @property
+    def full_rows(self) -> int:
+        """ The number of complete rows """
+        occupied = self.occupied
+        full = occupied & occupied >> 1 & occupied >> 2 & occupied >> 3 & occupied >> 4
+        return bin(full & ROW_STARTS).count("1")
+
+    @property
+    def full_columns(self) -> int:
+        """ The number of complete columns """
+        occupied = self.occupied
+        full = occupied & occupied >> 5 & occupied >> 10 & occupied >> 15 & occupied >> 20
+        return bin(full & 0b11111).count("1")
 
     @property
     def is_finished(self) -> bool:
         """ Check if the wall contains a fully completed row, which would mark
         the end of the game. """
-        return any(row.is_full for row in self.rows.values())
-
-
-class WallSequence(list):
-    """ This class represents a row or column on the wall area """
-
-    def __init__(self):
-        super().__init__([None]*5)
+        occupied = self.occupied
+        return bool(
+            occupied & occupied >> 1 & occupied >> 2 & occupied >> 3 & occupied >> 4
+            & ROW_STARTS
+        )
 
-    def count_one_dimension(self, index: Literal[1, 2, 3, 4, 5]) -> int:
+    def count_bonus_points(self) -> int:
         """
-        Returns the number of adjacently occupied fields to the tile at 'index'
+        Returns the points awarded at the end of the game: 2 for every
+        complete row, 7 for every complete column and 10 for every tile type
+        of which all 5 tiles are on the wall
         """
-
-        anchor_tile_index = index - 1
-        if self[anchor_tile_index] is None:
-            raise ValueError(f"Cannot count the points of unoccupied space.\
-Trying to count element #{index} of {self}")
-        point_counter = 1
-
-        # count left-adjacent occupied tiles
-        leftmost_spot = anchor_tile_index == 0
-        left_tile_index = anchor_tile_index - 1
-
-        # check whether left tile is out of  bounds, i.e. check if
-        # left_tile_index is negative:
-        if not leftmost_spot:
-            while (self[left_tile_index] is not None) and not leftmost_spot:
-                point_counter += 1
-                left_tile_index -= 1
-                leftmost_spot = left_tile_index == 0
-
-        # count right-adjacent occupied tiles
-        rightmost_spot = anchor_tile_index == 4
-        right_tile_index = anchor_tile_index + 1
-
-        # check whether right tile is not out of bounds
-        if not rightmost_spot:
-            while (self[right_tile_index] is not None) and not rightmost_spot:
-                point_counter += 1
-                right_tile_index += 1
-                rightmost_spot = right_tile_index == 4
-
-        return point_counter
-
-    def __setitem__(self, index: int, value: Tile) -> None:
-        if value in self:
-            msg = f"This end-state sequence ({self}) already contains {value}.\
-You can only place new tile types in this row"
-            raise ValueError(msg)
-        super().__setitem__(index, value)
-
-    def __repr__(self) -> str:
-        return " | ".join(
-            '-'*8 if t is None else str(t).center(8) for t in self
-        )
-
-    @property
-    def is_full(self) -> bool:
-        """ Check if the sequence is completely filled with tiles """
-        return all(val is not None for val in self)
+        complete_styles = sum(bin(style).count("1") == 5 for style in self.styles)
+        return 2 * self.full_rows + 7 * self.full_columns + 10 * complete_styles
@@ -0,0 +1,179 @@
+"""
+The list-based wall that the bitboard Wall replaced, and a differential
+check of the two: random walls are filled tile by tile on both, and every
+placement must be equally legal and score the same points.
+
+    $ cd azul && python3 -m board_components.wall_check
+"""
+from collections import Counter
+import random
+from typing import Literal, Optional
+
+from board_components.wall import Wall
+from tiles import Tile
+
+
+class ReferenceWall:
+    """
+    The Wall area as a dict of rows and a dict of columns, which store every
+    tile twice.
+
+    This is how the wall was implemented before the bitboard Wall. Placing
+    a tile does not check whether its space is free.
+    """
+    def __init__(self):
+        self.rows = {i: WallSequence() for i in range(5)}
+        self.columns = {i: WallSequence() for i in range(5)}
+
+    @staticmethod
+    def column_for(tile: Tile, row_nr: Literal[0, 1, 2, 3, 4]) -> int:
+        """ The column of the wall in which <tile> goes on row <row_nr> """
+        return (tile + row_nr) % 5
+
+    def add_tile(
+        self,
+        tile: Tile,
+        row_nr: Literal[0, 1, 2, 3, 4],
+        col_nr: Literal[0, 1, 2, 3, 4]
+    ) -> None:
+        """ Add tile to the wall """
+        not_yet_in_row = tile not in self.rows[row_nr]
+        not_yet_in_col = tile not in self.columns[col_nr]
+
+        if not_yet_in_row and not_yet_in_col:
+            self.rows[row_nr][col_nr] = tile
+            self.columns[col_nr][row_nr] = tile
+        else:
+            msg = f"Cannot add {tile} to #{col_nr} in row #{row_nr}"
+            raise ValueError(msg)
+
+    def count_points_tile(
+        self,
+        row_nr: Literal[0, 1, 2, 3, 4],
+        col_nr: Literal[0, 1, 2, 3, 4]
+    ) -> int:
+        """Returns the number of points awarded for adding tile on the wall"""
+        horizontal = self.rows[row_nr].count_one_dimension(col_nr)
+        vertical = self.columns[col_nr].count_one_dimension(row_nr)
+
+        if horizontal > 1 and vertical > 1:
+            points = horizontal + vertical
+        else:
+            points = max([horizontal, vertical])
+        return points
+
+    def __repr__(self) -> str:
+        return "\n".join(str(row) for row in self.rows.values())
+
+    @property
+    def is_finished(self) -> bool:
+        """ Check if the wall contains a fully completed row, which would mark
+        the end of the game. """
+        return any(row.is_full for row in self.rows.values())
+
+    def count_bonus_points(self) -> int:
+        """
+        Returns the points awarded at the end of the game: 2 for every
+        complete row, 7 for every complete column and 10 for every tile type
+        of which all 5 tiles are on the wall
+        """
+        full_rows = sum(row.is_full for row in self.rows.values())
+        full_columns = sum(column.is_full for column in self.columns.values())
+        tile_counts = Counter(
+            tile for row in self.rows.values() for tile in row if tile is not None
+        )
+        complete_styles = sum(count == 5 for count in tile_counts.values())
+        return 2 * full_rows + 7 * full_columns + 10 * complete_styles
+
+
+class WallSequence(list):
+    """ This class represents a row or column on the wall area """
+
+    def __init__(self):
+        super().__init__([None]*5)
+
+    def count_one_dimension(self, index: Literal[0, 1, 2, 3, 4]) -> int:
+        """
+        Returns the number of adjacently occupied fields to the tile at 'index'
+        """
+        if self[index] is None:
+            raise ValueError(f"Cannot count the points of unoccupied space.\
+Trying to count element #{index} of {self}")
+        point_counter = 1
+
+        # count left-adjacent occupied tiles
+        left_tile_index = index - 1
+        while left_tile_index >= 0 and self[left_tile_index] is not None:
+            point_counter += 1
+            left_tile_index -= 1
+
+        # count right-adjacent occupied tiles
+        right_tile_index = index + 1
+        while right_tile_index < len(self) and self[right_tile_index] is not None:
+            point_counter += 1
+            right_tile_index += 1
+
+        return point_counter
+
+    def __setitem__(self, index: int, value: Tile) -> None:
+        if value in self:
+            msg = f"This end-state sequence ({self}) already contains {value}.\
+You can only place new tile types in this row"
+            raise ValueError(msg)
+        super().__setitem__(index, value)
+
+    def __repr__(self) -> str:
+        return " | ".join(
+            '-'*8 if t is None else str(t).center(8) for t in self
+        )
+
+    @property
+    def is_full(self) -> bool:
+        """ Check if the sequence is completely filled with tiles """
+        return all(val is not None for val in self)
+
+
+def differential_check(n_walls: int = 2000, seed: Optional[int] = None) -> int:
+    """
+    Fill <n_walls> random walls on both implementations, placing tiles of
+    random types in random free spaces, and compare every placement. Returns
+    the number of placements checked; raises AssertionError on a difference.
+    """
+    rng = random.Random(seed)
+    tiles = [Tile(code) for code in range(5)]
+    placements = 0
+    for _ in range(n_walls):
+        wall, reference = Wall(), ReferenceWall()
+        # Either the printed pattern of the game, or any free space
+        pattern = rng.random() < 0.5
+        spaces = [(row_nr, col_nr) for row_nr in range(5) for col_nr in range(5)]
+        rng.shuffle(spaces)
+        for row_nr, col_nr in spaces:
+            if pattern:
+                tile = tiles[(col_nr - row_nr) % 5]
+            else:
+                tile = rng.choice(tiles)
+
+            reference_legal = (
+                tile not in reference.rows[row_nr]
+                and tile not in reference.columns[col_nr]
+            )
+            assert wall.can_add_tile(tile, row_nr, col_nr) == reference_legal
+            assert wall.has_tile_in_row(tile, row_nr) == (tile in reference.rows[row_nr])
+            if not reference_legal:
+                continue
+
+            wall.add_tile(tile, row_nr, col_nr)
+            reference.add_tile(tile, row_nr, col_nr)
+            assert wall.count_points_tile(row_nr, col_nr) == reference.count_points_tile(
+                row_nr, col_nr
+            ), f"{wall}\nplacing at {row_nr}, {col_nr}"
+            assert wall.is_finished == reference.is_finished
+            assert wall.count_bonus_points() == reference.count_bonus_points()
+            assert repr(wall) == repr(reference)
+            placements += 1
+    return placements
+
+
+if __name__ == "__main__":
+    print(f"{differential_check(seed=0)} placements scored the same")
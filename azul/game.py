@@ -1,17 +1,47 @@
-# TODO: Handle round ends in TheGame
 # TODO: Add logging
 
-from typing import Dict, List
-import time
-from random import choice
-from itertools import cycle
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+import random
 
-from game_pieces import TheMiddle, Pouch, Factory
-from tiles import Tile, TileCounter
+from board import FIRST_PLAYER_TILE, FLOOR
+from game_pieces import BoxLid, TheMiddle, Pouch, Factories
+from tiles import COLORS, Tile, TileCounter
 from player import Player
 
+if TYPE_CHECKING:
+    from agents import Agent
+
+
+# The source number of a move that takes tiles from the middle
+MIDDLE = -1
+
+
+class Move(NamedTuple):
+    """
+    A single turn: take all tiles of type <tile> from factory <source> (or
+    from the middle, MIDDLE) and add them to pattern line <row_nr> (1-5), or
+    to the floor line (FLOOR)
+    """
+    source: int
+    tile: Tile
+    row_nr: int
+
+    def __repr__(self) -> str:
+        source = "the middle" if self.source == MIDDLE else f"factory {self.source}"
+        row = "the floor line" if self.row_nr == FLOOR else f"row {self.row_nr}"
+        return f"{self.tile} from {source} to {row}"
+
 
 class TheGame:
+    """
+    The engine of a game of Azul. It never asks anybody anything: whoever
+    plays the game (see agents.py) asks for the legal_moves of the current
+    player and picks one to apply_move. Rounds end and start by themselves,
+    until is_over.
+
+    All randomness comes from <rng>, or from a new random.Random(<seed>). The
+    same seed deals the same tiles.
+    """
 
     factory_count_mapping = {
         2: 5,
@@ -22,118 +52,227 @@ class TheGame:
     def __init__(
         self,
         player_names: List[str],
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
     ):
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.player_names = list(player_names)
         self.players = {name: Player(name) for name in player_names}
-        self.starting_player = choice(player_names)
+        self.starting_player = self.rng.choice(self.player_names)
         self.current_player = self.starting_player
 
-        self.pouch = Pouch()
+        self.box_lid = BoxLid()
+        self.pouch = Pouch(self.rng, box_lid=self.box_lid)
         self.the_middle = TheMiddle()
-        self.factories = self._fill_factories()
-
-        self.player_cycle = cycle(player_names)
-        self._move_to_starting_player()
-
-    def play_round(self) -> None:
-        while not self.round_has_ended:
-            for player_name in self.player_cycle:
-                self.current_player = player_name
-                self.run_current_player_turn()
-
-    def run_current_player_turn(self) -> None:
-        """ Complete a player's turn """
-        time.sleep(1)
-        self.show_turn_start_message()
-
-        while True:
-            from_the_middle = input("Are you picking from the middle? (y/n) ")
-            if from_the_middle.lower() == "y":
-                self.player_pick_tile_from_middle()
-                break
-            elif from_the_middle.lower() == "n":
-                self.player_pick_tile_from_factory()
-                break
-            else:
-                print("Please use 'n' or 'y' to respond..")
-
-    def player_pick_tile_from_factory(self) -> None:
-        factory_nr = int(input("What factory are you choosing from? "))
-        style = int(input("What tile type or you picking? (0=black, 1=blue, 2=red, 3=yellow, 4=white) "))
-
-        tile = Tile(style)
-
-        tile_count = self.factories[factory_nr].pop(tile)
-        tile_counter = TileCounter(tile, tile_count)
-
-        # Add factory leftovers to the middle
-        factory_leftover = self.factories[factory_nr]
-        for k, v in factory_leftover.items():
-            self.the_middle[k] += v
-
-        # Make sure that the factory is empty
-        self.factories[factory_nr] = Factory()
+        self.factories = Factories(TheGame.factory_count_mapping[len(self.players)])
+        self._fill_factories()
+
+        self.round_nr = 1
+        self.is_over = False
+        # What make_move changed, for unmake_move to take back
+        self.journal: List[tuple] = []
+
+    def play(self, agents: Dict[str, "Agent"]) -> None:
+        """ Play the game to its end, every player with its agent """
+        while not self.is_over:
+            self.play_turn(agents[self.current_player])
+
+    def play_round(self, agents: Dict[str, "Agent"]) -> None:
+        """ Play until the current round is over """
+        round_nr = self.round_nr
+        while self.round_nr == round_nr and not self.is_over:
+            self.play_turn(agents[self.current_player])
+
+    def play_turn(self, agent: "Agent") -> None:
+        """ Let <agent> choose the move of the current player """
+        self.apply_move(agent.choose_move(self, self.legal_moves()))
+
+    def legal_moves(self) -> List[Move]:
+        """ All moves the current player can make """
+        board = self.players[self.current_player].board
+        counts = self.factories.counts
+        sources = [(MIDDLE, self.the_middle.counts)] + [
+            (nr, counts[5 * nr : 5 * nr + 5])
+            for nr, total in enumerate(self.factories.totals)
+            if total
+        ]
+
+        # Where a tile type can go only depends on the board, not the source
+        rows: Dict[Tile, List[int]] = {}
+        moves = []
+        for source, tile_counts in sources:
+            for tile in COLORS:
+                if not tile_counts[tile]:
+                    continue
+                tile_rows = rows.get(tile)
+                if tile_rows is None:
+                    tile_rows = rows[tile] = [
+                        row_nr for row_nr in range(1, 6) if board.can_place(tile, row_nr)
+                    ] + [FLOOR]
+                moves.extend(Move(source, tile, row_nr) for row_nr in tile_rows)
+        return moves
+
+    def apply_move(self, move: Move) -> None:
+        """
+        Make <move> for the current player and pass the turn. The last move
+        of a round ends the round, and possibly the game. Moves made with
+        make_move before can no longer be taken back.
+        """
+        self._check_move(move)
+        self.journal.clear()
+        if move.source == MIDDLE:
+            self.player_pick_tile_from_middle(move)
+        else:
+            self.player_pick_tile_from_factory(move)
+
+        if self.round_has_ended:
+            self._end_round()
+        else:
+            self._next_player()
+
+    def make_move(self, move: Move) -> None:
+        """
+        Make <move> like apply_move, but such that unmake_move can take it
+        back, for lookahead within a round. The round does not end after its
+        last move: the turn passes, and there are no legal moves left until
+        the round is ended with apply_move.
+        """
+        self._check_move(move)
+        board = self.players[self.current_player].board
+        if move.source == MIDDLE:
+            taken = self.the_middle[move.tile]
+        else:
+            taken = self.factories.counts[5 * move.source : 5 * move.source + 5]
+        row_used = 0
+        if move.row_nr != FLOOR:
+            row_used = board.pattern_lines.grid[move.row_nr].used_spaces
+        self.journal.append((
+            move,
+            self.current_player,
+            self.starting_player,
+            self.the_middle.is_untouched,
+            taken,
+            row_used,
+            len(board.floor_line),
+        ))
+
+        if move.source == MIDDLE:
+            self.player_pick_tile_from_middle(move)
+        else:
+            self.player_pick_tile_from_factory(move)
+        self._next_player()
+
+    def unmake_move(self) -> Move:
+        """ Take back the last move of make_move, returns that move """
+        if not self.journal:
+            raise ValueError("There is no move to take back")
+        (
+            move, player, starting_player, is_untouched, taken, row_used, floor_used
+        ) = self.journal.pop()
+        self.current_player = player
+        self.players[player].board.take_back(move.row_nr, row_used, floor_used)
+        if move.source == MIDDLE:
+            self.the_middle.put(move.tile, taken)
+            self.the_middle.is_untouched = is_untouched
+            self.starting_player = starting_player
+        else:
+            self.factories.put_back(move.source, move.tile, taken, self.the_middle)
+        return move
+
+    def _check_move(self, move: Move) -> None:
+        """ Raise a ValueError if the current player cannot make <move> """
+        if self.is_over:
+            raise ValueError("The game is over")
+        board = self.players[self.current_player].board
+        if move.source == MIDDLE:
+            count = self.the_middle[move.tile]
+        elif 0 <= move.source < len(self.factories):
+            count = self.factories.count(move.source, move.tile)
+        else:
+            count = 0
+        if not count:
+            raise ValueError(f"There is no {move.tile} to take in {move}")
+        if not board.can_place(move.tile, move.row_nr):
+            raise ValueError(f"{self.current_player} cannot play {move}")
+
+    def player_pick_tile_from_factory(self, move: Move) -> None:
+        # Leaves the factory empty, with its leftovers in the middle
+        tile_count = self.factories.take(move.source, move.tile, self.the_middle)
+        tile_counter = TileCounter(move.tile, tile_count)
 
         # Add tiles to player's pattern lines
-        self.players[self.current_player].board.add_tile_count(tile_counter)
+        self.players[self.current_player].board.add_tile_count(tile_counter, move.row_nr)
 
-    def player_pick_tile_from_middle(self) -> None:
+    def player_pick_tile_from_middle(self, move: Move) -> None:
         """
         Handle everything if a player choses to draw from the middle.
         This includes taking the starting player marker, but also removing tile
         type from the middle and adding it to the pattern lines
         """
+        board = self.players[self.current_player].board
         if self.the_middle.is_untouched:
             self.starting_player = self.current_player
             self.the_middle.is_untouched = False
-            minus_counter = TileCounter(Tile(99), 1)
-            self.players[self.current_player].board.floor_line += minus_counter
-
-        style = int(input("What tile type or you picking? (0=black, 1=blue, 2=red, 3=yellow, 4=white) "))
-        tile = Tile(style)
-
-        tile_count = self.the_middle.pop(tile)
-        tile_counter = TileCounter(tile, tile_count)
-
-        self.players[self.current_player].board.add_tile_count(tile_counter)
-
-    def show_turn_start_message(self) -> None:
-        """ At the start of each turn this message is shown """
-        factories = '\n'.join(f" {k}: {v}" for k, v in self.factories.items())
-        print("\n")
-        print("-" * 50)
-        print("\n")
-        print(f"{self.current_player} it's your turn!")
-        print(f"Factories:\n{factories}")
-        print(f"The middle:\n{self.the_middle}")
-        print(f"Your board:\n{self.players[self.current_player].board}")
-
-    def _fill_factories(self) -> Dict[int, Factory]:
-        """ Fill all factories with 4 tiles each from the pouch """
-        factory_count = TheGame.factory_count_mapping[len(self.players)]
-        return {i: self._fill_factory() for i in range(factory_count)}
-
-    def _fill_factory(self) -> Factory:
-        """ Fill a factory with 4 tiles from the pouch """
-        factory = Factory()
-        four_tiles = self.pouch.take_four()
-        for tile in four_tiles:
-            factory[tile] += 1
-        return factory
-
-    def _move_to_starting_player(self) -> None:
-        """ Iterate through player cycle until starting player is found """
-        for player_name in self.player_cycle:
-            if player_name == self.starting_player:
-                break
+            board.floor_line += TileCounter(FIRST_PLAYER_TILE, 1)
+
+        tile_count = self.the_middle.take(move.tile)
+        board.add_tile_count(TileCounter(move.tile, tile_count), move.row_nr)
+
+    def _next_player(self) -> None:
+        index = self.player_names.index(self.current_player)
+        self.current_player = self.player_names[(index + 1) % len(self.player_names)]
+
+    def _end_round(self) -> None:
+        """
+        Tile the walls and score the round. The game ends after the round
+        in which a player completed a row of their wall. Otherwise the next
+        round starts with whoever took the first tiles from the middle.
+        """
+        for player in self.players.values():
+            player.handle_round_end(self.box_lid)
+
+        if self.game_will_end:
+            self._end_game()
+            return
+
+        self.round_nr += 1
+        self.the_middle.reset()
+        self._fill_factories()
+        self.current_player = self.starting_player
+        # Not a single tile left to play with
+        if self.round_has_ended:
+            self._end_game()
+
+    def _end_game(self) -> None:
+        for player in self.players.values():
+            player.board.score_game_end()
+        self.is_over = True
+
+    @property
+    def winners(self) -> List[str]:
+        """
+        The players with the most points. Ties go to the player with the
+        most complete rows on their wall, and are shared otherwise.
+        """
+        def rank(name: str):
+            board = self.players[name].board
+            return board.point_total, board.wall.full_rows
+
+        best = max(rank(name) for name in self.player_names)
+        return [name for name in self.player_names if rank(name) == best]
+
+    def _fill_factories(self) -> None:
+        """
+        Fill all (empty) factories with 4 tiles each from the pouch, which is
+        refilled from the box lid when it runs empty
+        """
+        self.factories.fill(self.pouch)
 
     @property
     def round_has_ended(self) -> bool:
         """Check if all factories and the middle are empty. If so, the current
         round is done. """
-        check1 = all(factory.is_empty for factory in self.factories.values())
-        check2 = self.the_middle.is_empty
-
-        return check1 & check2
+        return self.factories.is_empty and self.the_middle.is_empty
 
     @property
     def game_will_end(self) -> bool:
@@ -141,5 +280,5 @@ class TheGame:
         their end-state tile area """
         return any(
             player.board.wall.is_finished
-            for player in self.players
+            for player in self.players.values()
         )
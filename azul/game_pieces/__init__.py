@@ -1,3 +1,4 @@
-from .factory import Factory
+from .box_lid import BoxLid
+from .factory import Factories, Factory
 from .pouch import Pouch
 from .the_middle import TheMiddle
@@ -0,0 +1,37 @@
+from typing import List
+
+from tiles import TileCounter
+
+
+class BoxLid:
+    """
+    The lid of the game box, where discarded tiles go: the tiles left over
+    from full pattern lines and the tiles on the floor lines. When the pouch
+    runs empty, it is refilled with the tiles in the lid.
+
+    The lid only keeps a count per tile type.
+    """
+    __slots__ = ("counts", "total")
+
+    def __init__(self, counts: List[int] = None):
+        self.counts = list(counts) if counts is not None else [0] * 5
+        self.total = sum(self.counts)
+
+    def __iadd__(self, other: TileCounter) -> "BoxLid":
+        """ Discard tiles into the lid """
+        self.counts[other.tile] += other.count
+        self.total += other.count
+        return self
+
+    def __len__(self) -> int:
+        return self.total
+
+    def empty(self) -> List[int]:
+        """ Take all tiles out of the lid, returns their counts per type """
+        counts = self.counts
+        self.counts = [0] * 5
+        self.total = 0
+        return counts
+
+    def __repr__(self) -> str:
+        return f"Box lid: {self.total} tiles"
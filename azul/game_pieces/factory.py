@@ -1,17 +1,137 @@
-from collections import defaultdict
+from array import array
+from typing import Iterable, Optional
+from tiles import COLORS, Tile
 
 
-class Factory(defaultdict):
+_EMPTY = array("B", bytes(len(COLORS)))
+
+
+def _describe(counts: Iterable[int]) -> str:
+    return ", ".join(f"{count} x {tile}" for tile, count in zip(COLORS, counts) if count)
+
+
+class Factory:
     """
     This class represents the factories that are filled with 4 tiles at the
     start of each round.
+
+    A factory only keeps a count per tile type, and the total of the counts.
+    """
+    __slots__ = ("counts", "total")
+
+    def __init__(self, counts: Optional[Iterable[int]] = None):
+        self.counts = list(counts) if counts is not None else [0] * len(COLORS)
+        self.total = sum(self.counts)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.total
+
+    def __getitem__(self, tile: Tile) -> int:
+        return self.counts[tile]
+
+    def add(self, counts: Iterable[int]) -> None:
+        """ Add tiles, as counts per tile type """
+        own = self.counts
+        for tile, count in enumerate(counts):
+            if count:
+                own[tile] += count
+                self.total += count
+
+    def take(self, tile: Tile) -> int:
+        """ Take all tiles of type <tile>, returns how many there were """
+        count = self.counts[tile]
+        self.counts[tile] = 0
+        self.total -= count
+        return count
+
+    def put(self, tile: Tile, count: int) -> None:
+        """ Put <count> tiles of type <tile> (back) into the factory """
+        self.counts[tile] += count
+        self.total += count
+
+    def clear(self) -> None:
+        self.counts = [0] * len(COLORS)
+        self.total = 0
+
+    def __repr__(self):
+        return _describe(self.counts)
+
+
+class Factories:
+    """
+    All factories of a game, numbered from 0.
+
+    The tile counts of all factories are kept in a single array, five counts
+    per factory: the count of <tile> in factory <nr> is counts[5 * nr + tile].
+    The total per factory and over all factories is kept up to date, so
+    checking whether the factories are empty costs nothing.
     """
-    def __init__(self):
-        super().__init__(lambda: 0)
+    __slots__ = ("counts", "totals", "total")
+
+    def __init__(self, n_factories: int, counts: Optional[Iterable[int]] = None):
+        size = 5 * n_factories
+        self.counts = array("B", counts if counts is not None else bytes(size))
+        if len(self.counts) != size:
+            raise ValueError(f"Expected {size} tile counts for {n_factories} factories")
+        self.totals = [sum(self.counts[5 * nr : 5 * nr + 5]) for nr in range(n_factories)]
+        self.total = sum(self.totals)
+
+    def __len__(self) -> int:
+        return len(self.totals)
 
     @property
-    def is_empty(self):
-        return sum(self.values()) == 0
+    def is_empty(self) -> bool:
+        return not self.total
+
+    def count(self, nr: int, tile: Tile) -> int:
+        """ The number of tiles of type <tile> in factory <nr> """
+        return self.counts[5 * nr + tile]
+
+    def take(self, nr: int, tile: Tile, the_middle: Factory) -> int:
+        """
+        Take all tiles of type <tile> from factory <nr> and push the other
+        tiles to <the_middle>. Returns the number of tiles taken.
+        """
+        counts = self.counts
+        base = 5 * nr
+        count = counts[base + tile]
+        counts[base + tile] = 0
+        if count < self.totals[nr]:
+            the_middle.add(counts[base : base + 5])
+        counts[base : base + 5] = _EMPTY
+        self.total -= self.totals[nr]
+        self.totals[nr] = 0
+        return count
+
+    def put_back(self, nr: int, tile: Tile, counts: array, the_middle: Factory) -> None:
+        """
+        Undo a take of <tile> from factory <nr>: the factory holds <counts>
+        again, and the other tiles leave <the_middle>
+        """
+        base = 5 * nr
+        self.counts[base : base + 5] = counts
+        total = sum(counts)
+        if counts[tile] < total:
+            leftovers = [-count for count in counts]
+            leftovers[tile] = 0
+            the_middle.add(leftovers)
+        self.total += total - self.totals[nr]
+        self.totals[nr] = total
+
+    def fill(self, pouch) -> None:
+        """ Fill each factory, in order, with 4 tiles from <pouch> """
+        counts = self.counts
+        for nr in range(len(self.totals)):
+            base = 5 * nr
+            tiles = pouch.take_four()
+            for tile in tiles:
+                counts[base + tile] += 1
+            self.totals[nr] += len(tiles)
+            self.total += len(tiles)
 
     def __repr__(self):
-        return ", ".join(f"{k} x {v}" for v, k in self.items())
+        return "\n".join(
+            f" {nr}: {_describe(self.counts[5 * nr : 5 * nr + 5])}"
+            for nr in range(len(self.totals))
+        )
@@ -1,28 +1,79 @@
-from random import shuffle
-from typing import List
-from tiles import Tile, TileCounter
+import random
+from typing import List, Optional
+from tiles import COLORS, Tile, TileCounter
 
+from .box_lid import BoxLid
 
-class Pouch(List[Tile]):
+
+class Pouch:
     """
     The pouch that contains all tiles in the beginning of the game.
 
     Tiles are taken from the pouch to fill up the shared board.
-    Discarded tiles are added to the pouch once it's completely empty.
+    Discarded tiles go to the box lid, and are added to the pouch once it's
+    completely empty.
+
+    Tiles of the same type are indistinguishable, so the pouch only keeps a
+    count per type. Drawing a tile picks a type with a probability in
+    proportion to its count, which costs the same however full the pouch is.
     """
-    def __init__(self):
-        super().__init__(
-            [Tile(style) for style in range(5) for _ in range(20)]
-        )
-        shuffle(self)
+    __slots__ = ("counts", "total", "rng", "box_lid")
+
+    def __init__(
+        self,
+        rng: random.Random = random,
+        counts: Optional[List[int]] = None,
+        box_lid: Optional[BoxLid] = None,
+    ):
+        self.counts = list(counts) if counts is not None else [20] * len(COLORS)
+        self.total = sum(self.counts)
+        self.rng = rng
+        self.box_lid = box_lid if box_lid is not None else BoxLid()
+
+    def __iadd__(self, other: TileCounter) -> "Pouch":
+        """ Put tiles back into the pouch """
+        self.counts[other.tile] += other.count
+        self.total += other.count
+        return self
 
-    def __add__(self, other: TileCounter):
-        add_this = [other.tile] * other.count
-        super().__add__(self, add_this)
-        shuffle(self)
+    def __len__(self) -> int:
+        return self.total
+
+    def refill(self) -> None:
+        """ Put all tiles of the box lid into the pouch """
+        for tile, count in enumerate(self.box_lid.empty()):
+            self.counts[tile] += count
+            self.total += count
+
+    def draw(self) -> Optional[Tile]:
+        """
+        Take a random tile from the pouch, after refilling it from the box
+        lid if it is empty. Returns None if there are no tiles left at all.
+        """
+        if not self.total:
+            self.refill()
+            if not self.total:
+                return None
+        r = self.rng.randrange(self.total)
+        counts = self.counts
+        for tile in COLORS:
+            count = counts[tile]
+            if r < count:
+                counts[tile] = count - 1
+                self.total -= 1
+                return tile
+            r -= count
+        raise AssertionError("The tile counts do not add up")
 
     def take_four(self, n: int = 4) -> List[Tile]:
-        """ Take last n tiles from pouch """
-        take = self[-n:]
-        del self[-n:]
+        """ Take n random tiles from the pouch (fewer if all tiles run out) """
+        take = []
+        for _ in range(n):
+            tile = self.draw()
+            if tile is None:
+                break
+            take.append(tile)
         return take
+
+    def __repr__(self) -> str:
+        return ", ".join(f"{count} x {tile}" for tile, count in zip(COLORS, self.counts))
@@ -1,3 +1,4 @@
+from typing import Iterable, Optional
 from .factory import Factory
 
 
@@ -12,9 +13,16 @@ class TheMiddle(Factory):
     - the first player to draw from the middle is the starting player
         in the next round.
     """
-    def __init__(self):
+    __slots__ = ("is_untouched",)
+
+    def __init__(self, counts: Optional[Iterable[int]] = None):
+        self.is_untouched = True
+        super().__init__(counts)
+
+    def reset(self) -> None:
+        """ Empty the middle and put the start player marker back """
+        self.clear()
         self.is_untouched = True
-        super().__init__()
 
     def __repr__(self):
         content = super().__repr__()
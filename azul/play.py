@@ -1,8 +1,50 @@
+"""
+Play Azul in the terminal, or let random bots play many games.
+
+    $ python3 azul/play.py
+    $ python3 azul/play.py --simulate 1000 --seed 42
+"""
+import argparse
+import random
+import time
+
+from agents import RandomAgent, TerminalAgent
 from game import TheGame
 
 
+def simulate(n_games: int, player_names, seed=None) -> None:
+    """ Let random bots play <n_games> games and report how fast that went """
+    rng = random.Random(seed)
+    rounds = points = 0
+    start = time.perf_counter()
+    for _ in range(n_games):
+        game = TheGame(player_names=player_names, rng=rng)
+        agent = RandomAgent(rng)
+        game.play({name: agent for name in player_names})
+        rounds += game.round_nr
+        points += sum(p.board.point_total for p in game.players.values())
+    duration = time.perf_counter() - start
+
+    print(f"{n_games} games, {rounds / n_games:.2f} rounds on average")
+    print(f"{points / n_games / len(player_names):.2f} points per player on average")
+    print(f"{n_games / duration:.1f} games per second")
+
+
 if __name__ == "__main__":
-    participants = ["Jonas", "Hagen", "Paula", "Toffer"]
-    game = TheGame(player_names=participants)
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--simulate", type=int, default=None, metavar="GAMES",
+        help="let random bots play this many games",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
 
-    game.play_round()
+    participants = ["Jonas", "Hagen", "Paula", "Toffer"]
+    if args.simulate:
+        simulate(args.simulate, participants, args.seed)
+    else:
+        game = TheGame(player_names=participants, seed=args.seed)
+        agent = TerminalAgent()
+        game.play({name: agent for name in participants})
+        print("\n".join(str(player) for player in game.players.values()))
+        print(f"The winner: {', '.join(game.winners)}")
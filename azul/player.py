@@ -1,4 +1,4 @@
-from game_pieces import Pouch
+from game_pieces import BoxLid
 from board import PlayerBoard
 
 
@@ -7,11 +7,11 @@ class Player:
         self.name = name
         self.board = PlayerBoard()
 
-    def handle_round_end(self, pouch: Pouch) -> None:
-        """ Trigger PlayerBoard.handle_round_end and return tiles to pouch """
+    def handle_round_end(self, box_lid: BoxLid) -> None:
+        """ Trigger PlayerBoard.handle_round_end and discard tiles into the box lid """
         to_be_discarded_tiles = self.board.handle_round_end()
         for tile_counter in to_be_discarded_tiles:
-            pouch += tile_counter
+            box_lid += tile_counter
 
     def __repr__(self) -> str:
         return f"{self.name}: {self.board.point_total} points"
@@ -0,0 +1,216 @@
+"""
+A compact, canonical encoding of the state of a game of Azul.
+
+TheGame spreads its state over dozens of objects. encode packs all of it into
+a fixed-size bytes blob of STATE_SIZE bytes (for any number of players), and
+decode builds a game from a blob again. A blob is cheap to keep, compare and
+copy, which is what lookahead search and caches need:
+- clone(game) copies a game directly, object by object, which is quicker
+    than decoding a blob (but a blob is still the cheapest copy to keep)
+- state_hash(blob) is the same in every process (unlike hash() of bytes)
+- to_array(blob) views a blob as a NumPy uint8 array, if NumPy is installed
+
+The blob holds, all as unsigned integers:
+- header: number of players, round number, current and starting seat, and
+    flags (the middle is untouched, the game is over)
+- the tile count per type in the pouch, in the box lid, in the middle and
+    in each of the 9 factories (unused factories are empty)
+- per player seat (unused seats are zero): points, the type and count of
+    each pattern line, a bitmask of the occupied columns per wall row, the
+    tile count per type on the floor line and whether it holds the first
+    player marker
+
+Equal states have equal blobs: the order of tiles on the floor line does
+not matter to the game, so only counts are kept, and empty
+pattern lines are stored with type 0. The type of a wall tile follows from
+its place on the wall (see Wall.column_for). The random number generator is
+not part of the state.
+"""
+from hashlib import blake2b
+import random
+import struct
+from typing import TYPE_CHECKING, List, Optional
+
+from board import FIRST_PLAYER_TILE, PlayerBoard
+from board_components import FloorLine, PatternLines, Wall
+from board_components.pattern_lines import PatternLinesRows
+from game import TheGame
+from game_pieces import BoxLid, Factories, Factory, Pouch, TheMiddle
+from player import Player
+from tiles import COLORS, Tile, TileCounter
+
+if TYPE_CHECKING:
+    import numpy
+
+
+N_STYLES = 5
+MAX_PLAYERS = 4
+MAX_FACTORIES = max(TheGame.factory_count_mapping.values())
+TILES = COLORS
+
+MIDDLE_UNTOUCHED = 1
+GAME_OVER = 2
+
+_HEADER = "BHBBB"
+_COUNTS = f"{N_STYLES}B"
+_PLAYER = f"H5B5B5B{N_STYLES}BB"
+_FORMAT = struct.Struct(
+    "<" + _HEADER + _COUNTS * (3 + MAX_FACTORIES) + _PLAYER * MAX_PLAYERS
+)
+STATE_SIZE = _FORMAT.size
+_PLAYER_FIELDS = 1 + 5 + 5 + 5 + N_STYLES + 1
+
+
+def _counts(tiles) -> List[int]:
+    """ The tile count per type of a Factory, or of a list of tiles """
+    if isinstance(tiles, Factory):
+        return list(tiles.counts)
+    counts = [0] * N_STYLES
+    for tile in tiles:
+        if tile < N_STYLES:
+            counts[tile] += 1
+    return counts
+
+
+def encode(game: TheGame) -> bytes:
+    """ The state of <game> as a blob of STATE_SIZE bytes """
+    names = game.player_names
+    flags = MIDDLE_UNTOUCHED * game.the_middle.is_untouched + GAME_OVER * game.is_over
+    values = [
+        len(names),
+        game.round_nr,
+        names.index(game.current_player),
+        names.index(game.starting_player),
+        flags,
+    ]
+    values += game.pouch.counts
+    values += game.box_lid.counts
+    values += _counts(game.the_middle)
+    values += game.factories.counts
+    values += [0] * (N_STYLES * (MAX_FACTORIES - len(game.factories)))
+
+    for name in names:
+        board = game.players[name].board
+        rows = [board.pattern_lines.grid[row_nr] for row_nr in range(1, 6)]
+        values.append(board.point_total)
+        values += [row.spaces[0] if row.spaces[0] is not None else 0 for row in rows]
+        values += [row.used_spaces for row in rows]
+        values += [board.wall.row_bits(row_nr) for row_nr in range(5)]
+        values += _counts(board.floor_line)
+        values.append(FIRST_PLAYER_TILE in board.floor_line)
+    values += [0] * (_PLAYER_FIELDS * (MAX_PLAYERS - len(names)))
+    return _FORMAT.pack(*values)
+
+
+def decode(
+    state: bytes, player_names: List[str], rng: Optional[random.Random] = None
+) -> TheGame:
+    """ A game in <state>, with <player_names> at its seats, drawing from <rng> """
+    values = _FORMAT.unpack(state)
+    n_players, round_nr, current, starting, flags = values[:5]
+    if len(player_names) != n_players:
+        raise ValueError(f"The state is of a game with {n_players} players")
+
+    game = TheGame.__new__(TheGame)
+    game.rng = rng if rng is not None else random.Random()
+    game.player_names = list(player_names)
+    game.players = {name: Player(name) for name in player_names}
+    game.current_player = player_names[current]
+    game.starting_player = player_names[starting]
+    game.round_nr = round_nr
+    game.is_over = bool(flags & GAME_OVER)
+    game.journal = []
+
+    pos = 5
+    game.box_lid = BoxLid(values[pos + N_STYLES : pos + 2 * N_STYLES])
+    game.pouch = Pouch(game.rng, values[pos : pos + N_STYLES], game.box_lid)
+    pos += 2 * N_STYLES
+    game.the_middle = TheMiddle(values[pos : pos + N_STYLES])
+    game.the_middle.is_untouched = bool(flags & MIDDLE_UNTOUCHED)
+    pos += N_STYLES
+    n_factories = TheGame.factory_count_mapping[n_players]
+    game.factories = Factories(n_factories, values[pos : pos + N_STYLES * n_factories])
+    pos = 5 + N_STYLES * (3 + MAX_FACTORIES)
+
+    for name in player_names:
+        board = game.players[name].board
+        board.point_total = values[pos]
+        styles, counts = values[pos + 1 : pos + 6], values[pos + 6 : pos + 11]
+        for row_nr, style, count in zip(range(1, 6), styles, counts):
+            if count:
+                board.pattern_lines.grid[row_nr] += TileCounter(TILES[style], count)
+        for row_nr, columns in enumerate(values[pos + 11 : pos + 16]):
+            for col_nr in range(5):
+                if columns >> col_nr & 1:
+                    tile = TILES[(col_nr - row_nr) % N_STYLES]
+                    board.wall.add_tile(tile, row_nr=row_nr, col_nr=col_nr)
+        floor = [FIRST_PLAYER_TILE] if values[pos + 21] else []
+        board.floor_line = FloorLine(floor + _tiles(values[pos + 16 : pos + 21]))
+        pos += _PLAYER_FIELDS
+    return game
+
+
+def _tiles(counts) -> List[Tile]:
+    return [tile for tile, count in zip(TILES, counts) for _ in range(count)]
+
+
+def clone(game: TheGame, rng: Optional[random.Random] = None) -> TheGame:
+    """
+    A copy of <game>, drawing from <rng>. By default the copy gets its own
+    random number generator in the same state as that of <game>, so a copy
+    of a seeded game draws the same tiles as the game itself.
+    """
+    if rng is None:
+        rng = random.Random()
+        rng.setstate(game.rng.getstate())
+    copy = TheGame.__new__(TheGame)
+    copy.rng = rng
+    copy.player_names = list(game.player_names)
+    copy.players = {name: _copy_player(player) for name, player in game.players.items()}
+    copy.current_player = game.current_player
+    copy.starting_player = game.starting_player
+    copy.round_nr = game.round_nr
+    copy.is_over = game.is_over
+    copy.journal = []
+
+    copy.box_lid = BoxLid(game.box_lid.counts)
+    copy.pouch = Pouch(rng, game.pouch.counts, copy.box_lid)
+    copy.the_middle = TheMiddle(game.the_middle.counts)
+    copy.the_middle.is_untouched = game.the_middle.is_untouched
+    copy.factories = Factories(len(game.factories), game.factories.counts)
+    return copy
+
+
+def _copy_player(player: Player) -> Player:
+    copy = Player.__new__(Player)
+    copy.name = player.name
+    board = copy.board = PlayerBoard.__new__(PlayerBoard)
+    board.point_total = player.board.point_total
+    board.is_start_player = player.board.is_start_player
+    board.floor_line = FloorLine(player.board.floor_line)
+
+    lines = board.pattern_lines = PatternLines.__new__(PatternLines)
+    lines.grid = {}
+    for row_nr, row in player.board.pattern_lines.grid.items():
+        row_copy = lines.grid[row_nr] = PatternLinesRows.__new__(PatternLinesRows)
+        row_copy.capacity = row.capacity
+        row_copy.spaces = row.spaces[:]
+
+    wall = player.board.wall
+    board.wall = Wall.__new__(Wall)
+    board.wall.occupied = wall.occupied
+    board.wall.transposed = wall.transposed
+    board.wall.styles = wall.styles[:]
+    return copy
+
+
+def state_hash(state: bytes) -> int:
+    """ A 64-bit hash of a state that is the same in every process """
+    return int.from_bytes(blake2b(state, digest_size=8).digest(), "little")
+
+
+def to_array(state: bytes) -> "numpy.ndarray":
+    """ A read-only NumPy view of the bytes of a state """
+    import numpy as np
+
+    return np.frombuffer(state, dtype=np.uint8)
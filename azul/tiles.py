@@ -1,31 +1,44 @@
 from dataclasses import dataclass
-from typing import Literal
+from enum import IntEnum
+
+
+class Tile(IntEnum):
+    """
+    The tile types are small ints, so comparing and hashing tiles costs no
+    more than it does for ints, and Tile(style) returns the one shared
+    member instead of a new object. The display name is only used to print
+    a tile.
+    """
+    BLACK = 0
+    BLUE = 1
+    RED = 2
+    YELLOW = 3
+    WHITE = 4
+    FIRST_PLAYER = 99  # The starting player marker
+
+    @property
+    def style(self) -> str:
+        return STYLE_NAMES[self]
 
+    def __repr__(self) -> str:
+        return STYLE_NAMES[self]
 
-class Tile:
-    style_mapping = {
-        0: "black \U0000203B",
-        1: "blue \U00002021",
-        2: "red \U00002051",
-        3: "yellow \U00002050",
-        4: "white \U000020AA",
-        99: "minus1 \U00002620",
-    }
-    reverse_mapping = {v: k for k, v in style_mapping.items()}
-
-    def __init__(self, style: Literal[0, 1, 2, 3, 4, 99]):
-        self.style = Tile.style_mapping[style]
+    __str__ = __repr__
 
-    def __repr__(self) -> str:
-        return self.style
+    def __format__(self, format_spec: str) -> str:
+        return format(STYLE_NAMES[self], format_spec)
 
-    def __eq__(self, other) -> bool:
-        if isinstance(other, Tile):
-            return self.style == other.style
-        return NotImplemented
 
-    def __hash__(self):
-        return hash(self.style)
+STYLE_NAMES = {
+    Tile.BLACK: "black \U0000203B",
+    Tile.BLUE: "blue \U00002021",
+    Tile.RED: "red \U00002051",
+    Tile.YELLOW: "yellow \U00002050",
+    Tile.WHITE: "white \U000020AA",
+    Tile.FIRST_PLAYER: "minus1 \U00002620",
+}
+# The tile types that are played with, in order of their code
+COLORS = (Tile.BLACK, Tile.BLUE, Tile.RED, Tile.YELLOW, Tile.WHITE)
 
 
 @dataclass
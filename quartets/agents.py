@@ -0,0 +1,152 @@
+"""
+The protocol between a quartet table server and the agents that play its
+seats, and a stand-in agent that speaks it.
+
+Agents talk JSON lines over a pipe (their stdin and stdout) or a Unix
+socket. Cards are [group, number] pairs, like in the event logs. An agent
+first introduces itself:
+
+    {"type": "hello", "name": "my-bot"}
+
+The server then asks it for moves. A move request describes everything the
+player whose turn it is can see:
+
+    {"type": "move", "id": 7, "table": 3, "seat": 1, "round": 12,
+     "layout": [5, 4], "hand": [["A", 1], ["C", 2]], "hand_sizes": [4, 2, 0, 6],
+     "owners": [[["B", 3], 0]], "non_owners": [[["C", 1], 5]]}
+
+owners lists the cards of which everybody knows who owns them, non_owners
+the cards with a bitmask of seats known not to own them. The agent answers
+with the card it asks for and the seat it asks, and the id of the request:
+
+    {"id": 7, "card": ["C", 1], "asked": 3}
+
+Requests can be answered in any order. When a game is over the server sends
+{"type": "game_over", "table": 3, "seat": 1, "points": [...]}, which needs no
+answer.
+
+The stand-in agent answers with one of the registered decision policies:
+
+    $ python3 agents.py --policy pretty-smart                 # over stdin/stdout
+    $ python3 agents.py --policy random --connect tables.sock
+"""
+import argparse
+import json
+import random
+import socket
+import sys
+import time
+from typing import IO, Dict, List, Tuple
+
+from cards import Card, DeckLayout, RankedHand
+from clever import Player, QuartetGame
+from knowledge import PublicKnowledge
+from policies import get_policy
+
+
+def card_from_json(value: List) -> Card:
+    group, number = value
+    return Card(group, number)
+
+
+def move_request(game: QuartetGame, player: Player, table: int) -> Dict[str, object]:
+    """ The move request for <player>, whose turn it is at <table> """
+    layout, knowledge = game.layout, game.public_knowledge
+    owners = [
+        [card, seat]
+        for card, seat in zip(layout.cards, knowledge.owners)
+        if seat >= 0
+    ]
+    non_owners = [
+        [card, mask]
+        for card, mask in zip(layout.cards, knowledge.non_owners)
+        if mask
+    ]
+    return {
+        "type": "move",
+        "table": table,
+        "seat": player.seat,
+        "round": game.round_nr,
+        "layout": [layout.n_groups, layout.group_size],
+        "hand": list(player.hand),
+        "hand_sizes": [len(p.hand) for p in game.players],
+        "owners": owners,
+        "non_owners": non_owners,
+    }
+
+
+class StandInAgent:
+    """ Answers move requests by playing a registered decision policy """
+
+    def __init__(self, policy: str = "random", seed=None, delay: float = 0.0):
+        self.policy_name = policy
+        self.policy = get_policy(policy)
+        if hasattr(self.policy, "start_game"):
+            raise ValueError(f"{policy} needs to see the whole game to play")
+        self.rng = random.Random(seed)
+        self.delay = delay
+        self.layouts: Dict[Tuple[int, int], DeckLayout] = {}
+
+    def answer(self, request: Dict[str, object]) -> Dict[str, object]:
+        """ The answer to a single move request """
+        n_groups, group_size = request["layout"]
+        layout = self.layouts.get((n_groups, group_size))
+        if layout is None:
+            layout = self.layouts[n_groups, group_size] = DeckLayout(n_groups, group_size)
+
+        hand_sizes = request["hand_sizes"]
+        knowledge = PublicKnowledge(len(hand_sizes), layout)
+        for card, seat in request["owners"]:
+            knowledge.record_owner(card_from_json(card), seat)
+        for card, mask in request["non_owners"]:
+            seats = [s for s in range(len(hand_sizes)) if mask >> s & 1]
+            knowledge.record_non_owner(card_from_json(card), *seats)
+
+        seat = request["seat"]
+        hand = RankedHand((card_from_json(c) for c in request["hand"]), layout)
+        player = Player(name="agent", hand=hand, decision_policy=self.policy_name, seat=seat)
+        players = [
+            player if s == seat else Player(name=f"seat {s}", seat=s)
+            for s, size in enumerate(hand_sizes)
+            if size or s == seat
+        ]
+
+        if self.delay:
+            time.sleep(self.delay)
+        card = self.policy.choose_card(player, knowledge, self.rng)
+        asked = self.policy.choose_player(player, card, players, knowledge, self.rng)
+        return {"id": request["id"], "card": card, "asked": asked.seat}
+
+    def serve(self, infile: IO[str], outfile: IO[str]) -> None:
+        """ Answer move requests from <infile> until it is closed """
+        hello = {"type": "hello", "name": f"stand-in/{self.policy_name}"}
+        outfile.write(json.dumps(hello) + "\n")
+        outfile.flush()
+        for line in infile:
+            request = json.loads(line)
+            if request.get("type") != "move":
+                continue
+            outfile.write(json.dumps(self.answer(request)) + "\n")
+            outfile.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--policy", default="random")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--delay", type=float, default=0.0, help="seconds to think about a move"
+    )
+    parser.add_argument(
+        "--connect", metavar="PATH", help="the Unix socket of the table server"
+    )
+    args = parser.parse_args()
+
+    agent = StandInAgent(args.policy, seed=args.seed, delay=args.delay)
+    if args.connect:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(args.connect)
+            with sock.makefile("r") as infile, sock.makefile("w") as outfile:
+                agent.serve(infile, outfile)
+    else:
+        agent.serve(sys.stdin, sys.stdout)
@@ -0,0 +1,128 @@
+"""
+Probabilities of who owns which card, from everything that happened at the
+table.
+
+The public knowledge only knows owners that were revealed and seats that
+were shown not to own a card. A lot more can be inferred:
+- every seat holds exactly as many cards as everybody can see it holds
+- a seat that asks for a card of a group holds at least one card of it
+- a card is owned by exactly one seat
+
+The BeliefTracker keeps a card x seat matrix of owner probabilities that
+satisfies these constraints approximately. Revealed owners and non-owners
+are hard facts (probabilities of 1 and 0). The hand sizes are matched by
+iterative proportional fitting: columns are scaled to the hand sizes and
+rows back to a total of 1. A seat that asked for a group gets its
+probabilities for that group scaled up, such that it holds at least one of
+its cards in expectation.
+
+The matrix is kept from request to request. After a request, only the row of
+the asked card changes, followed by a single fitting sweep from where the
+previous one left off, so an update costs O(cards x seats) and nothing is
+ever recomputed from scratch.
+"""
+from typing import List, Optional, Sequence
+
+from cards import Card, DeckLayout, cards_in
+
+
+class BeliefTracker:
+    """
+    Tracks the owner probabilities of the cards in play. Observes the game
+    it is added to (see QuartetGame.observers).
+    """
+
+    def __init__(self, layout: DeckLayout, n_seats: int, sweeps: int = 1):
+        self.layout = layout
+        self.n_seats = n_seats
+        self.sweeps = sweeps
+        uniform = 1 / n_seats
+        self.probs: List[Optional[List[float]]] = [
+            [uniform] * n_seats for _ in range(len(layout))
+        ]
+        self.sizes = [0] * n_seats
+        # Bitmask per seat of the groups (by index) it has shown to hold
+        self.holds = [0] * n_seats
+
+    def owner_probabilities(self, card: Card) -> Optional[List[float]]:
+        """ The probability per seat that it owns <card>, None if it's gone """
+        return self.probs[self.layout.card_index[card]]
+
+    def observe_deal(self, hand_sizes: Sequence[int]) -> None:
+        """ The cards were dealt """
+        self.sizes = list(hand_sizes)
+        self._fit(self.sweeps + 2)
+
+    def observe_request(
+        self, asker: int, asked: int, card: Card, success: bool
+    ) -> None:
+        """ <asker> asked <asked> for <card>, with or without success """
+        layout = self.layout
+        group = layout.group_shifts[card.group] // layout.group_size
+        row = self.probs[layout.card_index[card]]
+
+        self.holds[asker] |= 1 << group
+        if success:
+            row[:] = [0.0] * self.n_seats
+            row[asker] = 1.0
+            self.sizes[asker] += 1
+            self.sizes[asked] -= 1
+            # Maybe that was the only card of the group <asked> had
+            self.holds[asked] &= ~(1 << group)
+        else:
+            row[asker] = row[asked] = 0.0
+            total = sum(row)
+            if total > 0:
+                row[:] = [p / total for p in row]
+        self._fit(self.sweeps)
+
+    def observe_quartet(self, seat: int, group: str) -> None:
+        """ <seat> put down the cards of <group> """
+        layout = self.layout
+        for card in cards_in(layout.group_masks[group], layout):
+            self.probs[layout.card_index[card]] = None
+        self.sizes[seat] -= layout.group_size
+        bit = 1 << layout.group_shifts[group] // layout.group_size
+        self.holds = [h & ~bit for h in self.holds]
+
+    def _fit(self, sweeps: int) -> None:
+        """ Sweeps of iterative proportional fitting """
+        n_seats, sizes = range(self.n_seats), self.sizes
+        rows = [row for row in self.probs if row is not None]
+        for _ in range(sweeps):
+            self._apply_group_evidence()
+
+            totals = [0.0] * self.n_seats
+            for row in rows:
+                for s in n_seats:
+                    totals[s] += row[s]
+            factors = [sizes[s] / totals[s] if totals[s] > 0 else 0.0 for s in n_seats]
+
+            for row in rows:
+                total = 0.0
+                for s in n_seats:
+                    row[s] *= factors[s]
+                    total += row[s]
+                if total > 0:
+                    for s in n_seats:
+                        row[s] /= total
+
+    def _apply_group_evidence(self) -> None:
+        """
+        Scale up the probabilities of the seats that must hold a card of a
+        group, by the chance that they hold none of the group
+        """
+        layout, probs = self.layout, self.probs
+        size = layout.group_size
+        for seat, holds in enumerate(self.holds):
+            while holds:
+                lowest = holds & -holds
+                holds ^= lowest
+                first = (lowest.bit_length() - 1) * size
+                rows = [r for r in probs[first : first + size] if r is not None]
+                none_held = 1.0
+                for row in rows:
+                    none_held *= 1 - row[seat]
+                if 0 < none_held < 1:
+                    for row in rows:
+                        row[seat] = min(1.0, row[seat] / (1 - none_held))
@@ -0,0 +1,285 @@
+"""
+Benchmark how fast the naive and clever engines simulate games.
+
+For every benchmark (an engine plus a mix of decision policies) this reports:
+- games per second
+- per-move latency percentiles, i.e. the duration of a single round
+- the mean time spent per call in generate_request, handle_players_quartet,
+    who_is_next and (for the clever engine) update_public_knowledge
+- the peak traced memory of a game and the memory blocks a game leaves behind
+    (which is what a leak looks like). These are not allocation counts:
+    CPython has no cheap counter of allocations, and tracemalloc only sees
+    the blocks that are alive.
+
+With --scaling, it plays the clever engine with bigger decks and more
+players instead, and reports the time per round for every deck layout.
+
+Results can be saved as a JSON baseline. A later run can be compared against
+that baseline, which exits with a non-zero status if a benchmark got slower
+than the tolerance allows:
+
+    $ python3 benchmark.py --save benchmark_baseline.json
+    $ python3 benchmark.py --compare benchmark_baseline.json
+"""
+import argparse
+from collections import defaultdict
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from cards import DeckLayout
+import clever
+import naive
+from seeding import derive_seed
+from tournament import DEFAULT_POLICIES, SEAT_NAMES
+
+
+BENCHMARKS: Dict[str, Optional[Sequence[str]]] = {
+    "naive": None,
+    "clever/random": ["random"] * 4,
+    "clever/semi-random": ["semi-random"] * 4,
+    "clever/pretty-smart": ["pretty-smart"] * 4,
+    "clever/mixed": DEFAULT_POLICIES,
+}
+# Number of groups, cards per group and players
+SCALING: List[Tuple[int, int, int]] = [
+    (5, 4, 4),
+    (25, 4, 4),
+    (100, 4, 4),
+    (100, 4, 10),
+    (100, 8, 10),
+    (250, 4, 16),
+]
+TIMED_METHODS = [
+    "generate_request",
+    "handle_players_quartet",
+    "who_is_next",
+    "update_public_knowledge",
+]
+
+
+def make_game(policies: Optional[Sequence[str]], seed: int, game_cls=None):
+    """ Set up a game of the naive engine (no policies) or the clever engine """
+    if policies is None:
+        random.seed(seed)
+        players = [naive.Player(name=name) for name in SEAT_NAMES]
+        return (game_cls or naive.QuartetGame)(players=players)
+
+    players = [
+        clever.Player(name=n, decision_policy=p) for n, p in zip(SEAT_NAMES, policies)
+    ]
+    return (game_cls or clever.QuartetGame)(players=players, seed=seed)
+
+
+def timed_game_class(game_cls, timings: Dict[str, List[int]], moves: List[int]):
+    """
+    Returns a subclass of <game_cls> that records the duration of each call
+    to the TIMED_METHODS in <timings>, and the start of each move in <moves>.
+    """
+
+    def timed(name: str, method: Callable) -> Callable:
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter_ns()
+            if name == "generate_request":
+                moves.append(start)
+            result = method(self, *args, **kwargs)
+            timings[name].append(time.perf_counter_ns() - start)
+            return result
+
+        return wrapper
+
+    methods = {
+        name: timed(name, getattr(game_cls, name))
+        for name in TIMED_METHODS
+        if hasattr(game_cls, name)
+    }
+    return type(f"Timed{game_cls.__name__}", (game_cls,), methods)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """ Returns the q-th percentile (0-100) of an ordered list """
+    index = min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run_benchmark(
+    policies: Optional[Sequence[str]], n_games: int, seed: int, repeats: int = 3
+) -> Dict[str, object]:
+    """ Run a single benchmark and return its results """
+    seeds = [derive_seed(seed, game_nr) for game_nr in range(n_games)]
+
+    # Throughput, without any instrumentation. The best of a few repeats is
+    # the least disturbed by whatever else runs on the machine.
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for game_seed in seeds:
+            make_game(policies, game_seed).simulate_game()
+        durations.append(time.perf_counter() - start)
+    games_per_second = n_games / min(durations)
+
+    # Latencies, with timed methods
+    timings: Dict[str, List[int]] = defaultdict(list)
+    latencies: List[int] = []
+    moves: List[int] = []
+    base_cls = naive.QuartetGame if policies is None else clever.QuartetGame
+    game_cls = timed_game_class(base_cls, timings, moves)
+    for game_seed in seeds:
+        moves.clear()
+        make_game(policies, game_seed, game_cls).simulate_game()
+        moves.append(time.perf_counter_ns())
+        latencies.extend(end - begin for begin, end in zip(moves, moves[1:]))
+    latencies.sort()
+
+    # Memory, on a few games only because tracing is slow
+    peaks, retained = [], []
+    for game_seed in seeds[:50]:
+        tracemalloc.start()
+        make_game(policies, game_seed).simulate_game()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    # Without tracemalloc, whose own blocks would be counted too
+    for game_seed in seeds[:50]:
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        make_game(policies, game_seed).simulate_game()
+        gc.collect()
+        retained.append(sys.getallocatedblocks() - blocks)
+
+    return {
+        "games_per_second": games_per_second,
+        "move_latency_us": {
+            f"p{q}": percentile(latencies, q) / 1000 for q in (50, 90, 99, 99.9)
+        },
+        "mean_call_us": {
+            name: sum(durations) / len(durations) / 1000
+            for name, durations in timings.items()
+        },
+        "peak_bytes_per_game": sum(peaks) / len(peaks),
+        "retained_blocks_per_game": sum(retained) / len(retained),
+    }
+
+
+def run_benchmarks(n_games: int, seed: int, repeats: int = 3) -> Dict[str, object]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "games": n_games,
+        "seed": seed,
+        "benchmarks": {
+            name: run_benchmark(policies, n_games, seed, repeats)
+            for name, policies in BENCHMARKS.items()
+        },
+    }
+
+
+def run_scaling(
+    n_games: int, seed: int, policy: str = "pretty-smart"
+) -> List[Dict[str, object]]:
+    """ Time games with every deck layout and number of players of SCALING """
+    results = []
+    for n_groups, group_size, n_players in SCALING:
+        layout = DeckLayout(n_groups, group_size)
+        rounds = 0
+        start = time.perf_counter()
+        for game_nr in range(n_games):
+            players = [
+                clever.Player(name=f"Player {i + 1}", decision_policy=policy)
+                for i in range(n_players)
+            ]
+            game_seed = derive_seed(seed, game_nr)
+            game = clever.QuartetGame(players=players, seed=game_seed, layout=layout)
+            game.simulate_game()
+            rounds += game.round_nr - 1
+        duration = time.perf_counter() - start
+        results.append(
+            {
+                "groups": n_groups,
+                "group_size": group_size,
+                "players": n_players,
+                "games_per_second": n_games / duration,
+                "rounds_per_game": rounds / n_games,
+                "round_us": duration / rounds * 1e6,
+            }
+        )
+    return results
+
+
+def show_scaling(results: List[Dict[str, object]]) -> None:
+    print(f"{'groups':>8}{'size':>6}{'players':>9}{'games/s':>10}{'rounds':>10}{'round us':>10}")
+    for r in results:
+        print(
+            f"{r['groups']:>8}{r['group_size']:>6}{r['players']:>9}"
+            f"{r['games_per_second']:>10.1f}{r['rounds_per_game']:>10.1f}"
+            f"{r['round_us']:>10.2f}"
+        )
+
+
+def compare(
+    results: Dict[str, object], baseline: Dict[str, object], tolerance: float
+) -> List[str]:
+    """
+    Returns the names of the benchmarks whose throughput dropped more than
+    <tolerance> (a fraction) below the baseline.
+    """
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            continue
+        ratio = current["games_per_second"] / previous["games_per_second"]
+        status = "REGRESSION" if ratio < 1 - tolerance else "ok"
+        print(f"{name:<22}{ratio:>8.2f}x  {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def show(results: Dict[str, object]) -> None:
+    print(
+        f"{'benchmark':<22}{'games/s':>10}{'p50 us':>10}{'p99 us':>10}"
+        f"{'peak KiB':>10}{'left':>8}"
+    )
+    for name, result in results["benchmarks"].items():
+        latency = result["move_latency_us"]
+        print(
+            f"{name:<22}{result['games_per_second']:>10.1f}{latency['p50']:>10.1f}"
+            f"{latency['p99']:>10.1f}{result['peak_bytes_per_game'] / 1024:>10.1f}"
+            f"{result['retained_blocks_per_game']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--save", metavar="PATH", help="save results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare with a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument(
+        "--scaling", action="store_true", help="time bigger decks and more players"
+    )
+    args = parser.parse_args()
+
+    if args.scaling:
+        show_scaling(run_scaling(args.games, args.seed))
+        sys.exit(0)
+
+    results = run_benchmarks(args.games, args.seed, args.repeats)
+    show(results)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
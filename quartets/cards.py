@@ -0,0 +1,370 @@
+from collections import Counter
+import random
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+
+class Card(NamedTuple):
+    # NamedTuple: advantage of automatic implementation of dunder methods.
+    # In particular, __hash__ and __eq__ are created automatically, so Card
+    # can be used as a dictionary key -> for "knowledge" and "card location"
+
+    """
+    Each card is combination of a group and a number:
+    - a group: 'A', 'B', 'C', 'D' or 'E'
+    - a number: 1, 2, 3 or 4
+
+    There are 20 cards in total, unless the game is played with a bigger
+    DeckLayout
+    """
+
+    group: str
+    number: int
+
+    def __repr__(self) -> str:
+        return f"{self.group}-{self.number}"
+
+
+def group_name(index: int) -> str:
+    """ Names groups like spreadsheet columns: A, B, ..., Z, AA, AB, ... """
+    name = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        name = chr(ord("A") + rest) + name
+    return name
+
+
+class DeckLayout:
+    """
+    The shape of a deck: <n_groups> groups of <group_size> cards each.
+
+    Every card owns one bit of an integer. The cards of a group sit next to
+    each other, so with groups of 4 cards group 'A' owns bits 0-3, group 'B'
+    bits 4-7 and so on. The layout holds the lookup tables that translate
+    between cards, groups and bits. Python integers grow as needed, so a deck
+    of hundreds of groups is still a single integer per hand.
+    """
+
+    def __init__(self, n_groups: int = 5, group_size: int = 4):
+        if n_groups < 1 or group_size < 2:
+            raise ValueError("A deck needs at least one group of two cards or more")
+        self.n_groups = n_groups
+        self.group_size = group_size
+        self.groups = [group_name(i) for i in range(n_groups)]
+        self.cards = [
+            Card(group, nr) for group in self.groups for nr in range(1, group_size + 1)
+        ]
+
+        self.card_index: Dict[Card, int] = {card: i for i, card in enumerate(self.cards)}
+        self.card_bits: Dict[Card, int] = {c: 1 << i for c, i in self.card_index.items()}
+        self.group_unit = (1 << group_size) - 1
+        self.group_shifts: Dict[str, int] = {
+            g: group_size * i for i, g in enumerate(self.groups)
+        }
+        self.group_masks: Dict[str, int] = {
+            g: self.group_unit << s for g, s in self.group_shifts.items()
+        }
+        # The lowest bit of every group: 'A' -> bit 0, 'B' -> bit 4, ...
+        self.group_low_bits = sum(1 << s for s in self.group_shifts.values())
+        self.popcount_group = (
+            [bin(i).count("1") for i in range(1 << group_size)]
+            if group_size <= 8
+            else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __repr__(self) -> str:
+        return f"DeckLayout(n_groups={self.n_groups}, group_size={self.group_size})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DeckLayout):
+            return (self.n_groups, self.group_size) == (other.n_groups, other.group_size)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.n_groups, self.group_size))
+
+    def __reduce__(self):
+        return DeckLayout, (self.n_groups, self.group_size)
+
+    def group_of(self, bit_index: int) -> str:
+        """ The group the card at <bit_index> belongs to """
+        return self.groups[bit_index // self.group_size]
+
+    def groups_in(self, mask: int) -> Iterator[str]:
+        """ Yields the groups whose low bit is set in <mask> """
+        while mask:
+            lowest = mask & -mask
+            yield self.groups[(lowest.bit_length() - 1) // self.group_size]
+            mask ^= lowest
+
+    def present_groups(self, mask: int) -> int:
+        """ The low bit of every group that has at least one card in <mask> """
+        present = mask
+        for shift in range(1, self.group_size):
+            present |= mask >> shift
+        return present & self.group_low_bits
+
+    def full_groups(self, mask: int) -> int:
+        """ The low bit of every group that has all its cards in <mask> """
+        full = mask
+        for shift in range(1, self.group_size):
+            full &= mask >> shift
+        return full & self.group_low_bits
+
+
+STANDARD_LAYOUT = DeckLayout()
+
+# The lookup tables of the standard deck of 5 groups of 4 cards
+GROUPS = "".join(STANDARD_LAYOUT.groups)
+GROUP_SIZE = STANDARD_LAYOUT.group_size
+FULL_DECK = STANDARD_LAYOUT.cards
+CARD_INDEX = STANDARD_LAYOUT.card_index
+CARD_BITS = STANDARD_LAYOUT.card_bits
+GROUP_SHIFTS = STANDARD_LAYOUT.group_shifts
+GROUP_MASKS = STANDARD_LAYOUT.group_masks
+GROUP_LOW_BITS = STANDARD_LAYOUT.group_low_bits
+POPCOUNT_GROUP = STANDARD_LAYOUT.popcount_group
+
+
+if hasattr(int, "bit_count"):  # Python 3.10+
+    popcount = int.bit_count
+else:
+    def popcount(mask: int) -> int:
+        """ The number of set bits of a non-negative integer """
+        return bin(mask).count("1")
+
+
+def cards_in(mask: int, layout: DeckLayout = STANDARD_LAYOUT) -> Iterator[Card]:
+    """ Yields the cards whose bits are set in <mask>, in deck order """
+    cards = layout.cards
+    while mask:
+        lowest = mask & -mask
+        yield cards[lowest.bit_length() - 1]
+        mask ^= lowest
+
+
+def nth_card(mask: int, n: int, layout: DeckLayout = STANDARD_LAYOUT) -> Card:
+    """
+    Returns the <n>-th card (from 0, in deck order) of <mask>, i.e.
+    list(cards_in(mask))[n], without listing all cards of a large mask: the
+    mask is halved until the card is within a machine word or so.
+    """
+    offset = 0
+    width = mask.bit_length()
+    while width > 64:
+        half = width // 2
+        low = mask & ((1 << half) - 1)
+        in_low = popcount(low)
+        if n < in_low:
+            mask, width = low, half
+        else:
+            n -= in_low
+            mask >>= half
+            offset += half
+            width -= half
+    for _ in range(n):
+        mask &= mask - 1
+    return layout.cards[offset + (mask & -mask).bit_length() - 1]
+
+
+def random_card(
+    mask: int, rng: random.Random = random, layout: DeckLayout = STANDARD_LAYOUT
+) -> Card:
+    """
+    Returns a random card of a non-empty <mask>. Draws the same card from the
+    same random state as rng.choice(list(cards_in(mask))) would.
+    """
+    return nth_card(mask, rng.randrange(popcount(mask)), layout)
+
+
+class Hand:
+    """
+    Collection of cards, stored as a bitmask over the full deck.
+
+    Behaves like the list of cards it replaces (iterating, `in`, `len`,
+    `append`, `remove`), but membership, group counts, quartet detection and
+    the cards a player may ask for are answered with a few bit operations.
+    Cards come out in deck order.
+    """
+
+    __slots__ = ("mask", "layout")
+
+    def __init__(self, cards: Iterable[Card] = (), layout: DeckLayout = STANDARD_LAYOUT):
+        self.layout = layout
+        self.mask = 0
+        card_bits = layout.card_bits
+        for card in cards:
+            self.mask |= card_bits[card]
+
+    def __iter__(self) -> Iterator[Card]:
+        return cards_in(self.mask, self.layout)
+
+    def __len__(self) -> int:
+        return popcount(self.mask)
+
+    def __bool__(self) -> bool:
+        return self.mask != 0
+
+    def __contains__(self, card: Card) -> bool:
+        return bool(self.mask & self.layout.card_bits[card])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Hand):
+            return self.mask == other.mask and self.layout == other.layout
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def append(self, card: Card) -> None:
+        """ Add a card to the hand """
+        self.mask |= self.layout.card_bits[card]
+
+    def remove(self, card: Card) -> None:
+        """ Remove a card from the hand. Raises ValueError if it's not there """
+        bit = self.layout.card_bits[card]
+        if not self.mask & bit:
+            raise ValueError(f"{card} is not in the hand")
+        self.mask ^= bit
+
+    def pop_group(self, group: str) -> List[Card]:
+        """ Remove all cards of a group from the hand and return them """
+        group_mask = self.layout.group_masks[group]
+        group_cards = list(cards_in(self.mask & group_mask, self.layout))
+        self.mask &= ~group_mask
+        return group_cards
+
+    def group_count(self, group: str) -> int:
+        """ Returns the number of cards in the hand of a single group """
+        layout = self.layout
+        cards = (self.mask >> layout.group_shifts[group]) & layout.group_unit
+        if layout.popcount_group is not None:
+            return layout.popcount_group[cards]
+        return popcount(cards)
+
+    def is_complete(self, group: str) -> bool:
+        """ Whether the hand holds all cards of a group """
+        group_mask = self.layout.group_masks[group]
+        return self.mask & group_mask == group_mask
+
+    @property
+    def group_counter(self) -> Counter:
+        """ Returns the number of cards per quartet group """
+        layout = self.layout
+        return Counter(
+            {
+                group: self.group_count(group)
+                for group in layout.groups_in(layout.present_groups(self.mask))
+            }
+        )
+
+    @property
+    def quartets(self) -> List[str]:
+        """ Returns list with card group that have a full quartet """
+        layout = self.layout
+        return list(layout.groups_in(layout.full_groups(self.mask)))
+
+    @property
+    def eligible_mask(self) -> int:
+        """
+        Bitmask of all cards from the groups in this hand that are not in
+        the hand itself.
+        """
+        layout = self.layout
+        present = layout.present_groups(self.mask)
+        # Multiplying by 0b1111 (for groups of 4) spreads every group's low
+        # bit over the group
+        return (present * layout.group_unit) & ~self.mask
+
+    @property
+    def eligible_cards(self) -> List[Card]:
+        """ The cards a player with this hand is allowed to ask for """
+        return list(cards_in(self.eligible_mask, self.layout))
+
+    @property
+    def eligible_count(self) -> int:
+        """ The number of cards a player with this hand is allowed to ask for """
+        return popcount(self.eligible_mask)
+
+    def random_card(self, mask: int, rng: random.Random = random) -> Card:
+        """ Returns a random card of a non-empty bitmask, like rng.choice """
+        return random_card(mask, rng, self.layout)
+
+
+class RankedHand(Hand):
+    """
+    Hand that keeps the cards a player may ask for ranked at all times.
+
+    The eligible cards are bucketed by the number of cards the hand already
+    holds of their group: `buckets[3]` holds the cards that would complete a
+    quartet, `buckets[1]` the cards of groups with a single card in hand.
+    Only the bucket of the group that changed is updated when a card is gained
+    or lost, or a quartet is laid down, so picking the best card to ask for
+    never needs a sort.
+    """
+
+    __slots__ = ("buckets",)
+
+    def __init__(self, cards: Iterable[Card] = (), layout: DeckLayout = STANDARD_LAYOUT):
+        super().__init__(cards, layout)
+        self.buckets = [0] * layout.group_size
+        for group in layout.groups_in(layout.present_groups(self.mask)):
+            self._rebucket(group)
+
+    def append(self, card: Card) -> None:
+        super().append(card)
+        self._rebucket(card.group)
+
+    def remove(self, card: Card) -> None:
+        super().remove(card)
+        self._rebucket(card.group)
+
+    def pop_group(self, group: str) -> List[Card]:
+        group_cards = super().pop_group(group)
+        self._rebucket(group)
+        return group_cards
+
+    @property
+    def eligible_mask(self) -> int:
+        eligible = 0
+        for bucket in self.buckets:
+            eligible |= bucket
+        return eligible
+
+    def ranking(self, rng: random.Random = random) -> List[Card]:
+        """ All eligible cards, best first. Ties are shuffled with <rng>. """
+        ranked = []
+        for bucket in reversed(self.buckets):
+            cards = list(cards_in(bucket, self.layout))
+            rng.shuffle(cards)
+            ranked.extend(cards)
+        return ranked
+
+    def best_card(
+        self, allowed: int = -1, rng: random.Random = random
+    ) -> Optional[Card]:
+        """
+        Returns a random card from the best ranked bucket. If a bitmask of
+        allowed cards is given, only those cards are considered. Returns None
+        if none of the eligible cards is allowed.
+        """
+        for bucket in reversed(self.buckets):
+            candidates = bucket & allowed
+            if candidates:
+                return random_card(candidates, rng, self.layout)
+        return None
+
+    def _rebucket(self, group: str) -> None:
+        """ Move the eligible cards of <group> into the bucket they belong """
+        layout = self.layout
+        group_mask = layout.group_masks[group]
+        buckets = self.buckets
+        for count in range(1, layout.group_size):
+            buckets[count] &= ~group_mask
+
+        count = self.group_count(group)
+        if 0 < count < layout.group_size:
+            buckets[count] |= group_mask & ~self.mask
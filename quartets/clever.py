@@ -1,57 +1,32 @@
-from collections import Counter
 from dataclasses import dataclass, field
 import logging
 import random
-from typing import Any, List, NamedTuple, Tuple
+from typing import List, Optional, Sequence, Tuple
+
+from cards import STANDARD_LAYOUT, Card, DeckLayout, RankedHand
+from events import (
+    NULL_SINK,
+    EventSink,
+    GameFinished,
+    GameStarted,
+    LogRenderer,
+    NextPlayer,
+    QuartetLaidDown,
+    Request,
+    RoundStarted,
+)
+from knowledge import GameObserver, PublicKnowledge
+from policies import Policy, get_policy
+from profiling import GameProfiler
 
 
-logging.basicConfig(level=10, format="%(message)s")
-handler = logging.FileHandler(filename="logs/clever.log", mode="w")
 LOGGER = logging.getLogger("quartet_logger")
-LOGGER.addHandler(handler)
-
-
-class Card(NamedTuple):
-    # NamedTuple: advantage of automatic implementation of dunder methods.
-    # In particular, __hash__ and __eq__ are created automatically, so Card
-    # can be used as a dictionary key -> for "knowledge" and "card location"
-
-    """
-    Each card is combination of a group and a number:
-    - a group: 'A', 'B', 'C', 'D' or 'E'
-    - a number: 1, 2, 3 or 4
-
-    There are 20 cards in total
-    """
-
-    group: str
-    number: int
-
-    def __repr__(self) -> str:
-        return f"{self.group}-{self.number}"
-
-
-FULL_DECK = [Card(group, int(nr)) for group in "ABCDE" for nr in range(1, 5)]
-
-
-class Hand(list):
-    """ Collection of cards, with some added functionality compared to a list """
-
-    @property
-    def quartets(self) -> List[str]:
-        """ Returns list with card group that have a full quartet """
-        return [k for k, v in self.group_counter.items() if v == 4]
-
-    @property
-    def group_counter(self) -> Counter:
-        """ Returns the number of cards per quartet group """
-        return Counter(card.group for card in self)
 
 
 @dataclass
 class Player:
     """
-    There are 4 players, each with:
+    There are any number of players (4 in the standard game), each with:
     - a name
     - a number of cards in their hands
     - a number of game points
@@ -63,21 +38,25 @@ class Player:
     - file 
     - realise that their game is over when they don't have cards in their hand anymore
 
-    Each player is identified by their name + decision policy.
+    Each player is identified by their name + decision policy. The game
+    assigns each player a seat number, which is how the public knowledge
+    refers to them.
     """
     name: str
-    hand: Hand = field(default_factory=Hand)
+    hand: RankedHand = field(default_factory=RankedHand)
     points: int = 0
     decision_policy: str = "random"
-    # Also semi-random and pretty-smart
+    # Also semi-random, pretty-smart or any other registered policy
+    seat: int = 0
+    policy: Optional[Policy] = field(default=None, repr=False, compare=False)
 
     def __hash__(self):
-        return hash(name) * hash(decision_policy)
+        return hash((self.name, self.decision_policy))
 
     @property
     def is_finished(self) -> bool:
         """ A player is finished when they have no more cards in their hand """
-        return len(self.hand) == 0
+        return not self.hand
 
     @property
     def eligible_cards(self) -> List[Card]:
@@ -86,209 +65,254 @@ class Player:
             - cards from groups of which they already own at least one card from
             - cards they don't own themselves yet (obviously)
         """
-        return [
-            card
-            for card in FULL_DECK
-            if card not in self.hand
-            if card.group in self.hand.group_counter.keys()
-        ]
+        return self.hand.eligible_cards
 
-    @property
-    def eligible_cards_ranked(self):
+    def eligible_cards_ranked(self, rng: random.Random = random) -> List[Card]:
         """
         Returns a ranking of which card a player should ask for.
 
         If they already own 3 cards from a group, they will want to ask for
-        the missing card in that group to fill their quartet.
+        the missing card in that group to fill their quartet. Ties are
+        shuffled with <rng>, pass the game's rng to reproduce seeded games.
         """
-        # to avoid getting the same cards in case of tie
-        shuffled_cards = random.sample(self.eligible_cards, len(self.eligible_cards))
-
-        return sorted(
-            (card for card in shuffled_cards),
-            key=lambda card: self.hand.group_counter[card.group],
-            reverse=True,
-        )
+        return self.hand.ranking(rng)
 
-    def choose_card(self, knowledge: Any = None) -> Card:
+    def choose_card(
+        self,
+        knowledge: Optional[PublicKnowledge] = None,
+        rng: random.Random = random,
+    ) -> Card:
         """ Returns a card to ask for. """
-        LOGGER.info(f"{self.name} can ask for {len(self.eligible_cards)} cards")
-        if self.decision_policy == "random":
-            return random.choice(self.eligible_cards)
-
-        elif self.decision_policy == "semi-random":
-            return self.eligible_cards_ranked[0]
-
-        elif self.decision_policy == "pretty-smart":
-            # Check for the best card we know the location of
-            candidate = next(
-                (
-                    card
-                    for card in self.eligible_cards_ranked
-                    if knowledge[card].get("owned_by") is not None
-                ),
-                None,
-            )
-            # If not working, check for best card, we know is not owned by
-            if candidate is None:
-                candidate = next(
-                    (
-                        card
-                        for card in self.eligible_cards_ranked
-                        if knowledge[card].get("not_owned_by") is not None
-                    ),
-                    None,
-                )
-            # If not working, pick the self-focused best card
-            if candidate is None:
-                candidate = self.eligible_cards_ranked[0]
-
-            return candidate
-        else:
-            msg = f""" decision policy "{self.decision_policy}" does not exists.
-            Use 'random', 'semi-random' or 'pretty-smart' instead"""
-            raise NotImplementedError(msg)
+        return self._policy.choose_card(self, knowledge, rng)
 
     def choose_player(
-        self, card: Card, players: List["Player"], knowledge: Any = None
+        self,
+        card: Card,
+        players: List["Player"],
+        knowledge: Optional[PublicKnowledge] = None,
+        rng: random.Random = random,
     ) -> "Player":
         """ Choose which player to ask for <card> """
-        if self.decision_policy in ("random", "semi-random"):
-            return random.choice([p for p in players if p != self])
-
-        elif self.decision_policy == "pretty-smart":
-            try:
-                return knowledge[card]["owned_by"]
-            except KeyError:
-                try:
-                    not_ = knowledge[card]["not_owned_by"]
-                    return random.choice([p for p in players if p not in (self, not_)])
-                except KeyError:
-                    return random.choice([p for p in players if p != self])
+        return self._policy.choose_player(self, card, players, knowledge, rng)
 
-        else:
-            msg = f""" decision policy "{self.decision_policy}" does not exists.
-            Use 'random', 'semi-random' or 'pretty-smart' instead"""
-            raise NotImplementedError(msg)
+    @property
+    def _policy(self) -> Policy:
+        if self.policy is None:
+            self.policy = get_policy(self.decision_policy)
+        return self.policy
 
 
 class QuartetGame:
-    def __init__(self, players: List[Player]):
+    def __init__(
+        self,
+        players: List[Player],
+        events: EventSink = NULL_SINK,
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+        layout: DeckLayout = STANDARD_LAYOUT,
+        hands: Optional[Sequence[Sequence[Card]]] = None,
+        profiler: Optional[GameProfiler] = None,
+    ):
         """
         The orchestrator of the game.
-        Each game starts with 4 players and a total of 20 cards (4x5) each.
+        Each game deals all cards of the deck over its players.
         As the game develops, a "public knowledge" of where cards are located is filled up.
 
         The game is also aware of who the current player is, who the active players are and
         whether or not a player needs to put down their completed quartets.
+
+        Everything that happens is emitted as an event to <events>. By default
+        the events are not even created.
+
+        All randomness of the game, including the decisions of the players,
+        comes from <rng>, or from a new random.Random(<seed>). The same seed
+        plays the same game.
+
+        The game is played with the standard deck of 5 groups of 4 cards,
+        unless another <layout> is given. Any number of players (up to 64)
+        can play.
+
+        If <hands> are given, the players start with those cards instead of
+        a random deal.
+
+        A <profiler> counts and times the phases of the game, see
+        profiling.py. Without one, the game is not instrumented at all.
+
+        Objects in <observers> (a policy can add them in its start_game) are
+        told about everything that becomes public, see GameObserver.
         """
+        self.events = events
+        self.rng = rng if rng is not None else random.Random(seed)
 
         self.players = players
-        self.deck = random.sample(FULL_DECK, len(FULL_DECK))
+        for seat, player in enumerate(self.players):
+            player.seat = seat
+            player.policy = get_policy(player.decision_policy)
+        self.layout = layout
+        self.deck = self.rng.sample(layout.cards, len(layout.cards))
+        self.hands = hands
 
         self.round_nr = 1
         self._current_player = self.players[0]
-        self.public_knowledge = {card: {"not_owned_by": []} for card in FULL_DECK}
+        self.public_knowledge = PublicKnowledge(len(self.players), layout)
+        self.observers: List[GameObserver] = []
+
+        # Policies that need to see the whole game get to see it
+        for player in self.players:
+            start_game = getattr(player.policy, "start_game", None)
+            if start_game is not None:
+                start_game(self, player)
+
+        if profiler is not None:
+            profiler.instrument(self)
 
     def simulate_game(self) -> None:
         """ Simulate the game of quartet """
-        player_names = ", ".join(p.name for p in self.players)
-        LOGGER.info(f"Players at the table: {player_names}")
-        LOGGER.info(
-            "\n".join(f"{p.name}'s policy: {p.decision_policy}" for p in self.players)
-        )
-        LOGGER.info(f"Let the games begin!")
-
-        # Set up the game:
-        self.deal_cards()
-        self.handle_players_quartet()
+        self.start()
 
         # Go through the rounds until nobody's in the game
-        while len(self.in_game_players) > 1:
-            # Round start logging:
-            LOGGER.info(f"\nStarting round # {self.round_nr} ...")
-            LOGGER.info("\n".join(f"{k.name}: {k.hand}" for k in self.players))
-
+        while not self.is_over:
             current_player = self._current_player
-
             asked_player, asked_card = self.generate_request(current_player)
+            self.play_request(current_player, asked_player, asked_card)
+
+        self.finish()
+
+    def start(self) -> None:
+        """
+        Set up the game. simulate_game plays the whole game; code that wants
+        to make the requests itself (e.g. asking a remote agent) calls start,
+        then play_request until the game is over, and finish.
+        """
+        if self.events:
+            names = tuple(p.name for p in self.players)
+            policies = tuple(p.decision_policy for p in self.players)
+            self.events.emit(GameStarted(names, policies))
+
+        self.deal_cards()
+        if self.observers:
+            hand_sizes = [len(p.hand) for p in self.players]
+            for observer in self.observers:
+                observer.observe_deal(hand_sizes)
+        self.handle_players_quartet()
 
-            # Handle the successful / unsuccesful request:
-            success_request = asked_card in asked_player.hand
-            if success_request:
-                asked_player.hand.remove(asked_card)
-                current_player.hand.append(asked_card)
+    @property
+    def is_over(self) -> bool:
+        """ The game is over when at most one player has cards left """
+        return len(self.in_game_players) <= 1
 
-                name1, name2 = current_player.name, asked_player.name
-                LOGGER.info(f"{name1} gets {asked_card} from {name2}")
-                self.public_knowledge[asked_card]["owned_by"] = current_player
-                self.public_knowledge[asked_card]["not_owned_by"] = []
+    @property
+    def current_player(self) -> Player:
+        """ The player whose turn it is """
+        return self._current_player
 
-            elif not success_request:
-                LOGGER.info(f"{asked_player.name} does not have {asked_card}")
-                self.public_knowledge[asked_card]["not_owned_by"].append(asked_player)
-                self.public_knowledge[asked_card]["not_owned_by"].append(current_player)
+    def play_request(
+        self, current_player: Player, asked_player: Player, asked_card: Card
+    ) -> bool:
+        """
+        Play one round: <current_player> asks <asked_player> for <asked_card>.
+        Returns whether the request was successful.
+        """
+        events = self.events
+        if events:
+            hands = tuple(p.hand.mask for p in self.players)
+            events.emit(RoundStarted(self.round_nr, hands))
+
+        # Handle the successful / unsuccesful request:
+        success_request = asked_card in asked_player.hand
+        if events:
+            eligible_count = current_player.hand.eligible_count
+            seats = (current_player.seat, asked_player.seat)
+            events.emit(Request(*seats, asked_card, eligible_count, success_request))
+
+        if success_request:
+            asked_player.hand.remove(asked_card)
+            current_player.hand.append(asked_card)
+
+        self.update_public_knowledge(
+            success_request, asked_card, current_player, asked_player
+        )
 
-            # Clean up full quartets and finished players:
-            self.handle_players_quartet()
+        # Clean up full quartets and finished players. Only the player
+        # who received a card can have completed a quartet.
+        if success_request:
+            self.handle_players_quartet([current_player])
 
-            # Update public knowledge (not implemented)
-            # Determine next round's starting player:
-            _next = self.who_is_next(success_request, current_player, asked_player)
-            self._current_player = _next
+        # Determine next round's starting player:
+        _next = self.who_is_next(success_request, current_player, asked_player)
+        self._current_player = _next
 
-            self.round_nr += 1
+        self.round_nr += 1
+        return success_request
 
-        # Finish up the game
-        LOGGER.info(f"\nThe game finished after {self.round_nr-1} rounds!")
-        msg = "\n".join(f"{k.name} has {k.points} quartets" for k in self.players)
-        LOGGER.info(msg)
+    def finish(self) -> None:
+        """ Finish up the game """
+        if self.events:
+            points = tuple(p.points for p in self.players)
+            self.events.emit(GameFinished(self.round_nr - 1, points))
 
     def who_is_next(self, success: bool, player1: Player, player2: Player) -> Player:
         """ Resolve next starter. randomly draw next player """
         up_next = player1 if success else player2
         if up_next.is_finished:
             try:
-                up_next = random.choice(self.in_game_players)
+                up_next = self.rng.choice(self.in_game_players)
             except IndexError:
                 return None
-        LOGGER.info(f"Next round it will be {up_next.name}'s turn")
+        if self.events:
+            self.events.emit(NextPlayer(up_next.seat))
         return up_next
 
     def deal_cards(self) -> None:
         """ Give each player starting cards """
-        random.shuffle(self.deck)
-        cards_piles = [self.deck[i::4] for i in range(4)]
+        if self.hands is not None:
+            cards_piles = self.hands
+        else:
+            self.rng.shuffle(self.deck)
+            n_piles = len(self.players)
+            cards_piles = [self.deck[i::n_piles] for i in range(n_piles)]
         for player, card_pile in zip(self.players, cards_piles):
-            player.hand = Hand(card_pile)
+            player.hand = RankedHand(card_pile, self.layout)
 
     def generate_request(self, player: Player) -> Tuple[Player, Card]:
         """ Let the player decide which card gets asked from whom """
-        knowledge = self.public_knowledge
+        knowledge, policy, rng = self.public_knowledge, player.policy, self.rng
 
-        asked_card = player.choose_card(knowledge=knowledge)
-        asked_player = player.choose_player(
-            card=asked_card, players=self.in_game_players, knowledge=knowledge
+        asked_card = policy.choose_card(player, knowledge, rng)
+        asked_player = policy.choose_player(
+            player, asked_card, self.in_game_players, knowledge, rng
         )
-
-        LOGGER.info(f"{player.name} asks {asked_player.name}: {asked_card}")
         return (asked_player, asked_card)
 
-    def handle_players_quartet(self) -> None:
-        """ Remove quartets from players' hands and credit a point """
-        for player in self.players:
+    def handle_players_quartet(self, players: Optional[List[Player]] = None) -> None:
+        """
+        Remove quartets from the hands of <players> (by default everybody)
+        and credit a point
+        """
+        for player in self.players if players is None else players:
             for quartet in player.hand.quartets:
-                LOGGER.info(f"{player.name} has a quartet with {quartet}!")
-
-                quartet_cards = [c for c in player.hand if c.group == quartet]
-                player.hand = Hand(c for c in player.hand if c not in quartet_cards)
+                player.hand.pop_group(quartet)
                 player.points += 1
 
-                LOGGER.info(f"{player.name} is putting down {quartet_cards}")
+                if self.events:
+                    self.events.emit(QuartetLaidDown(player.seat, quartet))
+                for observer in self.observers:
+                    observer.observe_quartet(player.seat, quartet)
 
-    def update_public_knowledge(self):
-        """ Not implemented. Could keep record of location of cards """
-        pass
+    def update_public_knowledge(
+        self, success: bool, card: Card, player1: Player, player2: Player
+    ) -> None:
+        """
+        Keep record of the location of cards. After a successful request
+        everybody knows that <player1> owns <card>. After an unsuccessful one,
+        everybody knows that neither player owns it.
+        """
+        if success:
+            self.public_knowledge.record_owner(card, player1.seat)
+        else:
+            self.public_knowledge.record_non_owner(card, player1.seat, player2.seat)
+        for observer in self.observers:
+            observer.observe_request(player1.seat, player2.seat, card, success)
 
     @property
     def in_game_players(self) -> List[Player]:
@@ -297,6 +321,9 @@ class QuartetGame:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=10, format="%(message)s")
+    handler = logging.FileHandler(filename="logs/clever.log", mode="w")
+    LOGGER.addHandler(handler)
 
     names = ["Powpow", "Lucky Luke", "Donald Duck", "Ken"]
     policies = ["pretty-smart", "pretty-smart", "random", "semi-random"]
@@ -306,7 +333,7 @@ if __name__ == "__main__":
     random.shuffle(policies)
 
     players = [Player(name=n, decision_policy=p) for n, p in zip(names, policies)]
-    quartet = QuartetGame(players=players)
+    quartet = QuartetGame(players=players, events=LogRenderer(LOGGER))
 
     quartet.simulate_game()
     print(f"\nFinished the game in {quartet.round_nr} rounds")
@@ -0,0 +1,216 @@
+"""
+Compare two decision policies with as few games as necessary.
+
+Instead of playing a fixed, large number of games, a comparison plays chunks
+of games and tests after every chunk whether the result is significant yet.
+The statistic of a game is the win share of policy A minus that of policy B
+(averaged over their seats, ties split like in a tournament), and there are
+two stopping rules:
+
+- ci: an always-valid confidence interval for the mean difference (a normal
+    mixture confidence sequence). The comparison stops as soon as the
+    interval excludes zero, or fits within +/- the effect size, in which case
+    the policies are equally strong for all practical purposes. Looking at
+    the interval after every chunk does not inflate the error rate.
+- sprt: a sequential probability ratio test of "A wins <effect> more often
+    than B" against "A is not better than B", with error rates alpha and
+    beta.
+
+Chunks are played by a process pool but consumed in order, so a comparison
+with a given --seed and --chunk-size always stops at the same game:
+
+    $ python3 comparison.py pretty-smart semi-random --seed 42
+    $ python3 comparison.py pretty-smart semi-random --rule sprt --effect 0.02
+"""
+import argparse
+import math
+from multiprocessing import Pool
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from seeding import derive_seed, new_root_seed
+from tournament import SEAT_NAMES, TournamentResult, play_game, seatings
+
+
+RULES = ("ci", "sprt")
+# Games below which no decision is taken, because the variance estimate is
+# still too rough
+MIN_GAMES = 100
+# The confidence sequence is tightest around this number of games
+MIXTURE_GAMES = 1000
+
+
+class Progress(NamedTuple):
+    """ The state of a comparison after a chunk of games """
+
+    games: int
+    difference: float  # mean win share of A minus B
+    low: float  # confidence bounds of the difference
+    high: float
+    llr: float  # log-likelihood ratio of the SPRT
+    decision: Optional[str]  # None while the comparison is still running
+    result: TournamentResult
+
+    def __repr__(self) -> str:
+        line = (
+            f"{self.games:>8} games  difference {self.difference:+.4f}  "
+            f"[{self.low:+.4f}, {self.high:+.4f}]  llr {self.llr:+.2f}"
+        )
+        if self.decision is not None:
+            line += f"  -> {self.decision}"
+        return line
+
+
+def game_difference(policies: Sequence[str], points: Sequence[int], a: str, b: str) -> float:
+    """ The mean win share of the seats of <a> minus those of <b> in one game """
+    best = max(points)
+    winner_count = points.count(best)
+    shares = {a: [], b: []}
+    for policy, p in zip(policies, points):
+        if policy in shares:
+            shares[policy].append(1 / winner_count if p == best else 0.0)
+    return sum(shares[a]) / len(shares[a]) - sum(shares[b]) / len(shares[b])
+
+
+def play_comparison_chunk(
+    task: Tuple[str, str, Sequence[str], int, int, int]
+) -> Tuple[TournamentResult, List[float]]:
+    """ Play games <start> up to <stop> and return their differences too """
+    a, b, policies, root_seed, start, stop = task
+    rotation = seatings(policies)
+
+    result, differences = TournamentResult(), []
+    for game_nr in range(start, stop):
+        seed = derive_seed(root_seed, game_nr)
+        summary = play_game(rotation[game_nr % len(rotation)], seed=seed)
+        result.add_game(summary)
+        differences.append(game_difference(summary.policies, summary.points, a, b))
+    return result, differences
+
+
+def confidence_radius(n: int, variance: float, alpha: float) -> float:
+    """
+    Radius around the mean of <n> games of a normal mixture confidence
+    sequence: the true mean lies within it at every <n> at once, with
+    probability 1 - alpha.
+    """
+    v = n * variance
+    rho = MIXTURE_GAMES * variance
+    return math.sqrt((v + rho) * math.log((v + rho) / (rho * alpha ** 2))) / n
+
+
+def sprt_llr(n: int, total: float, variance: float, effect: float) -> float:
+    """ Log-likelihood ratio of difference <effect> against 0, normal approximation """
+    return effect / variance * (total - n * effect / 2)
+
+
+def compare_policies(
+    a: str,
+    b: str,
+    policies: Optional[Sequence[str]] = None,
+    max_games: int = 100000,
+    rule: str = "ci",
+    effect: float = 0.02,
+    alpha: float = 0.05,
+    beta: float = 0.05,
+    processes: Optional[int] = None,
+    chunk_size: int = 200,
+    seed: Optional[int] = None,
+) -> Iterator[Progress]:
+    """
+    Play games of <a> against <b> until the <rule> reaches a decision or
+    <max_games> games were played, and yield the progress after every chunk.
+    The line-up defaults to two seats for each policy; other policies can
+    take part in <policies> as well.
+    """
+    if rule not in RULES:
+        raise ValueError(f'Unknown stopping rule "{rule}". Use one of {RULES}')
+    if policies is None:
+        policies = [a, b] * (len(SEAT_NAMES) // 2)
+    if len(policies) != len(SEAT_NAMES):
+        raise ValueError(f"A game needs exactly {len(SEAT_NAMES)} policies")
+    if a == b or a not in policies or b not in policies:
+        raise ValueError("Both policies need a seat of their own in the line-up")
+
+    root_seed = seed if seed is not None else new_root_seed()
+    tasks = (
+        (a, b, tuple(policies), root_seed, start, min(start + chunk_size, max_games))
+        for start in range(0, max_games, chunk_size)
+    )
+    upper, lower = math.log((1 - beta) / alpha), math.log(beta / (1 - alpha))
+
+    result = TournamentResult(seed=root_seed)
+    n, total, squares = 0, 0.0, 0.0
+    with Pool(processes=processes) as pool:
+        for partial, differences in pool.imap(play_comparison_chunk, tasks):
+            result.merge(partial)
+            n += len(differences)
+            total += sum(differences)
+            squares += sum(d * d for d in differences)
+
+            mean = total / n
+            variance = max(squares / n - mean * mean, 1e-9)
+            radius = confidence_radius(n, variance, alpha)
+            llr = sprt_llr(n, total, variance, effect)
+
+            decision = None
+            if n >= MIN_GAMES and rule == "ci":
+                if mean - radius > 0:
+                    decision = f"{a} is stronger"
+                elif mean + radius < 0:
+                    decision = f"{b} is stronger"
+                elif -effect < mean - radius and mean + radius < effect:
+                    decision = f"no difference of {effect} or more"
+            elif n >= MIN_GAMES and rule == "sprt":
+                if llr >= upper:
+                    decision = f"{a} wins at least {effect} more often"
+                elif llr <= lower:
+                    decision = f"{a} is not better"
+            if decision is None and n >= max_games:
+                decision = "undecided"
+
+            yield Progress(n, mean, mean - radius, mean + radius, llr, decision, result)
+            if decision is not None:
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("a", help="the policy that is tested")
+    parser.add_argument("b", help="the policy it is compared with")
+    parser.add_argument(
+        "--policies",
+        nargs=4,
+        default=None,
+        help="the line-up, if not two seats for each policy",
+    )
+    parser.add_argument("--rule", choices=RULES, default="ci")
+    parser.add_argument(
+        "--effect",
+        type=float,
+        default=0.02,
+        help="the smallest difference in win rate that matters",
+    )
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--max-games", type=int, default=100000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    progress = None
+    for progress in compare_policies(
+        args.a,
+        args.b,
+        policies=args.policies,
+        max_games=args.max_games,
+        rule=args.rule,
+        effect=args.effect,
+        alpha=args.alpha,
+        beta=args.beta,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+    ):
+        print(progress, flush=True)
+    print(progress.result)
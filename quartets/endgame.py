@@ -0,0 +1,321 @@
+"""
+Exact solver for the endgame of clever quartets.
+
+Once only a few cards are left, the game is small enough to solve. Given the
+state of a QuartetGame, the solver computes the expected number of quartets
+every seat will still make, and the best card to ask (and from whom) for the
+player whose turn it is. The solver plays with perfect information about the
+remaining cards, and assumes that every other seat plays its own decision
+policy, which it knows.
+
+States are canonicalized before they are looked up: the groups are
+interchangeable and so are the cards within a group, as long as the public
+knowledge about them is the same. Solved states are kept in a transposition
+table that lives as long as the solver, so a batch of games keeps getting
+cheaper to solve.
+
+Because players can ask for the same cards over and over, the game graph has
+cycles. The solver therefore explores all states reachable from the one it
+is asked about, and runs value iteration over them.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from cards import Card, cards_in
+from knowledge import UNKNOWN
+
+
+# A card, as far as the solver cares: who owns it, whether everybody knows
+# that, and the bitmask of seats known not to own it
+Profile = Tuple[int, bool, int]
+# The profiles of the cards of a group that is still in play, sorted
+Group = Tuple[Profile, ...]
+# The policy per seat, the groups in play (sorted) and the current seat
+StateKey = Tuple[Tuple[str, ...], Tuple[Group, ...], int]
+# Ask card <index> of group <index> from seat <asked>
+Action = Tuple[int, int, int]
+# Probability, next state and the seat that makes a quartet (or -1)
+Outcome = Tuple[float, StateKey, int]
+
+MAXIMIZER = "endgame"
+TERMINAL = -1
+
+
+class EndgameResult(NamedTuple):
+    """ The best ask and the expected number of quartets still to come """
+
+    card: Card
+    asked_seat: int
+    expected_quartets: Tuple[float, ...]
+
+
+def in_game_seats(groups: Sequence[Group]) -> List[int]:
+    """ The seats that still have cards """
+    return sorted({owner for group in groups for owner, _, _ in group})
+
+
+def canonical(groups: Sequence[Group]) -> Tuple[Group, ...]:
+    return tuple(sorted(tuple(sorted(group)) for group in groups))
+
+
+def eligible_cards(
+    groups: Sequence[Group], seat: int
+) -> List[Tuple[int, int, int]]:
+    """ (group index, card index, cards of the group in hand) per eligible card """
+    cards = []
+    for g, group in enumerate(groups):
+        in_hand = sum(1 for owner, _, _ in group if owner == seat)
+        if in_hand:
+            cards.extend((g, c, in_hand) for c, p in enumerate(group) if p[0] != seat)
+    return cards
+
+
+def policy_actions(
+    policy: str, groups: Sequence[Group], seat: int
+) -> Optional[List[Tuple[float, Action]]]:
+    """
+    The probability of each ask of a seat with a known policy, mirroring the
+    policies in policies.py. Returns None for policies the solver does not know.
+    """
+    eligible = eligible_cards(groups, seat)
+    others = [s for s in in_game_seats(groups) if s != seat]
+
+    if policy == "random":
+        cards = eligible
+    elif policy in ("semi-random", "pretty-smart"):
+        cards = eligible
+        if policy == "pretty-smart":
+            known = [e for e in eligible if groups[e[0]][e[1]][1]]
+            excluded = [e for e in eligible if groups[e[0]][e[1]][2]]
+            cards = known or excluded or eligible
+        best = max(in_hand for _, _, in_hand in cards)
+        cards = [e for e in cards if e[2] == best]
+    else:
+        return None
+
+    actions = []
+    for g, c, _ in cards:
+        owner, owner_known, non_owners = groups[g][c]
+        if policy == "pretty-smart" and owner_known:
+            asked = [owner]
+        elif policy == "pretty-smart":
+            asked = [s for s in others if not non_owners >> s & 1] or others
+        else:
+            asked = others
+        actions.extend((1 / len(cards) / len(asked), (g, c, s)) for s in asked)
+    return actions
+
+
+def apply_action(
+    policies: Tuple[str, ...], groups: Tuple[Group, ...], seat: int, action: Action
+) -> List[Outcome]:
+    """ The possible outcomes of <seat> making an ask, like QuartetGame does """
+    g, c, asked = action
+    owner, owner_known, non_owners = groups[g][c]
+    success = owner == asked
+
+    group = list(groups[g])
+    scorer = TERMINAL
+    if success:
+        group[c] = (seat, True, 0)
+    else:
+        group[c] = (owner, owner_known, non_owners | 1 << seat | 1 << asked)
+
+    new_groups = list(groups)
+    if all(p[0] == seat for p in group):
+        del new_groups[g]
+        scorer = seat
+    else:
+        new_groups[g] = tuple(group)
+    new_groups = canonical(new_groups)
+
+    in_game = in_game_seats(new_groups)
+    if len(in_game) <= 1:
+        return [(1.0, (policies, new_groups, TERMINAL), scorer)]
+
+    up_next = seat if success else asked
+    if up_next in in_game:
+        return [(1.0, (policies, new_groups, up_next), scorer)]
+    return [(1 / len(in_game), (policies, new_groups, s), scorer) for s in in_game]
+
+
+class Node(NamedTuple):
+    seat: int
+    maximize: bool
+    options: List[Tuple[Action, List[Outcome]]]
+
+
+class EndgameSolver:
+    """
+    Solves endgames with at most <max_cards> cards in play. Gives up on
+    states from which more than <max_states> new states are reachable.
+    """
+
+    def __init__(self, max_cards: int = 4, max_states: int = 20000):
+        self.max_cards = max_cards
+        self.max_states = max_states
+        self.table: Dict[StateKey, Tuple[float, ...]] = {}
+        # Roots that were too big to solve, so they are not explored again
+        self.unsolvable: Set[StateKey] = set()
+
+    def solve(self, game) -> Optional[EndgameResult]:
+        """
+        Returns the best ask for the current player of a QuartetGame, and the
+        expected number of quartets each seat will still make. Returns None if
+        the endgame is too big, or an opponent plays an unknown policy.
+        """
+        current = game.current_player.seat
+        policies = tuple(
+            MAXIMIZER if p.seat == current else p.decision_policy
+            for p in game.players
+        )
+
+        # Keep track of which actual card sits where in the canonical state
+        groups, cards = [], []
+        knowledge, layout = game.public_knowledge, game.layout
+        in_play = 0
+        for player in game.players:
+            in_play |= player.hand.mask
+        for group in layout.groups_in(layout.present_groups(in_play)):
+            group_cards = list(cards_in(layout.group_masks[group], layout))
+            owners = [
+                next((p.seat for p in game.players if card in p.hand), UNKNOWN)
+                for card in group_cards
+            ]
+            if UNKNOWN in owners:
+                continue
+            profiles = [
+                (
+                    owner,
+                    knowledge.owner_of(card) is not None,
+                    knowledge.non_owners_of(card),
+                )
+                for card, owner in zip(group_cards, owners)
+            ]
+            ordered = sorted(zip(profiles, group_cards))
+            groups.append(tuple(p for p, _ in ordered))
+            cards.append([c for _, c in ordered])
+
+        if sum(len(g) for g in groups) > self.max_cards:
+            return None
+        order = sorted(range(len(groups)), key=lambda i: groups[i])
+        groups = tuple(groups[i] for i in order)
+        cards = [cards[i] for i in order]
+
+        root = (policies, groups, current)
+        if not self._solve(root):
+            return None
+
+        node = self._expand(root)
+        action, _ = max(node.options, key=lambda o: self._q(o[1])[current])
+        g, c, asked = action
+        return EndgameResult(cards[g][c], asked, self.table[root])
+
+    def _q(
+        self,
+        outcomes: List[Outcome],
+        values: Optional[Dict[StateKey, Tuple[float, ...]]] = None,
+    ) -> List[float]:
+        """
+        The expected quartets per seat of a list of outcomes. States that are
+        not in <values> are looked up in the table.
+        """
+        q = [0.0] * len(outcomes[0][1][0])
+        for prob, key, scorer in outcomes:
+            value = values[key] if values and key in values else self.table[key]
+            for seat, v in enumerate(value):
+                q[seat] += prob * (v + (seat == scorer))
+        return q
+
+    @staticmethod
+    def _zeros(key: StateKey) -> Tuple[float, ...]:
+        return (0.0,) * len(key[0])
+
+    def _expand(self, key: StateKey) -> Optional[Node]:
+        policies, groups, seat = key
+        policy = policies[seat]
+        if policy == MAXIMIZER:
+            options = []
+            for g, c, _ in eligible_cards(groups, seat):
+                # Cards with the same profile in the same group are the same ask
+                if c > 0 and groups[g][c] == groups[g][c - 1]:
+                    continue
+                for asked in in_game_seats(groups):
+                    if asked != seat:
+                        action = (g, c, asked)
+                        options.append((action, apply_action(*key, action)))
+            return Node(seat, True, options)
+
+        actions = policy_actions(policy, groups, seat)
+        if actions is None:
+            return None
+        outcomes = [
+            (prob * p, next_key, scorer)
+            for prob, action in actions
+            for p, next_key, scorer in apply_action(*key, action)
+        ]
+        return Node(seat, False, [(None, outcomes)])
+
+    def _solve(self, root: StateKey, tolerance: float = 1e-6) -> bool:
+        """ Solve all states reachable from <root> into the table """
+        if root in self.table:
+            return True
+        if root in self.unsolvable:
+            return False
+
+        graph: Dict[StateKey, Node] = {}
+        stack = [root]
+        while stack:
+            key = stack.pop()
+            if key in graph or key in self.table:
+                continue
+            if key[2] == TERMINAL:
+                self.table[key] = self._zeros(key)
+                continue
+            node = self._expand(key)
+            if node is None or len(graph) >= self.max_states:
+                self.unsolvable.add(root)
+                return False
+            graph[key] = node
+            stack.extend(k for _, outcomes in node.options for _, k, _ in outcomes)
+
+        # Value iteration over index based arrays: state i is keys[i], and
+        # states that were solved before keep their value from the table
+        keys = list(graph)
+        index = {key: i for i, key in enumerate(keys)}
+        values = [self._zeros(key) for key in keys]
+        compiled = []
+        for key in keys:
+            node = graph[key]
+            options = []
+            for _, outcomes in node.options:
+                option = []
+                for prob, next_key, scorer in outcomes:
+                    if next_key not in index:
+                        index[next_key] = len(values)
+                        values.append(self.table[next_key])
+                    option.append((prob, index[next_key], scorer))
+                options.append(option)
+            compiled.append((node.seat, node.maximize, options))
+
+        seats = range(len(root[0]))
+        delta = 1.0
+        while delta > tolerance:
+            delta = 0.0
+            for i, (seat, maximize, options) in enumerate(compiled):
+                best = None
+                for option in options:
+                    q = [0.0] * len(seats)
+                    for prob, j, scorer in option:
+                        value = values[j]
+                        for s in seats:
+                            q[s] += prob * value[s]
+                        if scorer >= 0:
+                            q[scorer] += prob
+                    if best is None or (maximize and q[seat] > best[seat]):
+                        best = q
+                old = values[i]
+                delta = max(delta, max(abs(best[s] - old[s]) for s in seats))
+                values[i] = best
+
+        self.table.update((key, tuple(values[i])) for i, key in enumerate(keys))
+        return True
@@ -0,0 +1,357 @@
+"""
+Evaluate policies on every kind of deal, with common random numbers.
+
+A tournament draws a fresh deal for every game, and the luck of the deal
+makes up most of the noise in its results. This evaluation removes it:
+- Deals are canonicalized. The groups are interchangeable, and so are the
+    cards within a group and the seats other than the first (seat 0 always
+    starts). A deal is then just the multiset of "which seats hold the cards
+    of a group". The standard game has only 467 of those canonical deals,
+    which are all played, each weighted by the number of deals it stands for.
+- Every deal is played with every seating of the policies, and every
+    seating plays a deal with the same random numbers, so the seatings differ
+    by the policies only.
+- Each deal is replayed with different random numbers, the common deals
+    more often than the rare ones. The spread between replays of the same
+    deal gives the standard errors.
+
+For bigger games (more --policies than 4, or a bigger deck with --groups
+and --group-size), where enumerating the canonical deals is out of the
+question, --deals N samples N random deals instead, which are deduplicated
+the same way. The deals are then a random sample too, and the standard
+errors come from the spread between the deals.
+
+    $ python3 evaluation.py --policies belief pretty-smart semi-random random
+    $ python3 evaluation.py --policies pretty-smart pretty-smart semi-random semi-random --replays 4
+    $ python3 evaluation.py --policies belief pretty-smart random random random --groups 10 --deals 500
+"""
+import argparse
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import combinations_with_replacement, permutations
+from math import factorial, sqrt
+from multiprocessing import Pool
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cards import STANDARD_LAYOUT, Card, DeckLayout
+from clever import Player, QuartetGame
+from seeding import derive_seed, new_root_seed
+from tournament import DEFAULT_POLICIES, SEAT_NAMES, seatings
+
+
+# The seats that hold the cards of a group, sorted
+Signature = Tuple[int, ...]
+# The signatures of all groups, sorted
+CanonicalDeal = Tuple[Signature, ...]
+
+
+def hand_sizes(layout: DeckLayout, n_seats: int) -> List[int]:
+    """ The number of cards every seat is dealt, like QuartetGame deals them """
+    return [len(range(seat, len(layout), n_seats)) for seat in range(n_seats)]
+
+
+def seat_relabelings(layout: DeckLayout, n_seats: int) -> List[Tuple[int, ...]]:
+    """ The permutations of the seats that keep seat 0 and all hand sizes """
+    sizes = hand_sizes(layout, n_seats)
+    return [
+        (0,) + perm
+        for perm in permutations(range(1, n_seats))
+        if all(sizes[new] == sizes[old] for old, new in enumerate(perm, start=1))
+    ]
+
+
+def canonical_deal(
+    signatures: Sequence[Signature], relabelings: Sequence[Tuple[int, ...]]
+) -> CanonicalDeal:
+    """ The smallest form of a deal under all seat relabelings """
+    return min(
+        tuple(sorted(tuple(sorted(perm[s] for s in sig)) for sig in signatures))
+        for perm in relabelings
+    )
+
+
+def canonical_hands(
+    hands: Sequence[Sequence[Card]], layout: DeckLayout = STANDARD_LAYOUT
+) -> CanonicalDeal:
+    """ The canonical deal of a concrete deal """
+    owner = {card: seat for seat, hand in enumerate(hands) for card in hand}
+    signatures = [
+        tuple(sorted(owner[Card(group, nr)] for nr in range(1, layout.group_size + 1)))
+        for group in layout.groups
+    ]
+    return canonical_deal(signatures, seat_relabelings(layout, len(hands)))
+
+
+def hands_of(
+    deal: CanonicalDeal, n_seats: int, layout: DeckLayout = STANDARD_LAYOUT
+) -> List[List[Card]]:
+    """ A concrete deal for a canonical deal """
+    hands: List[List[Card]] = [[] for _ in range(n_seats)]
+    for group, signature in zip(layout.groups, deal):
+        for nr, seat in enumerate(signature, start=1):
+            hands[seat].append(Card(group, nr))
+    return hands
+
+
+def enumerate_deals(
+    n_seats: int = len(SEAT_NAMES), layout: DeckLayout = STANDARD_LAYOUT
+) -> List[Tuple[CanonicalDeal, int]]:
+    """
+    All canonical deals and the number of deals each stands for. The number
+    of candidates grows quickly with the size of the game, so this is only
+    feasible for small games like the standard one.
+    """
+    group_size = layout.group_size
+    sizes = hand_sizes(layout, n_seats)
+    relabelings = seat_relabelings(layout, n_seats)
+    signatures = list(combinations_with_replacement(range(n_seats), group_size))
+
+    # The ways to hand out the cards of a group according to a signature
+    card_ways = {}
+    for sig in signatures:
+        ways = factorial(group_size)
+        for count in Counter(sig).values():
+            ways //= factorial(count)
+        card_ways[sig] = ways
+
+    deals: Counter = Counter()
+    for combination in combinations_with_replacement(signatures, layout.n_groups):
+        counts = [0] * n_seats
+        for sig in combination:
+            for seat in sig:
+                counts[seat] += 1
+        if counts != sizes:
+            continue
+
+        # The ways to hand out the signatures to the groups, then the cards
+        weight = factorial(layout.n_groups)
+        for count in Counter(combination).values():
+            weight //= factorial(count)
+        for sig in combination:
+            weight *= card_ways[sig]
+        deals[canonical_deal(combination, relabelings)] += weight
+    return sorted(deals.items())
+
+
+def sample_deals(
+    n_deals: int,
+    n_seats: int = len(SEAT_NAMES),
+    layout: DeckLayout = STANDARD_LAYOUT,
+    seed: Optional[int] = None,
+) -> List[Tuple[CanonicalDeal, int]]:
+    """ <n_deals> random deals, canonicalized and counted """
+    rng = random.Random(seed)
+    deck = list(layout.cards)
+    deals: Counter = Counter()
+    for _ in range(n_deals):
+        rng.shuffle(deck)
+        deals[canonical_hands([deck[i::n_seats] for i in range(n_seats)], layout)] += 1
+    return sorted(deals.items())
+
+
+@dataclass
+class Estimate:
+    """
+    A weighted mean over deals, and its standard error. When all deals are
+    played, the error is only that of the replays: the spread within a deal
+    is pooled over all deals, so deals that were played only once count as
+    well. When the deals are a sample of <samples> random deals, the error
+    comes from the spread between the means of the deals, which includes
+    the spread of the replays.
+    """
+
+    mean: float = 0.0
+    squares: float = 0.0  # squared deviations from the mean of their deal
+    dof: int = 0
+    weights: float = 0.0  # sum of weight ** 2 / replays
+    mean_squares: float = 0.0  # sum of weight * (mean of the deal) ** 2
+    samples: int = 0  # the number of sampled deals, 0 if all were played
+
+    def add(self, weight: float, values: List[float]) -> None:
+        """ Add the outcomes of the replays of a deal with <weight> """
+        n = len(values)
+        mean = sum(values) / n
+        self.mean += weight * mean
+        self.mean_squares += weight * mean ** 2
+        self.squares += sum((v - mean) ** 2 for v in values)
+        self.dof += n - 1
+        self.weights += weight ** 2 / n
+
+    @property
+    def stderr(self) -> float:
+        if self.samples:
+            n = self.samples
+            if n < 2:
+                return float("nan")
+            variance = (self.mean_squares - self.mean ** 2) * n / (n - 1)
+            return sqrt(max(variance, 0.0) / n)
+        if not self.dof:
+            return float("nan")
+        return sqrt(self.squares / self.dof * self.weights)
+
+    def __repr__(self) -> str:
+        return f"{self.mean:.4f} +/- {self.stderr:.4f}"
+
+
+@dataclass
+class EvaluationResult:
+    """ Win rates and quartets per policy, and the differences in win rate """
+
+    deals: int = 0
+    games: int = 0
+    win_rate: Dict[str, Estimate] = field(default_factory=dict)
+    quartets: Dict[str, Estimate] = field(default_factory=dict)
+    differences: Dict[Tuple[str, str], Estimate] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+    def __repr__(self) -> str:
+        lines = [
+            f"{self.deals} canonical deals, {self.games} games (seed {self.seed})",
+            f"{'policy':<14}{'win rate':>22}{'quartets':>22}",
+        ]
+        for policy in sorted(self.win_rate):
+            lines.append(
+                f"{policy:<14}{self.win_rate[policy]!r:>22}{self.quartets[policy]!r:>22}"
+            )
+        for (a, b), estimate in sorted(self.differences.items()):
+            z = estimate.mean / estimate.stderr if estimate.stderr else float("inf")
+            lines.append(f"{a} - {b}: {estimate!r} (z = {z:+.1f})")
+        return "\n".join(lines)
+
+
+def seat_names(n_seats: int) -> List[str]:
+    if n_seats <= len(SEAT_NAMES):
+        return SEAT_NAMES[:n_seats]
+    return [f"Player {seat + 1}" for seat in range(n_seats)]
+
+
+def play_deal(
+    task: Tuple[CanonicalDeal, Sequence[str], int, int, int, DeckLayout]
+) -> List[Dict[str, Tuple[float, float]]]:
+    """
+    Play a canonical deal with every seating, <replays> times. Returns per
+    replay the mean win share and quartets of every policy over all seatings.
+    """
+    deal, policies, root_seed, deal_nr, replays, layout = task
+    hands = hands_of(deal, len(policies), layout)
+    names = seat_names(len(policies))
+    rotation = seatings(policies)
+
+    outcomes = []
+    for replay in range(replays):
+        # Common random numbers: every seating plays with the same seed
+        seed = derive_seed(root_seed, deal_nr, replay)
+        wins: Counter = Counter()
+        quartets: Counter = Counter()
+        seats: Counter = Counter()
+        for seating in rotation:
+            players = [Player(name=n, decision_policy=p) for n, p in zip(names, seating)]
+            game = QuartetGame(players=players, seed=seed, layout=layout, hands=hands)
+            game.simulate_game()
+            points = [p.points for p in players]
+            best = max(points)
+            for policy, p in zip(seating, points):
+                seats[policy] += 1
+                quartets[policy] += p
+                if p == best:
+                    wins[policy] += 1 / points.count(best)
+        outcomes.append(
+            {p: (wins[p] / seats[p], quartets[p] / seats[p]) for p in seats}
+        )
+    return outcomes
+
+
+def evaluate(
+    policies: Sequence[str] = DEFAULT_POLICIES,
+    deals: Optional[List[Tuple[CanonicalDeal, int]]] = None,
+    replays: int = 4,
+    processes: Optional[int] = None,
+    seed: Optional[int] = None,
+    sampled: bool = False,
+    layout: DeckLayout = STANDARD_LAYOUT,
+) -> EvaluationResult:
+    """
+    Play every deal of <deals> (all canonical deals by default) with every
+    seating of <policies>, a seat per policy, with the deck of <layout>.
+    Weigh the results by how often each deal occurs. A deal is replayed in proportion to its weight, <replays> times
+    on average but at least once. <sampled> deals are a random sample (see
+    sample_deals), whose weights are the number of times a deal was drawn.
+    """
+    if len(policies) < 2:
+        raise ValueError("A game needs at least 2 policies")
+    if deals is None:
+        deals = enumerate_deals(len(policies), layout)
+
+    root_seed = seed if seed is not None else new_root_seed()
+    total_weight = sum(weight for _, weight in deals)
+    deal_replays = [
+        max(1, round(replays * len(deals) * weight / total_weight))
+        for _, weight in deals
+    ]
+    tasks = (
+        (deal, tuple(policies), root_seed, deal_nr, n, layout)
+        for deal_nr, ((deal, _), n) in enumerate(zip(deals, deal_replays))
+    )
+
+    names = sorted(set(policies))
+    pairs = [(a, b) for a in names for b in names if a < b]
+    samples = total_weight if sampled else 0
+    result = EvaluationResult(
+        deals=len(deals),
+        games=sum(deal_replays) * len(seatings(policies)),
+        win_rate={p: Estimate(samples=samples) for p in names},
+        quartets={p: Estimate(samples=samples) for p in names},
+        differences={pair: Estimate(samples=samples) for pair in pairs},
+        seed=root_seed,
+    )
+
+    with Pool(processes=processes) as pool:
+        outcomes = pool.imap(play_deal, tasks, chunksize=8)
+        for (_, weight), replayed in zip(deals, outcomes):
+            w = weight / total_weight
+            for p in names:
+                result.win_rate[p].add(w, [r[p][0] for r in replayed])
+                result.quartets[p].add(w, [r[p][1] for r in replayed])
+            for a, b in pairs:
+                result.differences[a, b].add(w, [r[a][0] - r[b][0] for r in replayed])
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--policies", nargs="+", default=DEFAULT_POLICIES, help="a policy per seat"
+    )
+    parser.add_argument("--groups", type=int, default=STANDARD_LAYOUT.n_groups)
+    parser.add_argument("--group-size", type=int, default=STANDARD_LAYOUT.group_size)
+    parser.add_argument(
+        "--replays", type=int, default=4, help="the average replays per deal"
+    )
+    parser.add_argument(
+        "--deals",
+        type=int,
+        default=None,
+        metavar="N",
+        help="sample N deals instead of playing all canonical deals",
+    )
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else new_root_seed()
+    layout = DeckLayout(args.groups, args.group_size)
+    deals = None
+    if args.deals:
+        deals = sample_deals(
+            args.deals, len(args.policies), layout, seed=derive_seed(seed, -1)
+        )
+    print(evaluate(
+        args.policies,
+        deals,
+        args.replays,
+        args.processes,
+        seed,
+        sampled=deals is not None,
+        layout=layout,
+    ))
@@ -0,0 +1,236 @@
+"""
+The events a game of clever quartets emits, and the sinks that receive them.
+
+A game emits one typed event per thing that happens at the table. What
+happens with the events is up to the sink:
+- NullSink drops them. It is falsy, so the game does not even create them.
+- RingBufferSink keeps the last <maxlen> events in memory.
+- JsonlSink writes each event as one line of JSON to a file.
+- LogRenderer turns them into the human-readable log.
+
+A JSONL file can be rendered afterwards, too:
+
+    $ python3 events.py logs/clever.jsonl
+"""
+from collections import deque
+import json
+import logging
+import sys
+from typing import Dict, Iterator, List, NamedTuple, Tuple, Type, Union
+
+from cards import STANDARD_LAYOUT, Card, DeckLayout, cards_in
+
+
+class GameStarted(NamedTuple):
+    names: Tuple[str, ...]
+    policies: Tuple[str, ...]
+
+
+class RoundStarted(NamedTuple):
+    round_nr: int
+    hands: Tuple[int, ...]  # The bitmask of each seat's hand
+
+
+class Request(NamedTuple):
+    asker: int
+    asked: int
+    card: Card
+    eligible_count: int
+    success: bool
+
+
+class QuartetLaidDown(NamedTuple):
+    seat: int
+    group: str
+
+
+class NextPlayer(NamedTuple):
+    seat: int
+
+
+class GameFinished(NamedTuple):
+    rounds: int
+    points: Tuple[int, ...]
+
+
+Event = Union[
+    GameStarted, RoundStarted, Request, QuartetLaidDown, NextPlayer, GameFinished
+]
+EVENT_TYPES: Dict[str, Type[Event]] = {
+    cls.__name__: cls
+    for cls in (
+        GameStarted,
+        RoundStarted,
+        Request,
+        QuartetLaidDown,
+        NextPlayer,
+        GameFinished,
+    )
+}
+
+
+def to_json(event: Event) -> str:
+    """ Returns a single line of JSON for the event """
+    return json.dumps([type(event).__name__, *event], separators=(",", ":"))
+
+
+def from_json(line: str) -> Event:
+    """ Rebuild an event from a line written by to_json """
+    name, *fields = json.loads(line)
+    cls = EVENT_TYPES[name]
+    if cls is Request:
+        fields[2] = Card(*fields[2])
+    elif cls in (GameStarted, RoundStarted, GameFinished):
+        fields = [tuple(f) if isinstance(f, list) else f for f in fields]
+    return cls(*fields)
+
+
+def read_jsonl(path: str) -> Iterator[Event]:
+    """ Stream the events from a file written by JsonlSink """
+    with open(path) as file:
+        for line in file:
+            yield from_json(line)
+
+
+class EventSink:
+    """ Receives the events of a game. Subclasses decide what to do with them """
+
+    def emit(self, event: Event) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __bool__(self) -> bool:
+        return True
+
+
+class NullSink(EventSink):
+    """ Drops all events. The game skips creating events for a falsy sink """
+
+    def emit(self, event: Event) -> None:
+        pass
+
+    def __bool__(self) -> bool:
+        return False
+
+
+NULL_SINK = NullSink()
+
+
+class RingBufferSink(EventSink):
+    """ Keeps the last <maxlen> events in memory """
+
+    def __init__(self, maxlen: int = 10000):
+        self.buffer = deque(maxlen=maxlen)
+
+    def emit(self, event: Event) -> None:
+        self.buffer.append(event)
+
+    @property
+    def events(self) -> List[Event]:
+        return list(self.buffer)
+
+
+class JsonlSink(EventSink):
+    """ Writes every event as a line of JSON to <path> """
+
+    def __init__(self, path: str, mode: str = "w"):
+        self.file = open(path, mode)
+
+    def emit(self, event: Event) -> None:
+        self.file.write(to_json(event))
+        self.file.write("\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class LogRenderer(EventSink):
+    """
+    Renders the events as the human-readable log of the game. The sink is
+    falsy when the logger would drop INFO messages, so a silenced logger
+    costs nothing.
+    """
+
+    def __init__(self, logger: logging.Logger, layout: DeckLayout = STANDARD_LAYOUT):
+        self.logger = logger
+        self.layout = layout
+        self.names: Tuple[str, ...] = ()
+
+    def emit(self, event: Event) -> None:
+        self.logger.info(self.render(event))
+
+    def render(self, event: Event) -> str:
+        """ Returns the log lines for a single event """
+        if isinstance(event, GameStarted):
+            self.names = event.names
+            policies = "\n".join(
+                f"{n}'s policy: {p}" for n, p in zip(event.names, event.policies)
+            )
+            return "\n".join(
+                [
+                    f"Players at the table: {', '.join(event.names)}",
+                    policies,
+                    "Let the games begin!",
+                ]
+            )
+
+        names = self.names
+        if isinstance(event, RoundStarted):
+            hands = "\n".join(
+                f"{name}: {list(cards_in(hand, self.layout))}"
+                for name, hand in zip(names, event.hands)
+            )
+            return f"\nStarting round # {event.round_nr} ...\n{hands}"
+
+        if isinstance(event, Request):
+            asker, asked = names[event.asker], names[event.asked]
+            if event.success:
+                answer = f"{asker} gets {event.card} from {asked}"
+            else:
+                answer = f"{asked} does not have {event.card}"
+            return "\n".join(
+                [
+                    f"{asker} can ask for {event.eligible_count} cards",
+                    f"{asker} asks {asked}: {event.card}",
+                    answer,
+                ]
+            )
+
+        if isinstance(event, QuartetLaidDown):
+            name = names[event.seat]
+            group_mask = self.layout.group_masks[event.group]
+            quartet_cards = list(cards_in(group_mask, self.layout))
+            return "\n".join(
+                [
+                    f"{name} has a quartet with {event.group}!",
+                    f"{name} is putting down {quartet_cards}",
+                ]
+            )
+
+        if isinstance(event, NextPlayer):
+            return f"Next round it will be {names[event.seat]}'s turn"
+
+        if isinstance(event, GameFinished):
+            points = "\n".join(
+                f"{name} has {p} quartets" for name, p in zip(names, event.points)
+            )
+            return f"\nThe game finished after {event.rounds} rounds!\n{points}"
+
+        raise TypeError(f"Cannot render {event!r}")
+
+    def __bool__(self) -> bool:
+        return self.logger.isEnabledFor(logging.INFO)
+
+
+if __name__ == "__main__":
+    renderer = LogRenderer(logging.getLogger("quartet_logger"))
+    for event in read_jsonl(sys.argv[1]):
+        print(renderer.render(event))
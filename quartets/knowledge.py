@@ -0,0 +1,112 @@
+from array import array
+from typing import Optional, Protocol, Sequence
+
+from cards import STANDARD_LAYOUT, Card, DeckLayout
+
+
+UNKNOWN = -1
+# The non-owners of a card are a 64-bit mask of seats
+MAX_SEATS = 64
+
+
+class PublicKnowledge:
+    """
+    Everything the players at the table know about the location of the cards.
+
+    The knowledge is a fixed card x seat matrix, with seats identified by
+    their integer seat id. Each card has:
+    - the seat that is known to own the card, or UNKNOWN
+    - a bitmask of the seats that are known not to own the card
+
+    Besides that, two bitmasks over the deck keep track of the cards of which
+    the owner is known and the cards of which at least one non-owner is known.
+    Asking the same card twice does not make the knowledge grow, so the memory
+    of a game stays the same however long the game runs.
+    """
+
+    __slots__ = (
+        "n_seats",
+        "layout",
+        "owners",
+        "non_owners",
+        "owner_known",
+        "non_owner_known",
+    )
+
+    def __init__(self, n_seats: int, layout: DeckLayout = STANDARD_LAYOUT):
+        if n_seats > MAX_SEATS:
+            raise ValueError(f"The public knowledge can hold up to {MAX_SEATS} seats")
+        self.n_seats = n_seats
+        self.layout = layout
+        self.owners = array("b", [UNKNOWN]) * len(layout)
+        self.non_owners = array("Q", [0]) * len(layout)
+        self.owner_known = 0
+        self.non_owner_known = 0
+
+    def owner_of(self, card: Card) -> Optional[int]:
+        """ Returns the seat that is known to own <card>, if any """
+        seat = self.owners[self.layout.card_index[card]]
+        return None if seat == UNKNOWN else seat
+
+    def non_owners_of(self, card: Card) -> int:
+        """ Returns the bitmask of seats that are known not to own <card> """
+        return self.non_owners[self.layout.card_index[card]]
+
+    def is_non_owner(self, card: Card, seat: int) -> bool:
+        """ Check whether <seat> is known not to own <card> """
+        return bool(self.non_owners[self.layout.card_index[card]] >> seat & 1)
+
+    def record_owner(self, card: Card, seat: int) -> None:
+        """ <seat> owns <card>, which means nobody else does """
+        index = self.layout.card_index[card]
+        self.owners[index] = seat
+        self.non_owners[index] = 0
+        self.owner_known |= 1 << index
+        self.non_owner_known &= ~(1 << index)
+
+    def record_non_owner(self, card: Card, *seats: int) -> None:
+        """ None of <seats> owns <card> """
+        index = self.layout.card_index[card]
+        for seat in seats:
+            self.non_owners[index] |= 1 << seat
+        self.non_owner_known |= 1 << index
+
+    def reset(self) -> None:
+        """ Forget everything, e.g. before the next game at the same table """
+        self.owners = array("b", [UNKNOWN]) * len(self.owners)
+        self.non_owners = array("Q", [0]) * len(self.non_owners)
+        self.owner_known = 0
+        self.non_owner_known = 0
+
+    def copy(self) -> "PublicKnowledge":
+        other = PublicKnowledge.__new__(PublicKnowledge)
+        other.n_seats = self.n_seats
+        other.layout = self.layout
+        other.owners = array("b", self.owners)
+        other.non_owners = array("Q", self.non_owners)
+        other.owner_known = self.owner_known
+        other.non_owner_known = self.non_owner_known
+        return other
+
+    def __repr__(self) -> str:
+        lines = []
+        for card, owner, non_owners in zip(self.layout.cards, self.owners, self.non_owners):
+            if owner != UNKNOWN:
+                lines.append(f"{card}: owned by seat {owner}")
+            elif non_owners:
+                seats = [s for s in range(self.n_seats) if non_owners >> s & 1]
+                lines.append(f"{card}: not owned by seats {seats}")
+        return "\n".join(lines)
+
+
+class GameObserver(Protocol):
+    """ Something that keeps track of what becomes public during a game """
+
+    def observe_deal(self, hand_sizes: Sequence[int]) -> None:
+        """ The cards were dealt, and every seat holds <hand_sizes> cards """
+
+    def observe_request(self, asker: int, asked: int, card: Card, success: bool) -> None:
+        """ <asker> asked <asked> for <card>, with or without success """
+
+    def observe_quartet(self, seat: int, group: str) -> None:
+        """ <seat> put down the cards of <group> """
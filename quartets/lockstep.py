@@ -0,0 +1,268 @@
+"""
+Simulate many games of clever quartets at once, in lockstep, with NumPy.
+
+Every game at the table is a row in a couple of arrays:
+- owner (games x cards): the seat that holds each card, or -1 once the card
+    has been put down as part of a quartet
+- known_owner / non_owners (games x cards): the public knowledge, i.e. the
+    seat that is known to own a card and a bitmask of the seats known not to
+- hand_sizes and points (games x seats)
+
+Each step plays one round of every game that is still running. The decision
+policies `random`, `semi-random` and `pretty-smart` of `clever.Player` are
+expressed as a random key per eligible card: the card with the highest key
+is asked for. Ties within the best rank are broken uniformly at random, just
+like in the object oriented engine.
+
+    $ python3 lockstep.py --games 1000000
+    $ python3 lockstep.py --check 5000
+"""
+import argparse
+import math
+import time
+from typing import Dict, NamedTuple, Sequence, Union
+
+import numpy as np
+
+from cards import FULL_DECK, GROUPS, GROUP_SIZE
+from tournament import (
+    DEFAULT_POLICIES,
+    SEAT_NAMES,
+    PolicyStats,
+    TournamentResult,
+    play_game,
+    seatings,
+)
+
+
+POLICY_CODES = {"random": 0, "semi-random": 1, "pretty-smart": 2}
+RANDOM, SEMI_RANDOM, PRETTY_SMART = 0, 1, 2
+
+N_CARDS = len(FULL_DECK)
+N_GROUPS = len(GROUPS)
+N_SEATS = len(SEAT_NAMES)
+SEAT_BITS = (1 << np.arange(N_SEATS)).astype(np.uint8)
+
+
+class LockstepResult(NamedTuple):
+    """ The outcome of all games: one row per game """
+
+    policies: np.ndarray  # games x seats, policy codes
+    points: np.ndarray  # games x seats
+    rounds: np.ndarray  # games
+
+    def to_tournament_result(self) -> TournamentResult:
+        """ Aggregate the games the same way a tournament does """
+        best = self.points.max(axis=1, keepdims=True)
+        winners = self.points == best
+        win_share = winners / winners.sum(axis=1, keepdims=True)
+
+        result = TournamentResult(
+            games=len(self.rounds), rounds=int(self.rounds.sum())
+        )
+        for policy, code in POLICY_CODES.items():
+            seated = self.policies == code
+            if not seated.any():
+                continue
+            result.per_policy[policy] = PolicyStats(
+                seats=int(seated.sum()),
+                wins=float(win_share[seated].sum()),
+                quartets=int(self.points[seated].sum()),
+                rounds=int((self.rounds[:, None] * seated).sum()),
+            )
+        return result
+
+
+def deal(n_games: int, rng: np.random.Generator) -> np.ndarray:
+    """ Shuffle a deck per game and deal it like QuartetGame.deal_cards """
+    order = rng.random((n_games, N_CARDS)).argsort(axis=1)
+    owner = np.empty((n_games, N_CARDS), dtype=np.int8)
+    owner[np.arange(n_games)[:, None], order] = np.arange(N_CARDS) % N_SEATS
+    return owner
+
+
+def simulate_games(
+    n_games: int,
+    lineups: Sequence[Sequence[str]] = tuple(seatings(DEFAULT_POLICIES)),
+    seed: Union[None, int, np.random.SeedSequence] = None,
+) -> LockstepResult:
+    """
+    Play <n_games> games in lockstep. Game i seats the policies of
+    lineups[i % len(lineups)].
+
+    For sharded runs, give every shard its own stream, e.g.
+    `np.random.SeedSequence(root_seed).spawn(n_shards)[shard_nr]`.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.array([[POLICY_CODES[p] for p in lineup] for lineup in lineups])
+    policies = codes[np.arange(n_games) % len(codes)].astype(np.int8)
+
+    owner = deal(n_games, rng)
+    known_owner = np.full((n_games, N_CARDS), -1, dtype=np.int8)
+    non_owners = np.zeros((n_games, N_CARDS), dtype=np.uint8)
+    hand_sizes = np.full((n_games, N_SEATS), N_CARDS // N_SEATS, dtype=np.int16)
+    points = np.zeros((n_games, N_SEATS), dtype=np.int16)
+    rounds = np.zeros(n_games, dtype=np.int32)
+    current = np.zeros(n_games, dtype=np.int8)
+
+    # Quartets that were dealt straight away
+    by_seat = owner[:, :, None] == np.arange(N_SEATS)
+    full = by_seat.reshape(n_games, N_GROUPS, GROUP_SIZE, N_SEATS).all(axis=2)
+    points += full.sum(axis=1, dtype=np.int16)
+    hand_sizes -= GROUP_SIZE * full.sum(axis=1, dtype=np.int16)
+    owner.reshape(n_games, N_GROUPS, GROUP_SIZE)[full.any(axis=2)] = -1
+
+    active = np.arange(n_games)
+    while active.size:
+        rows = np.arange(active.size)
+        cur = current[active]
+        policy = policies[active, cur][:, None]
+        own = owner[active]
+        known = known_owner[active]
+        excluded = non_owners[active]
+
+        # Which card to ask for
+        hand = own == cur[:, None]
+        group_counts = hand.reshape(-1, N_GROUPS, GROUP_SIZE).sum(axis=2, dtype=np.int8)
+        score = np.repeat(group_counts, GROUP_SIZE, axis=1)
+        eligible = (score > 0) & ~hand
+
+        # random ignores the rank, semi-random ranks by group count and
+        # pretty-smart puts known owners first, then known non-owners. A card
+        # can have both (a wrong guess after its owner became known), it then
+        # only counts as a card of which the owner is known.
+        rank = score * (policy != RANDOM)
+        smart = policy[:, 0] == PRETTY_SMART
+        tier = np.where(
+            known[smart] >= 0,
+            np.int8(8),
+            np.where(excluded[smart] != 0, np.int8(4), np.int8(0)),
+        )
+        rank[smart] += tier
+        key = rng.random(own.shape, dtype=np.float32)
+        key += rank
+        key[~eligible] = -1
+        card = key.argmax(axis=1)
+
+        # Whom to ask for the card
+        in_game = hand_sizes[active] > 0
+        others = in_game.copy()
+        others[rows, cur] = False
+        card_non_owners = excluded[rows, card][:, None]
+        unexcluded = others & ((card_non_owners & SEAT_BITS) == 0)
+        use_unexcluded = smart & unexcluded.any(axis=1)
+        candidates = np.where(use_unexcluded[:, None], unexcluded, others)
+
+        player_key = rng.random(candidates.shape, dtype=np.float32)
+        player_key[~candidates] = -1
+        asked = player_key.argmax(axis=1)
+        card_owner = known[rows, card]
+        asked = np.where(smart & (card_owner >= 0), card_owner, asked)
+
+        # Handle the request and update the public knowledge
+        success = own[rows, card] == asked
+        games, winner, loser = active[success], cur[success], asked[success]
+        won = card[success]
+        owner[games, won] = winner
+        known_owner[games, won] = winner
+        non_owners[games, won] = 0
+        hand_sizes[games, winner] += 1
+        hand_sizes[games, loser] -= 1
+
+        failed = ~success
+        non_owners[active[failed], card[failed]] |= (
+            SEAT_BITS[cur[failed]] | SEAT_BITS[asked[failed]]
+        )
+
+        # Only the group of a received card can have become a quartet
+        group_cards = (won // GROUP_SIZE)[:, None] * GROUP_SIZE + np.arange(GROUP_SIZE)
+        quartet = (owner[games[:, None], group_cards] == winner[:, None]).all(axis=1)
+        owner[games[quartet][:, None], group_cards[quartet]] = -1
+        points[games[quartet], winner[quartet]] += 1
+        hand_sizes[games[quartet], winner[quartet]] -= GROUP_SIZE
+
+        # Determine next round's starting player
+        in_game = hand_sizes[active] > 0
+        up_next = np.where(success, cur, asked)
+        fallback_key = rng.random(in_game.shape, dtype=np.float32)
+        fallback_key[~in_game] = -1
+        finished = ~in_game[rows, up_next]
+        up_next = np.where(finished, fallback_key.argmax(axis=1), up_next)
+
+        current[active] = up_next
+        rounds[active] += 1
+        active = active[in_game.sum(axis=1) > 1]
+
+    return LockstepResult(policies=policies, points=points, rounds=rounds)
+
+
+def compare_with_quartet_game(
+    n_games: int, lineups: Sequence[Sequence[str]] = tuple(seatings(DEFAULT_POLICIES))
+) -> Dict[str, float]:
+    """
+    Play <n_games> games with both engines and return z-scores for the
+    difference between them: the win rate of every policy and the mean
+    number of rounds. If both engines play the same game, the z-scores
+    are standard normal.
+    """
+    rounds_oo = []
+    points_oo = []
+    for game_nr in range(n_games):
+        summary = play_game(lineups[game_nr % len(lineups)])
+        rounds_oo.append(summary.rounds)
+        points_oo.append(summary.points)
+
+    codes = np.array([[POLICY_CODES[p] for p in lineup] for lineup in lineups])
+    oo = LockstepResult(
+        policies=codes[np.arange(n_games) % len(codes)],
+        points=np.array(points_oo),
+        rounds=np.array(rounds_oo),
+    )
+    lockstep = simulate_games(n_games, lineups)
+
+    z_scores = {}
+    result_oo, result_ls = oo.to_tournament_result(), lockstep.to_tournament_result()
+    for policy, stats_oo in result_oo.per_policy.items():
+        stats_ls = result_ls.per_policy[policy]
+        p1, n1 = stats_oo.win_rate, stats_oo.seats
+        p2, n2 = stats_ls.win_rate, stats_ls.seats
+        pooled = (stats_oo.wins + stats_ls.wins) / (n1 + n2)
+        std = math.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+        z_scores[f"{policy} win rate"] = (p1 - p2) / std
+
+    std = math.sqrt(oo.rounds.var() / n_games + lockstep.rounds.var() / n_games)
+    z_scores["rounds"] = (oo.rounds.mean() - lockstep.rounds.mean()) / std
+    return z_scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--policies", nargs=4, default=DEFAULT_POLICIES)
+    parser.add_argument(
+        "--check",
+        type=int,
+        default=0,
+        metavar="N",
+        help="compare N games against the object oriented engine instead",
+    )
+    args = parser.parse_args()
+    lineups = tuple(seatings(args.policies))
+
+    if args.check:
+        # Always check a table that mixes pretty-smart with the others too
+        tables = [args.policies]
+        if sorted(args.policies) != sorted(DEFAULT_POLICIES):
+            tables.append(DEFAULT_POLICIES)
+        for table in tables:
+            print(", ".join(table))
+            z_scores = compare_with_quartet_game(args.check, tuple(seatings(table)))
+            for name, z in z_scores.items():
+                print(f"{name:<24} z = {z:+.2f}")
+    else:
+        start = time.perf_counter()
+        result = simulate_games(args.games, lineups, seed=args.seed)
+        duration = time.perf_counter() - start
+        print(result.to_tournament_result())
+        print(f"{args.games / duration * 60:,.0f} games per minute")
@@ -0,0 +1,409 @@
+"""
+Replay the human-readable quartet logs from any game or round, without
+reading them from the start.
+
+`logs/clever.log` and `logs/naive.log` dump all hands at the start of every
+round, and a batch log holds many games after each other. The first time a
+log is replayed, a sidecar index (<log>.idx) is built in a single pass: the
+byte offset of every game and every round, the players and policies of every
+game, its deck layout and the quartets that were laid down. The index is
+rebuilt whenever the log changes.
+
+With the index, the state at the start of a round is read straight from the
+round's hand dump. Points come from the index. Only the public knowledge
+needs the earlier rounds of the same game, of which just the requests are
+parsed. From there, the rest of the log is streamed round by round:
+
+    $ python3 log_replay.py logs/clever.log --game 0 --round 12
+    $ python3 log_replay.py batch.log --nth-round 5000 --stream
+
+A round state can be turned back into a QuartetGame, which plays on from
+there (with fresh random numbers, as the logs hold no seeds).
+"""
+import argparse
+from bisect import bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
+import json
+import os
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from cards import Card, DeckLayout, RankedHand
+from clever import Player, QuartetGame
+from knowledge import PublicKnowledge
+
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+GAME_START = b"Players at the table: "
+ROUND_START = b"Starting round # "
+GAME_END = b"The game finished after "
+POLICY = "'s policy: "
+CAN_ASK = " can ask for "
+ASKS = " asks "
+DOES_NOT_HAVE = " does not have "
+QUARTET = " has a quartet with "
+PUTTING_DOWN = " is putting down "
+
+
+def parse_card(text: str) -> Card:
+    """ A card as the logs print it, e.g. B-3 """
+    group, number = text.rsplit("-", 1)
+    return Card(group, int(number))
+
+
+def parse_cards(text: str) -> List[Card]:
+    """ A list of cards as the logs print it, e.g. [B-3, C-1] """
+    text = text.strip()[1:-1]
+    return [parse_card(card) for card in text.split(", ")] if text else []
+
+
+def group_number(name: str) -> int:
+    """ The index of a group name, the inverse of cards.group_name """
+    index = 0
+    for char in name:
+        index = index * 26 + ord(char) - ord("A") + 1
+    return index - 1
+
+
+@dataclass
+class GameEntry:
+    """ Where a game is in the log, and what the index knows about it """
+
+    offset: int
+    names: List[str]
+    policies: List[str]
+    layout: Tuple[int, int]  # Number of groups, cards per group
+    rounds: List[int]  # The offset of every round, round 1 first
+    quartets: List[Tuple[int, int, str]]  # Round (0 for the deal), seat, group
+
+    def points_before(self, round_nr: int) -> List[int]:
+        """ The quartets of every seat at the start of <round_nr> """
+        points = [0] * len(self.names)
+        for round_laid, seat, _ in self.quartets:
+            if round_laid < round_nr:
+                points[seat] += 1
+        return points
+
+
+@dataclass
+class LogIndex:
+    """ The games of a log, and the size and time of the log it was built for """
+
+    size: int
+    mtime_ns: int
+    games: List[GameEntry]
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "version": INDEX_VERSION,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "games": [vars(game) for game in self.games],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, object]) -> "LogIndex":
+        games = [
+            GameEntry(
+                offset=g["offset"],
+                names=g["names"],
+                policies=g["policies"],
+                layout=tuple(g["layout"]),
+                rounds=g["rounds"],
+                quartets=[tuple(q) for q in g["quartets"]],
+            )
+            for g in data["games"]
+        ]
+        return cls(data["size"], data["mtime_ns"], games)
+
+
+def build_index(path: str) -> LogIndex:
+    """ Index the games and rounds of the log at <path> in a single pass """
+    stat = os.stat(path)
+    games: List[GameEntry] = []
+    game: Optional[GameEntry] = None
+    seats: Dict[str, int] = {}
+    round_nr = 0
+    # The cards seen before round 2, to tell the deck layout
+    dealt: List[Card] = []
+
+    def close_layout() -> None:
+        if game is not None and dealt:
+            n_groups = max(group_number(card.group) for card in dealt) + 1
+            game.layout = (n_groups, max(card.number for card in dealt))
+            dealt.clear()
+
+    with open(path, "rb") as file:
+        offset = 0
+        for raw in file:
+            line_offset, offset = offset, offset + len(raw)
+            if raw.startswith(GAME_START):
+                close_layout()
+                names = raw[len(GAME_START) :].decode().rstrip("\n").split(", ")
+                game = GameEntry(line_offset, names, ["random"] * len(names), (0, 0), [], [])
+                games.append(game)
+                seats = {name: seat for seat, name in enumerate(names)}
+                round_nr = 0
+                continue
+            if game is None:
+                continue
+
+            if raw.startswith(ROUND_START):
+                round_nr += 1
+                game.rounds.append(line_offset)
+                if round_nr == 2:
+                    close_layout()
+                continue
+
+            line = raw.decode().rstrip("\n")
+            if round_nr == 0 and POLICY in line:
+                name, _, policy = line.rpartition(POLICY)
+                game.policies[seats[name]] = policy
+            elif QUARTET in line:
+                name, _, group = line.rpartition(QUARTET)
+                game.quartets.append((round_nr, seats[name], group.rstrip("!")))
+            elif round_nr <= 1 and PUTTING_DOWN in line:
+                dealt.extend(parse_cards(line.rpartition(PUTTING_DOWN)[2]))
+            elif round_nr == 1 and ": [" in line:
+                dealt.extend(parse_cards(line.rpartition(": ")[2]))
+        close_layout()
+
+    return LogIndex(stat.st_size, stat.st_mtime_ns, games)
+
+
+def load_index(path: str, rebuild: bool = False) -> LogIndex:
+    """
+    The index of the log at <path>, from its sidecar file if that is still
+    up to date. Otherwise the index is built and the sidecar (re)written.
+    """
+    index_path = path + INDEX_SUFFIX
+    stat = os.stat(path)
+    if not rebuild and os.path.exists(index_path):
+        with open(index_path) as file:
+            data = json.load(file)
+        if (
+            data.get("version") == INDEX_VERSION
+            and data["size"] == stat.st_size
+            and data["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return LogIndex.from_json(data)
+
+    index = build_index(path)
+    with open(index_path, "w") as file:
+        json.dump(index.to_json(), file)
+    return index
+
+
+class RoundState(NamedTuple):
+    """ Everything there is to know at the start of a round """
+
+    game_nr: int
+    round_nr: int
+    names: Tuple[str, ...]
+    policies: Tuple[str, ...]
+    layout: DeckLayout
+    hands: Tuple[Tuple[Card, ...], ...]
+    points: Tuple[int, ...]
+    current_seat: int
+    knowledge: PublicKnowledge
+
+
+class LogReplay:
+    """ Seeks in and streams from a quartet log, by means of its index """
+
+    def __init__(self, path: str, rebuild_index: bool = False):
+        self.path = path
+        self.index = load_index(path, rebuild=rebuild_index)
+        self._layouts: Dict[Tuple[int, int], DeckLayout] = {}
+        # The number of rounds before every game, to find the n-th round
+        self._rounds_before = [0] + list(
+            accumulate(len(game.rounds) for game in self.index.games)
+        )
+
+    @property
+    def games(self) -> List[GameEntry]:
+        return self.index.games
+
+    def locate(self, nth_round: int) -> Tuple[int, int]:
+        """ The game and round number of the <nth_round> round of the log (from 1) """
+        if not 1 <= nth_round <= self._rounds_before[-1]:
+            raise IndexError(f"The log has {self._rounds_before[-1]} rounds")
+        game_nr = bisect_right(self._rounds_before, nth_round - 1) - 1
+        return game_nr, nth_round - self._rounds_before[game_nr]
+
+    def state(self, game_nr: int, round_nr: int = 1) -> RoundState:
+        """ The state at the start of round <round_nr> of game <game_nr> """
+        return next(self.stream(game_nr, round_nr))
+
+    def stream(self, game_nr: int = 0, round_nr: int = 1) -> Iterator[RoundState]:
+        """ The state of every round from <round_nr> of <game_nr> to the end of the log """
+        games = self.index.games
+        if not 0 <= game_nr < len(games):
+            raise IndexError(f"The log has {len(games)} games")
+        if not 1 <= round_nr <= len(games[game_nr].rounds):
+            raise IndexError(f"Game {game_nr} has {len(games[game_nr].rounds)} rounds")
+
+        with open(self.path, "rb") as file:
+            for nr in range(game_nr, len(games)):
+                start = round_nr if nr == game_nr else 1
+                yield from self._stream_game(file, nr, start)
+
+    def restore_game(self, state: RoundState, **kwargs) -> QuartetGame:
+        """
+        A QuartetGame in <state>, ready to play on: call play_request until
+        the game is over, then finish (not start, which would deal again).
+        Keyword arguments go to QuartetGame. Policies that follow the game from its
+        start (see QuartetGame.observers) only see it from <state> on: they
+        are told about a deal of the hands in <state>, and about the groups
+        that were put down already.
+        """
+        players = [
+            Player(name=name, decision_policy=policy)
+            for name, policy in zip(state.names, state.policies)
+        ]
+        game = QuartetGame(players=players, layout=state.layout, **kwargs)
+        for player, hand, points in zip(players, state.hands, state.points):
+            player.hand = RankedHand(hand, state.layout)
+            player.points = points
+        game.round_nr = state.round_nr
+        game.public_knowledge = state.knowledge.copy()
+        game._current_player = players[state.current_seat]
+
+        if game.observers:
+            layout = state.layout
+            hand_sizes = [len(hand) for hand in state.hands]
+            in_play = {card.group for hand in state.hands for card in hand}
+            gone = [group for group in layout.groups if group not in in_play]
+            # Whoever put down a group, taking it out of seat 0 leaves the
+            # same hand sizes
+            hand_sizes[0] += layout.group_size * len(gone)
+            for observer in game.observers:
+                observer.observe_deal(hand_sizes)
+                for group in gone:
+                    observer.observe_quartet(0, group)
+        return game
+
+    def _layout(self, shape: Tuple[int, int]) -> DeckLayout:
+        layout = self._layouts.get(shape)
+        if layout is None:
+            layout = self._layouts[shape] = DeckLayout(*shape)
+        return layout
+
+    def _stream_game(
+        self, file: BinaryIO, game_nr: int, start_round: int
+    ) -> Iterator[RoundState]:
+        entry = self.index.games[game_nr]
+        if not entry.rounds:
+            return
+        seats = {name: seat for seat, name in enumerate(entry.names)}
+        layout = self._layout(entry.layout)
+        knowledge = PublicKnowledge(len(entry.names), layout)
+
+        # The public knowledge needs the requests of the earlier rounds
+        if start_round > 1:
+            file.seek(entry.rounds[0])
+            remaining = entry.rounds[start_round - 1] - entry.rounds[0]
+            asked = None
+            for raw in file:
+                remaining -= len(raw)
+                if remaining < 0:
+                    break
+                asked = self._apply_request(raw, seats, knowledge, asked)
+
+        file.seek(entry.rounds[start_round - 1])
+        round_nr, hands, asked = start_round - 1, [], None
+        for raw in file:
+            if raw.startswith(ROUND_START):
+                round_nr += 1
+                hands = [
+                    tuple(parse_cards(file.readline().decode().rpartition(": ")[2]))
+                    for _ in entry.names
+                ]
+                continue
+            if raw.startswith(GAME_START) or raw.startswith(GAME_END):
+                break
+
+            line = raw.decode().rstrip("\n")
+            if CAN_ASK in line:
+                yield RoundState(
+                    game_nr=game_nr,
+                    round_nr=round_nr,
+                    names=tuple(entry.names),
+                    policies=tuple(entry.policies),
+                    layout=layout,
+                    hands=tuple(hands),
+                    points=tuple(entry.points_before(round_nr)),
+                    current_seat=seats[line.rpartition(CAN_ASK)[0]],
+                    knowledge=knowledge.copy(),
+                )
+            else:
+                asked = self._apply_request(raw, seats, knowledge, asked)
+
+    @staticmethod
+    def _apply_request(
+        raw: bytes,
+        seats: Dict[str, int],
+        knowledge: PublicKnowledge,
+        asked: Optional[Tuple[int, int, Card]],
+    ) -> Optional[Tuple[int, int, Card]]:
+        """
+        Update <knowledge> with a line of the log. Returns the request that
+        waits for its answer, if any.
+        """
+        line = raw.decode().rstrip("\n")
+        if asked is not None:
+            asker, asked_seat, card = asked
+            if DOES_NOT_HAVE in line:
+                knowledge.record_non_owner(card, asker, asked_seat)
+            else:
+                knowledge.record_owner(card, asker)
+            return None
+        if ASKS in line:
+            names, _, card = line.rpartition(": ")
+            asker, _, asked_name = names.partition(ASKS)
+            return seats[asker], seats[asked_name], parse_card(card)
+        return None
+
+
+def show_state(state: RoundState) -> str:
+    lines = [f"Game {state.game_nr}, round {state.round_nr}"]
+    for seat, (name, hand, points) in enumerate(
+        zip(state.names, state.hands, state.points)
+    ):
+        turn = "  <- to play" if seat == state.current_seat else ""
+        lines.append(f"{name} ({points} quartets): {list(hand)}{turn}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("log")
+    parser.add_argument("--game", type=int, default=0)
+    parser.add_argument("--round", type=int, default=1)
+    parser.add_argument(
+        "--nth-round", type=int, default=None, help="the n-th round of the whole log"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="print all rounds from there on"
+    )
+    parser.add_argument(
+        "--knowledge", action="store_true", help="print the public knowledge as well"
+    )
+    parser.add_argument("--rebuild-index", action="store_true")
+    args = parser.parse_args()
+
+    replay = LogReplay(args.log, rebuild_index=args.rebuild_index)
+    rounds = sum(len(game.rounds) for game in replay.games)
+    print(f"{len(replay.games)} games, {rounds} rounds")
+
+    game_nr, round_nr = args.game, args.round
+    if args.nth_round is not None:
+        game_nr, round_nr = replay.locate(args.nth_round)
+    for state in replay.stream(game_nr, round_nr):
+        print(f"\n{show_state(state)}")
+        if args.knowledge:
+            print(state.knowledge)
+        if not args.stream:
+            break
@@ -5,10 +5,7 @@ import random
 from typing import Any, List, NamedTuple, Tuple
 
 
-logging.basicConfig(level=10, format="%(message)s")
-handler = logging.FileHandler(filename="logs/naive.log", mode="w")
 LOGGER = logging.getLogger("quartet_logger")
-LOGGER.addHandler(handler)
 
 
 class Card(NamedTuple):
@@ -84,7 +81,8 @@ class Player:
 
     def choose_card(self) -> Card:
         """ Returns a card to ask for. """
-        LOGGER.info(f"{self.name} can ask for {len(self.eligible_cards)} cards")
+        if LOGGER.isEnabledFor(logging.INFO):
+            LOGGER.info("%s can ask for %d cards", self.name, len(self.eligible_cards))
         return random.choice(self.eligible_cards)
 
     def choose_player(self, card: Card, players: List["Player"]) -> "Player":
@@ -110,8 +108,8 @@ class QuartetGame:
     def simulate_game(self) -> None:
         """ Simulate the game of quartet """
         player_names = ", ".join(p.name for p in self.players)
-        LOGGER.info(f"Players at the table: {player_names}")
-        LOGGER.info(f"Let the games begin!")
+        LOGGER.info("Players at the table: %s", player_names)
+        LOGGER.info("Let the games begin!")
 
         # Set up the game:
         self.deal_cards()
@@ -120,8 +118,9 @@ class QuartetGame:
         # Go through the rounds until nobody's in the game
         while len(self.in_game_players) > 1:
             # Round start logging:
-            LOGGER.info(f"\nStarting round # {self.round_nr} ...")
-            LOGGER.info("\n".join(f"{k.name}: {k.hand}" for k in self.players))
+            if LOGGER.isEnabledFor(logging.INFO):
+                LOGGER.info("\nStarting round # %d ...", self.round_nr)
+                LOGGER.info("\n".join(f"{k.name}: {k.hand}" for k in self.players))
 
             current_player = self._current_player
 
@@ -134,10 +133,10 @@ class QuartetGame:
                 current_player.hand.append(asked_card)
 
                 name1, name2 = current_player.name, asked_player.name
-                LOGGER.info(f"{name1} gets {asked_card} from {name2}")
+                LOGGER.info("%s gets %s from %s", name1, asked_card, name2)
 
             elif not success_request:
-                LOGGER.info(f"{asked_player.name} does not have {asked_card}")
+                LOGGER.info("%s does not have %s", asked_player.name, asked_card)
 
             # Clean up full quartets and finished players:
             self.handle_players_quartet()
@@ -150,9 +149,9 @@ class QuartetGame:
             self.round_nr += 1
 
         # Finish up the game
-        LOGGER.info(f"\nThe game finished after {self.round_nr} rounds!")
-        msg = "\n".join(f"{k.name} has {k.points} quartets" for k in self.players)
-        LOGGER.info(msg)
+        LOGGER.info("\nThe game finished after %d rounds!", self.round_nr)
+        for k in self.players:
+            LOGGER.info("%s has %d quartets", k.name, k.points)
 
     def who_is_next(self, success: bool, player1: Player, player2: Player) -> Player:
         """ Resolve next starter. randomly draw next player """
@@ -162,7 +161,7 @@ class QuartetGame:
                 up_next = random.choice(self.in_game_players)
             except IndexError:
                 return None
-        LOGGER.info(f"Next round it will be {up_next.name}'s turn")
+        LOGGER.info("Next round it will be %s's turn", up_next.name)
         return up_next
 
     def deal_cards(self) -> None:
@@ -180,20 +179,20 @@ class QuartetGame:
             card=asked_card, players=self.in_game_players
         )
 
-        LOGGER.info(f"{player.name} asks {asked_player.name}: {asked_card}")
+        LOGGER.info("%s asks %s: %s", player.name, asked_player.name, asked_card)
         return (asked_player, asked_card)
 
     def handle_players_quartet(self) -> None:
         """ Remove quartets from players' hands and credit a point """
         for player in self.players:
             for quartet in player.hand.quartets:
-                LOGGER.info(f"{player.name} has a quartet with {quartet}!")
+                LOGGER.info("%s has a quartet with %s!", player.name, quartet)
 
                 quartet_cards = [c for c in player.hand if c.group == quartet]
                 player.hand = Hand(c for c in player.hand if c not in quartet_cards)
                 player.points += 1
 
-                LOGGER.info(f"{player.name} is putting down {quartet_cards}")
+                LOGGER.info("%s is putting down %s", player.name, quartet_cards)
 
     @property
     def in_game_players(self) -> List[Player]:
@@ -202,6 +201,10 @@ class QuartetGame:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=10, format="%(message)s")
+    handler = logging.FileHandler(filename="logs/naive.log", mode="w")
+    LOGGER.addHandler(handler)
+
     names = ["Powpow", "Lucky Luke", "Donald Duck", "Ken"]
     players = [Player(name=name) for name in names]
 
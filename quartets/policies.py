@@ -0,0 +1,245 @@
+"""
+Decision policies for clever quartets, and the registry to look them up.
+
+A policy decides which card a player asks for and whom they ask. Policies are
+looked up by name once, when the game is set up, and called directly on every
+turn after that. A policy that needs to see the whole game can implement
+`start_game(game, player)`, which the game calls when it is set up. A new
+policy only has to be registered:
+
+    @register_policy("always-left")
+    class AlwaysLeft(RandomPolicy):
+        def choose_player(self, player, card, players, knowledge, rng):
+            ...
+
+and can then be used as `Player(name, decision_policy="always-left")`.
+"""
+import random
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Protocol, Type
+
+from beliefs import BeliefTracker
+from cards import Card, cards_in
+from endgame import EndgameSolver
+from knowledge import PublicKnowledge
+
+if TYPE_CHECKING:
+    from clever import Player, QuartetGame
+
+
+class Policy(Protocol):
+    """ What a decision policy has to be able to do """
+
+    def choose_card(
+        self, player: "Player", knowledge: PublicKnowledge, rng: random.Random
+    ) -> Card:
+        """ Returns a card for <player> to ask for """
+
+    def choose_player(
+        self,
+        player: "Player",
+        card: Card,
+        players: List["Player"],
+        knowledge: PublicKnowledge,
+        rng: random.Random,
+    ) -> "Player":
+        """ Choose which of the in-game <players> <player> asks for <card> """
+
+
+POLICIES: Dict[str, Callable[[], Policy]] = {}
+
+
+def register_policy(name: str) -> Callable[[Type], Type]:
+    """ Class decorator that makes a policy available under <name> """
+
+    def register(cls: Type) -> Type:
+        POLICIES[name] = cls
+        return cls
+
+    return register
+
+
+def get_policy(name: str) -> Policy:
+    """ Returns a new instance of the policy registered as <name> """
+    try:
+        factory = POLICIES[name]
+    except KeyError:
+        available = ", ".join(f"'{n}'" for n in POLICIES)
+        msg = f'decision policy "{name}" does not exist. Use {available} instead'
+        raise ValueError(msg) from None
+    return factory()
+
+
+@register_policy("random")
+class RandomPolicy:
+    """ Ask a random eligible card from a random other player """
+
+    def choose_card(
+        self, player: "Player", knowledge: PublicKnowledge, rng: random.Random
+    ) -> Card:
+        hand = player.hand
+        return hand.random_card(hand.eligible_mask, rng)
+
+    def choose_player(
+        self,
+        player: "Player",
+        card: Card,
+        players: List["Player"],
+        knowledge: PublicKnowledge,
+        rng: random.Random,
+    ) -> "Player":
+        return rng.choice([p for p in players if p is not player])
+
+
+@register_policy("semi-random")
+class SemiRandomPolicy(RandomPolicy):
+    """ Ask the card that brings a quartet closest, from a random player """
+
+    def choose_card(
+        self, player: "Player", knowledge: PublicKnowledge, rng: random.Random
+    ) -> Card:
+        return player.hand.best_card(rng=rng)
+
+
+@register_policy("pretty-smart")
+class PrettySmartPolicy:
+    """
+    Use the public knowledge: prefer cards of which the owner is known, then
+    cards of which some non-owners are known. Ask the known owner, or skip
+    the players known not to have the card.
+    """
+
+    def choose_card(
+        self, player: "Player", knowledge: PublicKnowledge, rng: random.Random
+    ) -> Card:
+        # Check for the best card we know the location of
+        candidate = player.hand.best_card(knowledge.owner_known, rng)
+        # If not working, check for best card, we know is not owned by
+        if candidate is None:
+            candidate = player.hand.best_card(knowledge.non_owner_known, rng)
+        # If not working, pick the self-focused best card
+        if candidate is None:
+            candidate = player.hand.best_card(rng=rng)
+        return candidate
+
+    def choose_player(
+        self,
+        player: "Player",
+        card: Card,
+        players: List["Player"],
+        knowledge: PublicKnowledge,
+        rng: random.Random,
+    ) -> "Player":
+        owner = knowledge.owner_of(card)
+        if owner is not None:
+            return next(p for p in players if p.seat == owner)
+
+        # Skip the players we know do not have the card, unless that is
+        # everybody
+        others = [p for p in players if p is not player]
+        candidates = [p for p in others if not knowledge.is_non_owner(card, p.seat)]
+        return rng.choice(candidates or others)
+
+
+@register_policy("endgame")
+class EndgamePolicy(PrettySmartPolicy):
+    """
+    Play pretty-smart until only a few cards are left, then play the endgame
+    perfectly: the solver knows where the remaining cards are and how the
+    other players will play. All endgame players in a process share one
+    solver, so solved endgames are reused across games. Replace the solver
+    to solve bigger endgames.
+
+    This policy cheats: it looks into the hands of the other players, so
+    its results are not comparable to those of the fair policies. It is a
+    yardstick of how much better perfect play could do. With the default
+    solver (4 cards, a single group) it hardly ever asks differently than
+    pretty-smart.
+    """
+
+    solver = EndgameSolver()
+
+    def __init__(self):
+        self.game: Optional["QuartetGame"] = None
+        self.asked_seat: Optional[int] = None
+
+    def start_game(self, game: "QuartetGame", player: "Player") -> None:
+        self.game = game
+
+    def choose_card(
+        self, player: "Player", knowledge: PublicKnowledge, rng: random.Random
+    ) -> Card:
+        self.asked_seat = None
+        cards_left = sum(len(p.hand) for p in self.game.players)
+        if cards_left <= self.solver.max_cards:
+            result = self.solver.solve(self.game)
+            if result is not None:
+                self.asked_seat = result.asked_seat
+                return result.card
+        return super().choose_card(player, knowledge, rng)
+
+    def choose_player(
+        self,
+        player: "Player",
+        card: Card,
+        players: List["Player"],
+        knowledge: PublicKnowledge,
+        rng: random.Random,
+    ) -> "Player":
+        if self.asked_seat is not None:
+            return next(p for p in players if p.seat == self.asked_seat)
+        return super().choose_player(player, card, players, knowledge, rng)
+
+
+@register_policy("belief")
+class BeliefPolicy:
+    """
+    Ask the card that is most likely to be where we ask it, according to a
+    BeliefTracker that follows the game: prefer the card and seat with the
+    highest owner probability, then the card that brings a quartet closest.
+    All belief players at a table share one tracker.
+    """
+
+    def __init__(self):
+        self.tracker: Optional[BeliefTracker] = None
+        self.asked_seat: Optional[int] = None
+
+    def start_game(self, game: "QuartetGame", player: "Player") -> None:
+        self.tracker = next(
+            (o for o in game.observers if isinstance(o, BeliefTracker)), None
+        )
+        if self.tracker is None:
+            self.tracker = BeliefTracker(game.layout, len(game.players))
+            game.observers.append(self.tracker)
+
+    def choose_card(
+        self, player: "Player", knowledge: PublicKnowledge, rng: random.Random
+    ) -> Card:
+        hand, seat = player.hand, player.seat
+        best_score, best = None, []
+        for card in cards_in(hand.eligible_mask, hand.layout):
+            probs = self.tracker.owner_probabilities(card)
+            # We know we do not own the card ourselves
+            asked = max(
+                (s for s in range(len(probs)) if s != seat), key=probs.__getitem__
+            )
+            score = (round(probs[asked], 6), hand.group_count(card.group))
+            if best_score is None or score > best_score:
+                best_score, best = score, [(card, asked)]
+            elif score == best_score:
+                best.append((card, asked))
+
+        card, self.asked_seat = rng.choice(best)
+        return card
+
+    def choose_player(
+        self,
+        player: "Player",
+        card: Card,
+        players: List["Player"],
+        knowledge: PublicKnowledge,
+        rng: random.Random,
+    ) -> "Player":
+        for p in players:
+            if p.seat == self.asked_seat and p is not player:
+                return p
+        return rng.choice([p for p in players if p is not player])
@@ -0,0 +1,149 @@
+"""
+Count and time the phases of clever quartet games.
+
+A GameProfiler wraps the phase methods of the games it instruments: dealing,
+request generation, knowledge updates, quartet cleanup and resolving the next
+player, and the start, rounds and finish of a game around them. Every call is
+timed with the monotonic perf_counter_ns clock and booked on its stack of
+frames, e.g. "game;round;knowledge". One profiler can instrument any number
+of games, and profilers of different processes can be merged.
+
+Only games that get a profiler are instrumented, on the game object itself,
+so games without one run exactly the same code as before and pay nothing.
+
+The totals export to JSON, and to the collapsed-stack format of flamegraph
+tools (self time in nanoseconds per stack):
+
+    $ python3 tournament.py --games 10000 --profile profile
+    $ flamegraph.pl profile.folded > profile.svg
+"""
+from dataclasses import dataclass
+import json
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+ROOT_FRAME = "game"
+# QuartetGame method: frame name
+FRAMES: Dict[str, str] = {
+    "start": "start",
+    "play_request": "round",
+    "finish": "finish",
+    "deal_cards": "deal",
+    "generate_request": "request",
+    "update_public_knowledge": "knowledge",
+    "handle_players_quartet": "quartets",
+    "who_is_next": "next_player",
+}
+
+Stack = Tuple[str, ...]
+
+
+@dataclass
+class FrameStats:
+    """ The calls of a single stack of frames """
+
+    calls: int = 0
+    total_ns: int = 0
+    self_ns: int = 0  # Without the time spent in nested frames
+
+
+class GameProfiler:
+    """ Counters and timers per stack of frames, over all instrumented games """
+
+    def __init__(self):
+        self.games = 0
+        self.frames: Dict[Stack, FrameStats] = {}
+        self._stack: List[str] = [ROOT_FRAME]
+        # The time spent in nested frames, per frame on the stack
+        self._nested: List[int] = [0]
+
+    def instrument(self, game) -> None:
+        """ Time the phases of <game> from now on """
+        self.games += 1
+        for method, frame in FRAMES.items():
+            setattr(game, method, self._timed(frame, getattr(game, method)))
+
+    def _timed(self, frame: str, method: Callable) -> Callable:
+        stack, nested, frames = self._stack, self._nested, self.frames
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            stack.append(frame)
+            nested.append(0)
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                key = tuple(stack)
+                stack.pop()
+                inner = nested.pop()
+                nested[-1] += elapsed
+
+                stats = frames.get(key)
+                if stats is None:
+                    stats = frames[key] = FrameStats()
+                stats.calls += 1
+                stats.total_ns += elapsed
+                stats.self_ns += elapsed - inner
+
+        return timed
+
+    def merge(self, other: "GameProfiler") -> None:
+        """ Add the totals of another profiler to this one """
+        self.games += other.games
+        for key, theirs in other.frames.items():
+            ours = self.frames.setdefault(key, FrameStats())
+            ours.calls += theirs.calls
+            ours.total_ns += theirs.total_ns
+            ours.self_ns += theirs.self_ns
+
+    def phases(self) -> Dict[str, FrameStats]:
+        """ The totals per frame name, wherever on the stack it was called """
+        totals: Dict[str, FrameStats] = {}
+        for key, stats in self.frames.items():
+            phase = totals.setdefault(key[-1], FrameStats())
+            phase.calls += stats.calls
+            phase.total_ns += stats.total_ns
+            phase.self_ns += stats.self_ns
+        return totals
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "games": self.games,
+            "phases": {name: vars(s) for name, s in sorted(self.phases().items())},
+            "stacks": {
+                ";".join(key): vars(stats) for key, stats in sorted(self.frames.items())
+            },
+        }
+
+    def collapsed(self) -> List[str]:
+        """ A line "frame;frame;frame self_ns" per stack """
+        return [
+            f"{';'.join(key)} {stats.self_ns}"
+            for key, stats in sorted(self.frames.items())
+            if stats.self_ns > 0
+        ]
+
+    def write(self, prefix: str) -> None:
+        """ Write <prefix>.json and <prefix>.folded """
+        with open(f"{prefix}.json", "w") as file:
+            json.dump(self.to_json(), file, indent=2)
+        with open(f"{prefix}.folded", "w") as file:
+            file.writelines(line + "\n" for line in self.collapsed())
+
+    def __repr__(self) -> str:
+        phases = self.phases()
+        total = sum(s.self_ns for s in phases.values()) or 1
+        lines = [
+            f"{self.games} games profiled",
+            f"{'phase':<14}{'calls':>12}{'us/call':>10}{'self %':>8}",
+        ]
+        for name, stats in sorted(phases.items(), key=lambda item: -item[1].self_ns):
+            per_call = stats.total_ns / stats.calls / 1000 if stats.calls else 0.0
+            lines.append(
+                f"{name:<14}{stats.calls:>12}{per_call:>10.2f}"
+                f"{100 * stats.self_ns / total:>8.1f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,224 @@
+"""
+Stream the results of many games to disk, one column per file.
+
+A result directory holds a binary file per column plus `meta.json`, which
+names the policies and describes the columns. Every game adds one row:
+- game: the game number within the batch (uint64)
+- seed: the seed the game was played with, 0 if it was not seeded (uint64)
+- policies: the policy code per seat (uint8 x seats), see meta.json
+- rounds: the number of rounds (uint32)
+- quartets: the quartets per seat (uint8 x seats)
+- winners: a bitmask of the seats with the most quartets (uint8, or as wide
+    as needed for more than 8 seats, up to uint64)
+
+The writer buffers rows in arrays and appends them to the column files every
+<batch_size> games, so its memory use does not grow with the number of games.
+The files are raw native-endian arrays, which NumPy can memory-map:
+
+    with ResultWriter("results") as writer:
+        writer.write(game_nr, summary)
+
+    columns = open_results("results")
+    columns["quartets"][columns["policies"] == 2].mean()
+"""
+from array import array
+import json
+import os
+import sys
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy
+
+
+# Column name: (array typecode, values per seat or not)
+COLUMNS: Dict[str, Tuple[str, bool]] = {
+    "game": ("Q", False),
+    "seed": ("Q", False),
+    "policies": ("B", True),
+    "rounds": ("I", False),
+    "quartets": ("B", True),
+    "winners": ("B", False),
+}
+META_FILE = "meta.json"
+MAX_SEATS = 64
+
+
+class GameSummary(NamedTuple):
+    """ The outcome of a single game, seat by seat """
+
+    seed: Optional[int]
+    policies: Tuple[str, ...]
+    points: Tuple[int, ...]
+    rounds: int
+
+
+def _dtype(typecode: str) -> str:
+    """ The NumPy dtype of an array typecode on this machine """
+    order = "<" if sys.byteorder == "little" else ">"
+    return f"{order}u{array(typecode).itemsize}"
+
+
+def _typecodes(n_seats: int) -> Dict[str, str]:
+    """ The array typecode per column, with a winners bitmask of <n_seats> bits """
+    if not 1 <= n_seats <= MAX_SEATS:
+        raise ValueError(f"Results can be kept for 1 to {MAX_SEATS} seats, not {n_seats}")
+    typecodes = {name: tc for name, (tc, _) in COLUMNS.items()}
+    typecodes["winners"] = next(
+        tc for tc in "BHIQ" if array(tc).itemsize * 8 >= n_seats
+    )
+    return typecodes
+
+
+def _read_meta(path: str) -> Dict[str, object]:
+    with open(os.path.join(path, META_FILE)) as file:
+        return json.load(file)
+
+
+class ResultWriter:
+    """
+    Appends game results to the column files in the directory <path>, which
+    is created if needed. Results already in the directory are kept, as long
+    as they were written for the same number of seats.
+    """
+
+    def __init__(self, path: str, n_seats: int = 4, batch_size: int = 65536):
+        self._typecodes = _typecodes(n_seats)
+        self.path = path
+        self.n_seats = n_seats
+        self.batch_size = batch_size
+        self.policies: List[str] = []
+        self.games = 0
+
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, META_FILE)):
+            meta = _read_meta(path)
+            if meta["seats"] != n_seats:
+                raise ValueError(f"{path} holds results of {meta['seats']} seats")
+            self.policies = meta["policies"]
+            self.games = meta["games"]
+
+        self._codes = {name: code for code, name in enumerate(self.policies)}
+        self._buffers = {name: array(tc) for name, tc in self._typecodes.items()}
+        self._buffered = 0
+
+    def write(self, game_nr: int, summary: GameSummary) -> None:
+        """ Add the result of one game """
+        if len(summary.points) != self.n_seats or len(summary.policies) != self.n_seats:
+            raise ValueError(
+                f"Expected a result of {self.n_seats} seats, got {len(summary.points)} "
+                f"points and {len(summary.policies)} policies"
+            )
+        buffers = self._buffers
+        buffers["game"].append(game_nr)
+        buffers["seed"].append(summary.seed or 0)
+        buffers["policies"].extend(self._code(p) for p in summary.policies)
+        buffers["rounds"].append(summary.rounds)
+        buffers["quartets"].extend(summary.points)
+
+        best = max(summary.points)
+        winners = 0
+        for seat, points in enumerate(summary.points):
+            if points == best:
+                winners |= 1 << seat
+        buffers["winners"].append(winners)
+
+        self._buffered += 1
+        if self._buffered >= self.batch_size:
+            self.flush()
+
+    def _code(self, policy: str) -> int:
+        code = self._codes.get(policy)
+        if code is None:
+            code = self._codes[policy] = len(self.policies)
+            self.policies.append(policy)
+        return code
+
+    def flush(self) -> None:
+        """ Append the buffered games to the column files """
+        for name, buffer in self._buffers.items():
+            with open(os.path.join(self.path, f"{name}.bin"), "ab") as file:
+                buffer.tofile(file)
+            del buffer[:]
+        self.games += self._buffered
+        self._buffered = 0
+
+        meta = {
+            "seats": self.n_seats,
+            "games": self.games,
+            "policies": self.policies,
+            "columns": {
+                name: {"dtype": _dtype(self._typecodes[name]), "per_seat": per_seat}
+                for name, (_, per_seat) in COLUMNS.items()
+            },
+        }
+        with open(os.path.join(self.path, META_FILE), "w") as file:
+            json.dump(meta, file, indent=2)
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def open_results(path: str) -> Dict[str, "numpy.ndarray"]:
+    """
+    Memory-map the columns of a result directory as read-only NumPy arrays,
+    with a row per game. The per-seat columns have a column per seat.
+    """
+    import numpy as np
+
+    meta = _read_meta(path)
+    games, n_seats = meta["games"], meta["seats"]
+    columns = {}
+    for name, column in meta["columns"].items():
+        shape = (games, n_seats) if column["per_seat"] else (games,)
+        if games == 0:
+            columns[name] = np.empty(shape, dtype=column["dtype"])
+            continue
+        filename = os.path.join(path, f"{name}.bin")
+        columns[name] = np.memmap(filename, dtype=column["dtype"], mode="r", shape=shape)
+    return columns
+
+
+def iter_results(
+    path: str, batch_size: int = 65536
+) -> Iterator[Tuple[int, GameSummary]]:
+    """ Read a result directory back game by game, without NumPy """
+    meta = _read_meta(path)
+    games, n_seats, names = meta["games"], meta["seats"], meta["policies"]
+    typecodes = _typecodes(n_seats)
+    files = {name: open(os.path.join(path, f"{name}.bin"), "rb") for name in COLUMNS}
+    try:
+        for start in range(0, games, batch_size):
+            count = min(batch_size, games - start)
+            batch = {}
+            for name, (_, per_seat) in COLUMNS.items():
+                batch[name] = array(typecodes[name])
+                batch[name].fromfile(files[name], count * (n_seats if per_seat else 1))
+
+            for i in range(count):
+                seats = slice(i * n_seats, (i + 1) * n_seats)
+                summary = GameSummary(
+                    seed=batch["seed"][i],
+                    policies=tuple(names[c] for c in batch["policies"][seats]),
+                    points=tuple(batch["quartets"][seats]),
+                    rounds=batch["rounds"][i],
+                )
+                yield batch["game"][i], summary
+    finally:
+        for file in files.values():
+            file.close()
+
+
+if __name__ == "__main__":
+    from tournament import TournamentResult
+
+    result = TournamentResult()
+    for _, summary in iter_results(sys.argv[1]):
+        result.add_game(summary)
+    print(result)
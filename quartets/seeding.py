@@ -0,0 +1,26 @@
+"""
+Seeds for reproducible games.
+
+A batch of games is reproducible from a single root seed. Every game gets its
+own seed, derived from the root seed and the game number, and plays with its
+own random.Random. It does not matter which worker plays a game or in which
+order the games are played: game #123456 of a batch can be replayed on its own.
+"""
+import hashlib
+import random
+
+
+def derive_seed(*path: int) -> int:
+    """
+    Returns a 64-bit seed for the stream at <path>, e.g. (root_seed, game_nr).
+    Different paths give statistically independent streams, and streams can
+    be spawned from streams by extending the path.
+    """
+    key = ":".join(str(p) for p in path).encode()
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def new_root_seed() -> int:
+    """ A fresh root seed, for batches that were not given one """
+    return random.SystemRandom().getrandbits(64)
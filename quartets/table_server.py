@@ -0,0 +1,342 @@
+"""
+Play many tables of clever quartets at once in a single asyncio event loop,
+with some seats played by agents in other processes.
+
+The remote seats of every table are handed out to the connected agents in
+turn. A table asks the agent of a remote seat for its moves (see agents.py
+for the protocol) and plays the other seats with their decision policy, like
+QuartetGame does. A remote seat that does not answer within --timeout
+seconds, or answers with a move that is not allowed, plays that move with
+its fallback policy instead. Waiting for an agent only blocks its own table.
+
+By default the server starts --agents stand-in agents as child processes and
+talks to them over pipes. With --listen it waits for --agents agents to
+connect to a Unix socket instead:
+
+    $ python3 table_server.py --tables 1000 --agents 4 --agent-policy pretty-smart
+    $ python3 table_server.py --tables 100 --agents 1 --listen tables.sock &
+    $ python3 agents.py --policy random --connect tables.sock
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from itertools import count
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from agents import card_from_json, move_request
+from clever import Player, QuartetGame
+from results import GameSummary
+from seeding import derive_seed, new_root_seed
+from tournament import DEFAULT_POLICIES, SEAT_NAMES, TournamentResult
+
+
+# Agent replies can be large for big decks
+LINE_LIMIT = 2 ** 24
+
+
+class AgentConnection:
+    """
+    A connected agent. Any number of tables can wait for a move of the same
+    agent at the same time: requests carry an id, and replies are matched to
+    the request they answer.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        name: str = "agent",
+        process: Optional[asyncio.subprocess.Process] = None,
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.name = name
+        self.process = process
+        self._ids = count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._replies = asyncio.ensure_future(self._read_replies())
+
+    @classmethod
+    async def connect(
+        cls,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        process: Optional[asyncio.subprocess.Process] = None,
+    ) -> "AgentConnection":
+        """ Wait for the agent to introduce itself """
+        hello = json.loads(await reader.readline())
+        return cls(reader, writer, hello.get("name", "agent"), process)
+
+    async def request(self, message: Dict[str, object]) -> Dict[str, object]:
+        """ Send a request and wait for the reply """
+        if self._replies.done():
+            raise ConnectionError(f"{self.name} is gone")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self.send({**message, "id": request_id})
+            await self.writer.drain()
+            return await future
+        finally:
+            del self._pending[request_id]
+
+    def send(self, message: Dict[str, object]) -> None:
+        """ Send a message that needs no reply """
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+    async def _read_replies(self) -> None:
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                # Lines that are not a reply are dropped, like late replies
+                try:
+                    reply = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(reply, dict):
+                    continue
+                future = self._pending.get(reply.get("id"))
+                # Replies to requests that timed out are dropped
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"{self.name} is gone"))
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, BrokenPipeError):
+            pass
+        await asyncio.gather(self._replies, return_exceptions=True)
+        if self.process is not None:
+            await self.process.wait()
+
+
+@dataclass
+class TableStats:
+    """ What happened at the remote seats of all tables """
+
+    moves: int = 0
+    timeouts: int = 0
+    invalid: int = 0
+    wait: float = 0.0
+    result: TournamentResult = field(default_factory=TournamentResult)
+
+    def __repr__(self) -> str:
+        mean = self.wait / self.moves * 1e3 if self.moves else 0.0
+        return (
+            f"{self.result}\n{self.moves} remote moves, {mean:.2f} ms on average, "
+            f"{self.timeouts} timeouts, {self.invalid} invalid"
+        )
+
+
+async def remote_request(
+    game: QuartetGame,
+    player: Player,
+    agent: AgentConnection,
+    table: int,
+    timeout: float,
+    stats: TableStats,
+) -> Tuple[Player, object]:
+    """
+    Ask <agent> for the move of <player>. Falls back to the player's own
+    policy if the agent is too slow, gone, or its move is not allowed.
+    """
+    stats.moves += 1
+    start = time.perf_counter()
+    try:
+        reply = await asyncio.wait_for(
+            agent.request(move_request(game, player, table)), timeout
+        )
+    except asyncio.TimeoutError:
+        stats.timeouts += 1
+        return game.generate_request(player)
+    except (ConnectionError, OSError):
+        stats.invalid += 1
+        return game.generate_request(player)
+    finally:
+        stats.wait += time.perf_counter() - start
+
+    try:
+        card = card_from_json(reply["card"])
+        seat = reply["asked"]
+        # Not bool, which is an int too, and no negative indexes from the end
+        if type(seat) is not int or not 0 <= seat < len(game.players):
+            raise ValueError(f"There is no seat {seat!r}")
+        asked = game.players[seat]
+        allowed = player.hand.layout.card_bits[card] & player.hand.eligible_mask
+    except (KeyError, IndexError, TypeError, ValueError):
+        allowed = False
+    if not allowed or asked is player or asked.is_finished:
+        stats.invalid += 1
+        return game.generate_request(player)
+    return asked, card
+
+
+async def play_table(
+    table: int,
+    seating: Sequence[str],
+    agents: Dict[int, AgentConnection],
+    seed: int,
+    timeout: float,
+    stats: TableStats,
+) -> GameSummary:
+    """
+    Play a game at <table>. The seats in <agents> are played remotely, with
+    their policy in <seating> as fallback.
+    """
+    players = [Player(name=n, decision_policy=p) for n, p in zip(SEAT_NAMES, seating)]
+    game = QuartetGame(players=players, seed=seed)
+
+    game.start()
+    while not game.is_over:
+        player = game.current_player
+        agent = agents.get(player.seat)
+        if agent is None:
+            asked_player, card = game.generate_request(player)
+        else:
+            asked_player, card = await remote_request(
+                game, player, agent, table, timeout, stats
+            )
+        game.play_request(player, asked_player, card)
+    game.finish()
+
+    points = [p.points for p in players]
+    for seat, agent in agents.items():
+        agent.send({"type": "game_over", "table": table, "seat": seat, "points": points})
+
+    # Remote seats are credited to the agent that played them
+    policies = tuple(
+        agents[seat].name if seat in agents else policy
+        for seat, policy in enumerate(seating)
+    )
+    summary = GameSummary(seed, policies, tuple(points), game.round_nr - 1)
+    stats.result.add_game(summary)
+    return summary
+
+
+async def run_tables(
+    n_tables: int,
+    agents: List[AgentConnection],
+    remote_seats: Sequence[int] = (0,),
+    policies: Sequence[str] = DEFAULT_POLICIES,
+    timeout: float = 1.0,
+    concurrency: int = 1000,
+    seed: Optional[int] = None,
+) -> TableStats:
+    """
+    Play <n_tables> games, at most <concurrency> at the same time. The
+    <remote_seats> of every table are played by the <agents>, in turn.
+    """
+    root_seed = seed if seed is not None else new_root_seed()
+    stats = TableStats(result=TournamentResult(seed=root_seed))
+    semaphore = asyncio.Semaphore(concurrency)
+    turn = count()
+
+    async def table(table_nr: int) -> None:
+        async with semaphore:
+            seats = {seat: agents[next(turn) % len(agents)] for seat in remote_seats}
+            seed = derive_seed(root_seed, table_nr)
+            await play_table(table_nr, policies, seats, seed, timeout, stats)
+
+    await asyncio.gather(*(table(nr) for nr in range(n_tables)))
+    return stats
+
+
+async def spawn_agents(
+    n_agents: int, policy: str, delay: float = 0.0
+) -> List[AgentConnection]:
+    """ Start stand-in agents as child processes, connected over pipes """
+    agents = []
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents.py")
+    for _ in range(n_agents):
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            script,
+            "--policy",
+            policy,
+            "--delay",
+            str(delay),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=LINE_LIMIT,
+        )
+        agent = await AgentConnection.connect(process.stdout, process.stdin, process)
+        agents.append(agent)
+    return agents
+
+
+async def accept_agents(path: str, n_agents: int) -> List[AgentConnection]:
+    """ Wait for <n_agents> agents to connect to the Unix socket at <path> """
+    agents: List[AgentConnection] = []
+    connected = asyncio.Event()
+
+    async def on_connect(reader, writer) -> None:
+        agents.append(await AgentConnection.connect(reader, writer))
+        if len(agents) == n_agents:
+            connected.set()
+
+    server = await asyncio.start_unix_server(on_connect, path, limit=LINE_LIMIT)
+    try:
+        async with server:
+            await connected.wait()
+    finally:
+        os.unlink(path)
+    return agents
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.listen:
+        agents = await accept_agents(args.listen, args.agents)
+    else:
+        agents = await spawn_agents(args.agents, args.agent_policy, args.agent_delay)
+
+    start = time.perf_counter()
+    stats = await run_tables(
+        args.tables,
+        agents,
+        remote_seats=args.remote_seats,
+        policies=args.policies,
+        timeout=args.timeout,
+        concurrency=args.concurrency,
+        seed=args.seed,
+    )
+    duration = time.perf_counter() - start
+    print(stats)
+    print(f"{args.tables / duration:.1f} tables per second")
+
+    await asyncio.gather(*(agent.close() for agent in agents))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--agents", type=int, default=1)
+    parser.add_argument(
+        "--remote-seats", type=int, nargs="+", default=[0], metavar="SEAT"
+    )
+    parser.add_argument(
+        "--policies",
+        nargs=4,
+        default=DEFAULT_POLICIES,
+        help="the policy per seat, also the fallback of remote seats",
+    )
+    parser.add_argument("--timeout", type=float, default=1.0, help="seconds per move")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--listen", metavar="PATH", help="wait for agents on a socket")
+    parser.add_argument("--agent-policy", default="random")
+    parser.add_argument("--agent-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
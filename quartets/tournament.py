@@ -0,0 +1,274 @@
+"""
+Run a tournament of clever quartet games across a process pool.
+
+Every game seats the same line-up of decision policies, but the seating is
+rotated through all distinct permutations of that line-up, so no policy
+profits from always starting the game. Workers play a chunk of games each and
+only send back a compact summary of the results. The games emit no events,
+so nothing gets logged.
+
+Each game plays with its own random number generator, seeded from the root
+seed of the tournament and the game number. Any single game of a tournament
+can therefore be replayed, with its full log:
+
+    $ python3 tournament.py --games 100000 --processes 8 --seed 42
+    $ python3 tournament.py --seed 42 --replay 31337
+
+With --results, the outcome of every game is streamed to a columnar result
+directory as well (see results.py). With --profile, the phases of the games
+are counted and timed (see profiling.py).
+"""
+import argparse
+from dataclasses import dataclass, field
+from itertools import permutations
+import logging
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from clever import LOGGER, Player, QuartetGame
+from events import NULL_SINK, EventSink, LogRenderer
+from profiling import GameProfiler
+from results import GameSummary, ResultWriter
+from seeding import derive_seed, new_root_seed
+
+
+SEAT_NAMES = ["Powpow", "Lucky Luke", "Donald Duck", "Ken"]
+DEFAULT_POLICIES = ["pretty-smart", "pretty-smart", "random", "semi-random"]
+
+
+@dataclass
+class PolicyStats:
+    """ Accumulated results of a single decision policy """
+
+    seats: int = 0
+    wins: float = 0.0
+    quartets: int = 0
+    rounds: int = 0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.seats if self.seats else 0.0
+
+    @property
+    def mean_quartets(self) -> float:
+        return self.quartets / self.seats if self.seats else 0.0
+
+    @property
+    def mean_rounds(self) -> float:
+        return self.rounds / self.seats if self.seats else 0.0
+
+
+@dataclass
+class TournamentResult:
+    """
+    Aggregated results of many games. A game that ends in a tie splits the
+    win evenly between the players with the most quartets.
+    """
+
+    games: int = 0
+    rounds: int = 0
+    per_policy: Dict[str, PolicyStats] = field(default_factory=dict)
+    seed: Optional[int] = None
+    profile: Optional[GameProfiler] = None
+
+    def add_game(self, summary: GameSummary) -> None:
+        """ Add the outcome of one game to the totals """
+        self.games += 1
+        self.rounds += summary.rounds
+
+        best = max(summary.points)
+        winner_count = summary.points.count(best)
+        for policy, points in zip(summary.policies, summary.points):
+            stats = self.per_policy.setdefault(policy, PolicyStats())
+            stats.seats += 1
+            stats.quartets += points
+            stats.rounds += summary.rounds
+            if points == best:
+                stats.wins += 1 / winner_count
+
+    def merge(self, other: "TournamentResult") -> None:
+        """ Add the totals of another (partial) result to this one """
+        self.games += other.games
+        self.rounds += other.rounds
+        for policy, theirs in other.per_policy.items():
+            ours = self.per_policy.setdefault(policy, PolicyStats())
+            ours.seats += theirs.seats
+            ours.wins += theirs.wins
+            ours.quartets += theirs.quartets
+            ours.rounds += theirs.rounds
+        if other.profile is not None:
+            if self.profile is None:
+                self.profile = GameProfiler()
+            self.profile.merge(other.profile)
+
+    @property
+    def mean_rounds(self) -> float:
+        return self.rounds / self.games if self.games else 0.0
+
+    def __repr__(self) -> str:
+        header = f"{'policy':<14}{'seats':>10}{'win rate':>10}{'quartets':>10}{'rounds':>10}"
+        summary = f"{self.games} games, {self.mean_rounds:.2f} rounds on average"
+        if self.seed is not None:
+            summary += f" (seed {self.seed})"
+        lines = [summary, header]
+        for policy, stats in sorted(self.per_policy.items()):
+            lines.append(
+                f"{policy:<14}{stats.seats:>10}{stats.win_rate:>10.4f}"
+                f"{stats.mean_quartets:>10.4f}{stats.mean_rounds:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+def seatings(policies: Sequence[str]) -> List[Tuple[str, ...]]:
+    """ All distinct ways to seat the policies at the table """
+    return sorted(set(permutations(policies)))
+
+
+def play_game(
+    seating: Sequence[str],
+    seed: Optional[int] = None,
+    events: EventSink = NULL_SINK,
+    profiler: Optional[GameProfiler] = None,
+) -> GameSummary:
+    """ Play a single game with the given policies, seat by seat """
+    players = [Player(name=n, decision_policy=p) for n, p in zip(SEAT_NAMES, seating)]
+    game = QuartetGame(players=players, events=events, seed=seed, profiler=profiler)
+    game.simulate_game()
+
+    return GameSummary(
+        seed=seed,
+        policies=tuple(seating),
+        points=tuple(p.points for p in players),
+        rounds=game.round_nr - 1,
+    )
+
+
+def replay_game(
+    policies: Sequence[str], root_seed: int, game_nr: int, events: EventSink
+) -> GameSummary:
+    """ Play game <game_nr> of a tournament again, emitting its events """
+    rotation = seatings(policies)
+    seed = derive_seed(root_seed, game_nr)
+    return play_game(rotation[game_nr % len(rotation)], seed=seed, events=events)
+
+
+def play_chunk(
+    task: Tuple[Sequence[str], int, int, int, bool, bool]
+) -> Tuple[TournamentResult, List[Tuple[int, GameSummary]]]:
+    """
+    Play games <start> up to <stop>, rotating through all seatings. The
+    summaries of the games are only returned if <keep_games> is set, the
+    games are only profiled if <profile> is set.
+    """
+    policies, root_seed, start, stop, keep_games, profile = task
+    rotation = seatings(policies)
+
+    result, games = TournamentResult(), []
+    if profile:
+        result.profile = GameProfiler()
+    for game_nr in range(start, stop):
+        seed = derive_seed(root_seed, game_nr)
+        seating = rotation[game_nr % len(rotation)]
+        summary = play_game(seating, seed=seed, profiler=result.profile)
+        result.add_game(summary)
+        if keep_games:
+            games.append((game_nr, summary))
+    return result, games
+
+
+def _chunks(
+    policies: Sequence[str],
+    root_seed: int,
+    n_games: int,
+    chunk_size: int,
+    keep_games: bool,
+    profile: bool,
+) -> Iterator[Tuple[Sequence[str], int, int, int, bool, bool]]:
+    for start in range(0, n_games, chunk_size):
+        stop = min(start + chunk_size, n_games)
+        yield (tuple(policies), root_seed, start, stop, keep_games, profile)
+
+
+def run_tournament(
+    n_games: int,
+    policies: Sequence[str] = DEFAULT_POLICIES,
+    processes: Optional[int] = None,
+    chunk_size: int = 1000,
+    seed: Optional[int] = None,
+    results: Optional[ResultWriter] = None,
+    profile: bool = False,
+) -> TournamentResult:
+    """
+    Play <n_games> games, spread over a pool of <processes> worker processes
+    (defaults to the number of cores), and aggregate the results per policy.
+    The games are seeded from <seed>, or from a fresh root seed. The result
+    of every single game is streamed to the <results> writer, if given.
+    With <profile>, the phases of all games are profiled into result.profile.
+    """
+    if len(policies) != len(SEAT_NAMES):
+        raise ValueError(f"A game needs exactly {len(SEAT_NAMES)} policies")
+
+    root_seed = seed if seed is not None else new_root_seed()
+    result = TournamentResult(seed=root_seed)
+    tasks = _chunks(
+        policies, root_seed, n_games, chunk_size, results is not None, profile
+    )
+    with Pool(processes=processes) as pool:
+        for partial, games in pool.imap_unordered(play_chunk, tasks):
+            result.merge(partial)
+            for game_nr, summary in games:
+                results.write(game_nr, summary)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--policies", nargs=4, default=DEFAULT_POLICIES)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--replay",
+        type=int,
+        default=None,
+        metavar="GAME_NR",
+        help="print the log of a single game of the tournament with --seed",
+    )
+    parser.add_argument(
+        "--results",
+        metavar="DIR",
+        default=None,
+        help="append the result of every game to a result directory",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PREFIX",
+        default=None,
+        help="profile the games into PREFIX.json and PREFIX.folded",
+    )
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        if args.seed is None:
+            parser.error("--replay needs the --seed of the tournament")
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        renderer = LogRenderer(LOGGER)
+        replay_game(args.policies, args.seed, args.replay, events=renderer)
+    else:
+        writer = ResultWriter(args.results) if args.results else None
+        result = run_tournament(
+            n_games=args.games,
+            policies=args.policies,
+            processes=args.processes,
+            chunk_size=args.chunk_size,
+            seed=args.seed,
+            results=writer,
+            profile=args.profile is not None,
+        )
+        if writer is not None:
+            writer.close()
+        print(result)
+        if result.profile is not None:
+            result.profile.write(args.profile)
+            print(result.profile)